@@ -1,9 +1,11 @@
 import os
 from app import create_app, db
 from app.models import User, Task, CalendarEvent, StudySession, AIConversation, AIMessage
+from app.models.ai_conversation import make_preview
 from sqlalchemy import inspect
 from sqlalchemy import Boolean
 from sqlalchemy.sql import text
+import click
 
 # Get config from environment
 config_name = os.getenv('FLASK_CONFIG', 'default')
@@ -46,6 +48,18 @@ def init_database():
                 print(f"Error checking study_session table: {str(e)}")
                 raise
             
+            # Add is_admin column to user if it doesn't exist
+            user_columns = [col['name'] for col in inspector.get_columns('user')]
+            if 'is_admin' not in user_columns:
+                try:
+                    with db.engine.connect() as conn:
+                        conn.execute(text('ALTER TABLE "user" ADD COLUMN is_admin BOOLEAN NOT NULL DEFAULT FALSE'))
+                        conn.commit()
+                        print("Added is_admin column to user table")
+                except Exception as e:
+                    print(f"Error adding is_admin column: {str(e)}")
+                    raise
+            
             # Add is_active column if it doesn't exist
             ai_columns = [col['name'] for col in inspector.get_columns('ai_conversation')]
             
@@ -61,6 +75,75 @@ def init_database():
                     conn.rollback()
                     raise
             
+            # Add rolling summary columns if they don't exist
+            rolling_columns = {
+                'rolling_summary': "ALTER TABLE ai_conversation ADD COLUMN rolling_summary TEXT",
+                'summarized_through_id': "ALTER TABLE ai_conversation ADD COLUMN summarized_through_id INTEGER DEFAULT 0"
+            }
+            for column, statement in rolling_columns.items():
+                if column not in ai_columns:
+                    try:
+                        with db.engine.connect() as conn:
+                            conn.execute(text(statement))
+                            conn.commit()
+                            print(f"Added {column} column to ai_conversation table")
+                    except Exception as e:
+                        print(f"Error adding {column} column: {str(e)}")
+                        raise
+            
+            # Add denormalized message summary columns, backfilling them from ai_message
+            summary_columns = {
+                'message_count': "ALTER TABLE ai_conversation ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0",
+                'last_message_at': "ALTER TABLE ai_conversation ADD COLUMN last_message_at DATETIME",
+                'last_message_preview': "ALTER TABLE ai_conversation ADD COLUMN last_message_preview VARCHAR(120)"
+            }
+            missing_summary_columns = [column for column in summary_columns if column not in ai_columns]
+            if missing_summary_columns:
+                try:
+                    with db.engine.connect() as conn:
+                        for column in missing_summary_columns:
+                            conn.execute(text(summary_columns[column]))
+                            print(f"Added {column} column to ai_conversation table")
+                        conn.execute(text("""
+                            UPDATE ai_conversation SET
+                                message_count = (SELECT COUNT(*) FROM ai_message
+                                                 WHERE ai_message.conversation_id = ai_conversation.id),
+                                last_message_at = (SELECT MAX(created_at) FROM ai_message
+                                                   WHERE ai_message.conversation_id = ai_conversation.id)
+                        """))
+                        # Previews go through make_preview so they match those of new messages
+                        latest = conn.execute(text("""
+                            SELECT ai_conversation.id,
+                                   (SELECT content FROM ai_message
+                                    WHERE ai_message.conversation_id = ai_conversation.id
+                                    ORDER BY created_at DESC, id DESC LIMIT 1)
+                            FROM ai_conversation WHERE message_count > 0
+                        """)).all()
+                        if latest:
+                            conn.execute(
+                                text("UPDATE ai_conversation SET last_message_preview = :preview WHERE id = :id"),
+                                [{'id': conversation_id, 'preview': make_preview(content)}
+                                 for conversation_id, content in latest]
+                            )
+                        conn.commit()
+                        print("Backfilled ai_conversation message summaries")
+                except Exception as e:
+                    print(f"Error adding message summary columns: {str(e)}")
+                    raise
+            
+            # Add pagination indexes to existing tables (create_all only adds them to new ones)
+            index_statements = [
+                "CREATE INDEX IF NOT EXISTS ix_ai_conversation_user_updated ON ai_conversation (user_id, updated_at, id)",
+                "CREATE INDEX IF NOT EXISTS ix_ai_message_conversation_created ON ai_message (conversation_id, created_at)",
+                "CREATE INDEX IF NOT EXISTS ix_task_user_completed_due ON task (user_id, completed, due_date)",
+                "CREATE INDEX IF NOT EXISTS ix_task_user_priority ON task (user_id, priority)",
+                "CREATE INDEX IF NOT EXISTS ix_calendar_event_user_start ON calendar_event (user_id, start_time)"
+            ]
+            with db.engine.connect() as conn:
+                for statement in index_statements:
+                    conn.execute(text(statement))
+                conn.commit()
+            
             # Remove summary column if it exists
             if 'summary' in ai_columns:
                 column_def = text("ALTER TABLE ai_conversation DROP COLUMN summary")
@@ -74,11 +157,72 @@ def init_database():
                     conn.rollback()
                     raise
             
+            # Virtual Todo events replace the stored copies
+            if app.config['CALENDAR_VIRTUAL_TODO_EVENTS']:
+                from app.utils.task_sync import remove_stored_todo_events
+                removed = remove_stored_todo_events()
+                if removed:
+                    print(f"Removed {removed} stored Todo events")
+            
             print("Database initialized successfully")
         except Exception as e:
             print(f"Error initializing database: {str(e)}")
             raise
 
+@app.cli.command('archive-messages')
+@click.option('--older-than-days', type=int, default=None, help='Defaults to AI_ARCHIVE_AFTER_DAYS')
+@click.option('--codec', type=click.Choice(['zlib', 'zstd']), default=None, help='Defaults to AI_ARCHIVE_CODEC')
+def archive_messages_command(older_than_days, codec):
+    """Move old messages of inactive AI conversations into compressed archives"""
+    from app.utils.archive import archive_messages
+    stats = archive_messages(older_than_days=older_than_days, codec=codec)
+    print(f"Archived {stats['messages']} messages from {stats['conversations']} conversations "
+          f"({stats['raw_bytes']} bytes -> {stats['compressed_bytes']} bytes)")
+
+@app.cli.command('import-users')
+@click.argument('source', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default=None,
+              help='Defaults to the file extension, else jsonl')
+@click.option('--batch-size', type=int, default=None, help='Defaults to USER_IMPORT_BATCH_SIZE')
+@click.option('--workers', type=int, default=None, help='Defaults to USER_IMPORT_WORKERS')
+@click.option('--dry-run', is_flag=True, help='Validate only, creating no users')
+def import_users_command(source, fmt, batch_size, workers, dry_run):
+    """Create users in bulk from a CSV (username,email,password) or JSONL file, or - for stdin"""
+    from app.utils.user_import import import_users, read_rows
+    fmt = fmt or ('csv' if source.name.lower().endswith('.csv') else 'jsonl')
+    stats = import_users(read_rows(source, fmt), app.config, batch_size, workers, dry_run)
+    for error in stats['errors']:
+        print(f"line {error['line']}: {error['username'] or '-'}: {error['error']}")
+    print(f"{'Validated' if dry_run else 'Created'} {stats['valid'] if dry_run else stats['created']} "
+          f"of {stats['rows']} users, {stats['failed']} failed, in {stats['seconds']}s "
+          f"({stats['rows_per_second']} rows/s; hashing {stats['hash_seconds']}s, "
+          f"inserting {stats['insert_seconds']}s)")
+
+@app.cli.command('set-admin')
+@click.argument('username')
+@click.option('--revoke', is_flag=True, help='Remove admin rights instead')
+def set_admin_command(username, revoke):
+    """Grant (or revoke) admin rights, e.g. to the account that runs imports"""
+    user = User.query.filter_by(username=username).first()
+    if not user:
+        raise click.ClickException(f"No user named {username}")
+    user.is_admin = not revoke
+    db.session.commit()
+    print(f"{username} is {'no longer' if revoke else 'now'} an admin")
+
+@app.cli.command('todo-events')
+@click.argument('action', type=click.Choice(['virtualize', 'materialize']))
+def todo_events_command(action):
+    """Delete the stored Todo events of tasks (virtualize) or recreate them (materialize)
+
+    Run materialize before turning CALENDAR_VIRTUAL_TODO_EVENTS off.
+    """
+    from app.utils.task_sync import remove_stored_todo_events, store_todo_events
+    if action == 'virtualize':
+        print(f"Removed {remove_stored_todo_events()} stored Todo events")
+    else:
+        print(f"Created {store_todo_events()} Todo events")
+
 # Initialize database when the app starts
 init_database()
 
@@ -1,3 +1,4 @@
+from .startup import import_timer  # First, so STARTUP_REPORT can time every import below
 from flask import Flask, jsonify, request, make_response
 from flask_cors import CORS
 from config import config
@@ -31,6 +32,30 @@ def create_app(config_name='default'):
     # Initialize rate limiting
     limiter.init_app(app)
     
+    # Initialize the password hashing pool
+    from .utils.password_hasher import password_hasher
+    password_hasher.init_app(app)
+    
+    # Initialize the AI job pool
+    from .utils.ai_jobs import ai_jobs
+    ai_jobs.init_app(app)
+    
+    # Initialize the AI response cache
+    from .utils.response_cache import response_cache
+    response_cache.init_app(app)
+    
+    # Initialize the conversation search index
+    from .utils.search_index import search_index
+    search_index.init_app(app)
+    
+    # Initialize background conversation titling
+    from .utils.auto_title import auto_titler
+    auto_titler.init_app(app)
+
+    # Initialize the cache behind JWT current_user lookups
+    from .utils.user_cache import user_cache
+    user_cache.init_app(app)
+    
     # Apply CORS middleware to all routes
     @app.before_request
     @handle_cors()
@@ -54,7 +79,7 @@ def create_app(config_name='default'):
                 "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
                 "allow_headers": ["Content-Type", "Authorization", "X-CSRFToken", "X-Requested-With"],
                 "supports_credentials": True,
-                "expose_headers": ["X-CSRFToken", "Content-Type", "Authorization"],
+                "expose_headers": ["X-CSRFToken", "Content-Type", "Authorization", "X-Next-Cursor"],
                 "max_age": 3600
             }
         },
@@ -73,7 +98,7 @@ def create_app(config_name='default'):
             
         # Always allow these headers
         response.headers['Access-Control-Allow-Credentials'] = 'true'
-        response.headers['Access-Control-Expose-Headers'] = 'X-CSRFToken, Content-Type, Authorization'
+        response.headers['Access-Control-Expose-Headers'] = 'X-CSRFToken, Content-Type, Authorization, X-Next-Cursor'
         
         # Handle preflight requests
         if request.method == 'OPTIONS':
@@ -124,6 +149,21 @@ def create_app(config_name='default'):
         return jsonify({
             'error': 'Token has been revoked'
         }), 401
+
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        from .models.revoked_token import RevokedToken
+        return RevokedToken.is_revoked(jwt_payload)
+
+    @jwt.user_lookup_loader
+    def load_current_user(jwt_header, jwt_payload):
+        return user_cache.load(jwt_payload['sub'])
+
+    @jwt.user_lookup_error_loader
+    def user_lookup_error_callback(jwt_header, jwt_payload):
+        return jsonify({
+            'error': 'User not found'
+        }), 401
     
 
     
@@ -134,14 +174,21 @@ def create_app(config_name='default'):
         from .routes.calendar import bp as calendar_bp
         from .routes.study import bp as study_bp
         from .routes.ai_routes import gemini_bp
+        from .routes.admin import bp as admin_bp
         
         app.register_blueprint(auth_bp)
         app.register_blueprint(tasks_bp)
         app.register_blueprint(calendar_bp)
         app.register_blueprint(study_bp)
         app.register_blueprint(gemini_bp)
+        app.register_blueprint(admin_bp)
         
         # Create database tables if they don't exist
         db.create_all()
+    
+    # Print import timings when started with STARTUP_REPORT=true
+    if import_timer.enabled:
+        import_timer.stop()
+        logger.info('Startup report:\n%s', import_timer.report())
         
     return app
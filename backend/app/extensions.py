@@ -2,12 +2,12 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+from .utils.limiter_storage import SQLiteStorage  # noqa: F401 - registers the sqlite:// limiter storage
 
 # Initialize extensions
 db = SQLAlchemy()
 jwt = JWTManager()
 limiter = Limiter(
     key_func=get_remote_address,
-    default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://"
-)
+    default_limits=["200 per day", "50 per hour"]
+)  # Storage comes from RATELIMIT_STORAGE_URI
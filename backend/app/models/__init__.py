@@ -3,5 +3,10 @@ from .task import Task
 from .calendar_event import CalendarEvent
 from .study_session import StudySession
 from .ai_conversation import AIConversation, AIMessage
+from .ai_message_archive import AIMessageArchive
+from .ai_job import AIJob
+from .ai_response_cache import AIResponseCache
+from .ai_usage import AIUsage
+from .revoked_token import RevokedToken
 
-__all__ = ['User', 'Task', 'CalendarEvent', 'StudySession', 'AIConversation', 'AIMessage']
+__all__ = ['User', 'Task', 'CalendarEvent', 'StudySession', 'AIConversation', 'AIMessage', 'AIMessageArchive', 'AIJob', 'AIResponseCache', 'AIUsage', 'RevokedToken']
@@ -1,11 +1,27 @@
 from datetime import datetime
 from app import db
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Index, and_, or_, event, select, update
 from sqlalchemy.orm import relationship
 from flask_jwt_extended import get_jwt_identity
+from app.models.ai_message_archive import AIMessageArchive
+from app.utils.compression import CompressedText
+
+# Characters of the latest message kept on the conversation for the sidebar
+PREVIEW_LENGTH = 120
+
+def make_preview(content):
+    """Collapse whitespace and truncate a message for last_message_preview"""
+    preview = ' '.join((content or '').split())
+    if len(preview) > PREVIEW_LENGTH:
+        preview = preview[:PREVIEW_LENGTH - 3].rstrip() + '...'
+    return preview
 
 class AIConversation(db.Model):
     __tablename__ = 'ai_conversation'
+    __table_args__ = (
+        # Keyset pagination of a user's conversations, most recent first
+        Index('ix_ai_conversation_user_updated', 'user_id', 'updated_at', 'id'),
+    )
     
     id = Column(Integer, primary_key=True)
     title = Column(String(100), nullable=False, default='New Conversation')
@@ -13,8 +29,16 @@ class AIConversation(db.Model):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     user_id = Column(Integer, ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     is_active = Column(Boolean, default=True)
+    # Rolling summary of messages that have left the context window
+    rolling_summary = Column(Text, nullable=True)
+    summarized_through_id = Column(Integer, default=0)  # Last AIMessage.id folded into rolling_summary
+    # Denormalized from ai_message by the listeners at the bottom of this module
+    message_count = Column(Integer, nullable=False, default=0)
+    last_message_at = Column(DateTime, nullable=True)
+    last_message_preview = Column(String(PREVIEW_LENGTH), nullable=True)
     
     messages = relationship('AIMessage', backref='conversation', lazy=True, cascade='all, delete-orphan')
+    archives = relationship('AIMessageArchive', backref='conversation', lazy=True, cascade='all, delete-orphan')
 
     def __init__(self, title='New Conversation', user_id=None, is_active=True):
         self.title = title
@@ -38,10 +62,16 @@ class AIConversation(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'user_id': self.user_id,
-            'is_active': self.is_active
+            'is_active': self.is_active,
+            'message_count': self.message_count or 0,
+            'last_message_at': self.last_message_at.isoformat() if self.last_message_at else None,
+            'last_message_preview': self.last_message_preview
         }
 
-    def to_dict_with_messages(self):
+    def to_dict_with_messages(self, messages=None):
+        """Serialize with messages - all of them unless a page of messages is passed"""
+        if messages is None:
+            messages = self.messages
         return {
             'id': self.id,
             'title': self.title,
@@ -49,7 +79,10 @@ class AIConversation(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'user_id': self.user_id,
             'is_active': self.is_active,
-            'messages': [message.to_dict() for message in self.messages] if self.messages else []
+            'message_count': self.message_count or 0,
+            'last_message_at': self.last_message_at.isoformat() if self.last_message_at else None,
+            'last_message_preview': self.last_message_preview,
+            'messages': [message.to_dict() for message in messages] if messages else []
         }
 
     @classmethod
@@ -62,6 +95,32 @@ class AIConversation(db.Model):
         """Get all conversations for a user, ordered by most recent"""
         return cls.query.filter_by(user_id=user_id).order_by(cls.updated_at.desc()).all()
 
+    @classmethod
+    def get_conversations_page(cls, user_id: int, limit: int, cursor: dict = None):
+        """Get one page of a user's conversations, most recent first.
+
+        Keyset pagination on (updated_at, id), so every page is a bounded
+        scan of the (user_id, updated_at, id) index however deep it is.
+        Returns the conversations and the cursor values for the next page
+        (None on the last page). Raises KeyError/ValueError for a bad cursor.
+        """
+        query = cls.query.filter_by(user_id=user_id)
+        if cursor:
+            updated_at = datetime.fromisoformat(cursor['updated_at'])
+            last_id = int(cursor['id'])
+            query = query.filter(or_(
+                cls.updated_at < updated_at,
+                and_(cls.updated_at == updated_at, cls.id < last_id)
+            ))
+        conversations = query.order_by(cls.updated_at.desc(), cls.id.desc()).limit(limit + 1).all()
+        
+        next_cursor = None
+        if len(conversations) > limit:
+            conversations = conversations[:limit]
+            last = conversations[-1]
+            next_cursor = {'updated_at': last.updated_at, 'id': last.id}
+        return conversations, next_cursor
+
     @classmethod
     def deactivate_conversation(cls, conversation_id: int):
         """Deactivate a conversation"""
@@ -97,11 +156,15 @@ class AIConversation(db.Model):
 
 class AIMessage(db.Model):
     __tablename__ = 'ai_message'
+    __table_args__ = (
+        # Newest-first message windows within a conversation
+        Index('ix_ai_message_conversation_created', 'conversation_id', 'created_at'),
+    )
     
     id = Column(Integer, primary_key=True)
     conversation_id = Column(Integer, ForeignKey('ai_conversation.id'), nullable=False)
     role = Column(String(20), nullable=False)  # 'user' or 'assistant'
-    content = Column(Text, nullable=False)
+    content = Column(CompressedText, nullable=False)  # Long replies are compressed when AI_COMPRESS_MESSAGES is on
     created_at = Column(DateTime, default=datetime.utcnow)
 
     def __init__(self, conversation_id, role, content):
@@ -117,4 +180,108 @@ class AIMessage(db.Model):
             'role': self.role,
             'content': self.content,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-        }
\ No newline at end of file
+        }
+
+    @classmethod
+    def get_page(cls, conversation_id: int, limit: int, before: dict = None):
+        """Get the newest ``limit`` messages of a conversation older than ``before``.
+
+        Messages are returned oldest first, with the cursor values to load
+        the page before them (None once the start is reached). Raises
+        KeyError/ValueError for a bad cursor.
+        """
+        query = cls.query.filter_by(conversation_id=conversation_id)
+        if before:
+            created_at = datetime.fromisoformat(before['created_at'])
+            first_id = int(before['id'])
+            query = query.filter(or_(
+                cls.created_at < created_at,
+                and_(cls.created_at == created_at, cls.id < first_id)
+            ))
+        messages = query.order_by(cls.created_at.desc(), cls.id.desc()).limit(limit + 1).all()
+        if len(messages) <= limit:
+            # The rest of the history may have been moved to ai_message_archive
+            if messages:
+                older_than = (messages[-1].created_at, messages[-1].id)
+            elif before:
+                older_than = (created_at, first_id)
+            else:
+                older_than = None
+            messages.extend(cls.get_archived(conversation_id, limit + 1 - len(messages), older_than))
+        
+        before_cursor = None
+        if len(messages) > limit:
+            messages = messages[:limit]
+            oldest = messages[-1]
+            before_cursor = {'created_at': oldest.created_at, 'id': oldest.id}
+        messages.reverse()
+        return messages, before_cursor
+
+    @classmethod
+    def get_archived(cls, conversation_id: int, limit: int, older_than: tuple = None):
+        """Get up to ``limit`` archived messages, newest first, older than (created_at, id).
+
+        Only the archive rows that can hold such messages are decompressed.
+        The messages are detached AIMessage instances, read-only.
+        """
+        query = AIMessageArchive.query.filter_by(conversation_id=conversation_id)
+        if older_than:
+            query = query.filter(AIMessageArchive.first_message_at <= older_than[0])
+        archives = query.order_by(AIMessageArchive.last_message_at.desc(), AIMessageArchive.id.desc())
+        
+        found = []
+        for archive in archives:
+            for entry in reversed(archive.unpack()):
+                message = cls.from_archive(conversation_id, entry)
+                if older_than and (message.created_at, message.id) >= older_than:
+                    continue
+                found.append(message)
+                if len(found) >= limit:
+                    return found
+        return found
+
+    @classmethod
+    def from_archive(cls, conversation_id: int, entry: dict):
+        """Rebuild a (transient) message from an AIMessageArchive entry"""
+        message = cls(conversation_id, entry['role'], entry['content'])
+        message.id = entry['id']
+        message.created_at = datetime.fromisoformat(entry['created_at']) if entry['created_at'] else None
+        return message
+
+# Keep the conversation summary columns in step with its messages. These run
+# inside the flush, so the counters commit (or roll back) with the messages.
+conversation_table = AIConversation.__table__
+
+@event.listens_for(AIMessage, 'after_insert')
+def update_summary_after_insert(mapper, connection, target):
+    connection.execute(
+        update(conversation_table)
+        .where(conversation_table.c.id == target.conversation_id)
+        .values(
+            message_count=conversation_table.c.message_count + 1,
+            last_message_at=target.created_at,
+            last_message_preview=make_preview(target.content),
+            # Adding a message is not an edit of the conversation itself
+            updated_at=conversation_table.c.updated_at
+        )
+    )
+
+@event.listens_for(AIMessage, 'after_delete')
+def update_summary_after_delete(mapper, connection, target):
+    message_table = AIMessage.__table__
+    latest = connection.execute(
+        select(message_table.c.created_at, message_table.c.content)
+        .where(message_table.c.conversation_id == target.conversation_id)
+        .order_by(message_table.c.created_at.desc(), message_table.c.id.desc())
+        .limit(1)
+    ).first()
+    connection.execute(
+        update(conversation_table)
+        .where(conversation_table.c.id == target.conversation_id)
+        .values(
+            message_count=conversation_table.c.message_count - 1,
+            last_message_at=latest.created_at if latest else None,
+            last_message_preview=make_preview(latest.content) if latest else None,
+            updated_at=conversation_table.c.updated_at
+        )
+    )
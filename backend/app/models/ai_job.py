@@ -0,0 +1,35 @@
+from datetime import datetime
+from app import db
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+
+class AIJob(db.Model):
+    __tablename__ = 'ai_job'
+    
+    # Final states - a job in one of these will not change again
+    FINISHED = ('completed', 'failed', 'timed_out')
+    
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
+    conversation_id = Column(Integer, ForeignKey('ai_conversation.id', ondelete='CASCADE'), nullable=True)
+    status = Column(String(20), nullable=False, default='pending')  # pending, completed, failed, timed_out
+    prompt = Column(Text, nullable=False)
+    response = Column(Text)
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    deadline = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime)
+
+    @property
+    def is_finished(self):
+        return self.status in self.FINISHED
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'conversation_id': self.conversation_id,
+            'response': self.response,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
@@ -0,0 +1,47 @@
+import json
+from datetime import datetime
+from app import db
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, LargeBinary
+from app.utils.compression import compress, decompress
+
+class AIMessageArchive(db.Model):
+    """A compressed run of messages moved out of ai_message.
+
+    Each row holds one conversation's archived messages as a compressed
+    JSON list; a conversation gains another row each time it is archived.
+    """
+    __tablename__ = 'ai_message_archive'
+    
+    id = Column(Integer, primary_key=True)
+    conversation_id = Column(Integer, ForeignKey('ai_conversation.id', ondelete='CASCADE'), nullable=False, index=True)
+    codec = Column(String(10), nullable=False, default='zlib')
+    message_count = Column(Integer, nullable=False)
+    first_message_at = Column(DateTime, nullable=False)
+    last_message_at = Column(DateTime, nullable=False)
+    raw_size = Column(Integer, nullable=False)  # Bytes before compression
+    data = Column(LargeBinary, nullable=False)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    @classmethod
+    def pack(cls, conversation_id, messages, codec='zlib'):
+        """Build an archive row from AIMessage rows in chronological order"""
+        raw = json.dumps([{
+            'id': message.id,
+            'role': message.role,
+            'content': message.content,
+            'created_at': message.created_at.isoformat() if message.created_at else None
+        } for message in messages], separators=(',', ':')).encode('utf-8')
+        return cls(
+            conversation_id=conversation_id,
+            codec=codec,
+            message_count=len(messages),
+            first_message_at=messages[0].created_at,
+            last_message_at=messages[-1].created_at,
+            raw_size=len(raw),
+            data=compress(raw, codec),
+            archived_at=datetime.utcnow()
+        )
+
+    def unpack(self):
+        """The archived messages as dicts, oldest first"""
+        return json.loads(decompress(self.data, self.codec).decode('utf-8'))
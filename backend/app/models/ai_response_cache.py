@@ -0,0 +1,13 @@
+from datetime import datetime
+from app import db
+from sqlalchemy import Column, Integer, String, DateTime, Text
+
+class AIResponseCache(db.Model):
+    __tablename__ = 'ai_response_cache'
+    
+    key = Column(String(64), primary_key=True)  # SHA-256 of the normalized prompt, context and model config
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    last_hit_at = Column(DateTime, default=datetime.utcnow, index=True)
+    hit_count = Column(Integer, default=0)
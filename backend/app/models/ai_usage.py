@@ -0,0 +1,53 @@
+from datetime import date, datetime
+from app import db
+from sqlalchemy import Column, Integer, Date, ForeignKey, UniqueConstraint, func
+from sqlalchemy.exc import IntegrityError
+
+class AIUsage(db.Model):
+    """Estimated LLM tokens used by a user on one (UTC) day"""
+    __tablename__ = 'ai_usage'
+    __table_args__ = (
+        UniqueConstraint('user_id', 'day', name='uq_ai_usage_user_day'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    day = Column(Date, nullable=False)
+    requests = Column(Integer, nullable=False, default=0)
+    input_tokens = Column(Integer, nullable=False, default=0)
+    output_tokens = Column(Integer, nullable=False, default=0)
+
+    @classmethod
+    def record(cls, user_id: int, input_tokens: int, output_tokens: int, day: date = None):
+        """Add one model call to the user's daily row (caller commits).
+
+        Increments in SQL so concurrent requests don't lose updates; the
+        day's first call inserts the row inside a savepoint and falls back
+        to the update if another request got there first.
+        """
+        day = day or datetime.utcnow().date()
+        values = {
+            cls.requests: cls.requests + 1,
+            cls.input_tokens: cls.input_tokens + input_tokens,
+            cls.output_tokens: cls.output_tokens + output_tokens
+        }
+        if cls.query.filter_by(user_id=user_id, day=day).update(values, synchronize_session=False):
+            return
+        try:
+            with db.session.begin_nested():
+                db.session.add(cls(
+                    user_id=user_id, day=day, requests=1,
+                    input_tokens=input_tokens, output_tokens=output_tokens
+                ))
+        except IntegrityError:
+            cls.query.filter_by(user_id=user_id, day=day).update(values, synchronize_session=False)
+
+    @classmethod
+    def totals(cls, user_id: int, since: date):
+        """Sum of (requests, input_tokens, output_tokens) from ``since`` onwards"""
+        row = db.session.query(
+            func.coalesce(func.sum(cls.requests), 0),
+            func.coalesce(func.sum(cls.input_tokens), 0),
+            func.coalesce(func.sum(cls.output_tokens), 0)
+        ).filter(cls.user_id == user_id, cls.day >= since).one()
+        return tuple(int(value) for value in row)
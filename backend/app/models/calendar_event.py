@@ -1,7 +1,11 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlalchemy import literal, null, select, union_all
 from app import db
 
 class CalendarEvent(db.Model):
+    # Length of the "Todo" event that mirrors a task's due date
+    TODO_DURATION = timedelta(hours=1)
+    
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
@@ -13,7 +17,74 @@ class CalendarEvent(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        # Range reads of a user's calendar
+        db.Index('ix_calendar_event_user_start', 'user_id', 'start_time'),
+    )
     
+    @classmethod
+    def get_range(cls, user_id: int, start: datetime = None, end: datetime = None,
+                  virtual_todos: bool = False):
+        """A user's events overlapping [start, end), as dicts ordered by start time.
+
+        With ``virtual_todos`` the Todo events of tasks with a due date are
+        derived from the tasks rather than read from stored rows, in the
+        same query (a UNION ALL of both tables). They carry a ``task-<id>``
+        id, their ``task_id`` and ``virtual: true``; edit them through
+        /api/tasks.
+        """
+        from app.models.task import Task
+        
+        events = select(
+            cls.id, cls.title, cls.description, cls.start_time, cls.end_time, cls.category,
+            cls.location, cls.user_id, cls.created_at, cls.updated_at, null().label('task_id')
+        ).where(cls.user_id == user_id)
+        if start:
+            events = events.where(cls.end_time > start)
+        if end:
+            events = events.where(cls.start_time < end)
+        query = events
+        
+        if virtual_todos:
+            todos = select(
+                Task.id, Task.title, Task.description, Task.due_date, Task.due_date, literal('Todo'),
+                literal(''), Task.user_id, Task.created_at, Task.updated_at, Task.id
+            ).where(Task.user_id == user_id, Task.due_date.isnot(None))
+            if start:
+                todos = todos.where(Task.due_date > start - cls.TODO_DURATION)
+            if end:
+                todos = todos.where(Task.due_date < end)
+            query = union_all(events, todos)
+        
+        rows = db.session.execute(query.order_by(query.selected_columns[3])).all()
+        return [cls.row_to_dict(row) for row in rows]
+
+    @classmethod
+    def row_to_dict(cls, row):
+        """Serialize a get_range row like to_dict, deriving the end of virtual Todo events"""
+        (event_id, title, description, start_time, end_time, category, location,
+         user_id, created_at, updated_at, task_id) = row
+        event = {
+            'id': event_id,
+            'title': title or "Untitled Event",
+            'description': description or "",
+            'start': start_time.isoformat() if start_time else None,
+            'end': end_time.isoformat() if end_time else None,
+            'user_id': user_id,
+            'created_at': created_at.isoformat() if created_at else None,
+            'updated_at': updated_at.isoformat() if updated_at else None,
+            'category': category or "Other",
+            'location': location or "",
+        }
+        if task_id is not None:
+            event.update({
+                'id': f"task-{task_id}",
+                'end': (start_time + cls.TODO_DURATION).isoformat(),
+                'task_id': task_id,
+                'virtual': True
+            })
+        return event
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -0,0 +1,68 @@
+from datetime import datetime
+from flask import current_app
+from app import db
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.exc import IntegrityError
+
+class RevokedToken(db.Model):
+    """Revoked refresh tokens, and token families revoked after a replayed token.
+
+    Every refresh token carries a ``family`` claim shared by all the tokens
+    rotated from one login. Rows are kept until the token they cover would
+    have expired anyway.
+    """
+    __tablename__ = 'revoked_token'
+
+    jti = Column(String(64), primary_key=True)  # Token jti, or the family id for kind 'family'
+    kind = Column(String(10), nullable=False, default='token')  # 'token' or 'family'
+    user_id = Column(Integer, nullable=True)
+    revoked_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    # Expired rows are purged every this many revocations
+    PURGE_EVERY = 100
+    _revocations = 0
+
+    @classmethod
+    def revoke(cls, jti: str, expires_at: datetime, user_id: int = None, kind: str = 'token'):
+        """Revoke a token (or family) and commit; returns False if it was already revoked"""
+        try:
+            db.session.add(cls(jti=jti, kind=kind, user_id=user_id, expires_at=expires_at))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return False
+
+        cls._revocations += 1
+        if cls._revocations % cls.PURGE_EVERY == 0:
+            cls.query.filter(cls.expires_at < datetime.utcnow()).delete(synchronize_session=False)
+            db.session.commit()
+        return True
+
+    @classmethod
+    def revoke_family(cls, family: str, user_id: int = None):
+        """Revoke every refresh token rotated from one login"""
+        # Tokens rotated later in the family expire later, so keep the row
+        # for a full refresh token lifetime from now
+        expires_at = datetime.utcnow() + current_app.config['JWT_REFRESH_TOKEN_EXPIRES']
+        return cls.revoke(family, expires_at, user_id=user_id, kind='family')
+
+    @classmethod
+    def is_revoked(cls, jwt_payload: dict) -> bool:
+        """Check a decoded refresh token against the revocation list.
+
+        A refresh token that was already rotated being presented again means
+        it leaked, so its whole family is revoked. Access tokens are
+        short-lived and never checked, to keep ordinary requests query-free.
+        """
+        if jwt_payload.get('type') != 'refresh':
+            return False
+        family = jwt_payload.get('family')
+        keys = [jwt_payload['jti']] + ([family] if family else [])
+        revoked = {row.jti: row.kind for row in cls.query.filter(cls.jti.in_(keys))}
+        if not revoked:
+            return False
+        if family and family not in revoked:
+            # A rotated token was replayed
+            cls.revoke_family(family, user_id=int(jwt_payload['sub']))
+        return True
@@ -1,7 +1,14 @@
 from datetime import datetime
+from sqlalchemy import and_, or_
 from app import db
 
 class Task(db.Model):
+    __table_args__ = (
+        # Open/completed tasks by due date, e.g. the dashboard's "due this week"
+        db.Index('ix_task_user_completed_due', 'user_id', 'completed', 'due_date'),
+        db.Index('ix_task_user_priority', 'user_id', 'priority'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
@@ -13,6 +20,90 @@ class Task(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # The "Todo" event mirroring the due date; assigning a new one links it on flush
+    calendar_event = db.relationship('CalendarEvent', foreign_keys=[calendar_event_id])
+    
+    # Orders accepted by get_page: sort column (None for id order) and direction
+    SORTS = {
+        'created': (None, False),
+        '-created': (None, True),
+        'due_date': ('due_date', False),
+        '-due_date': ('due_date', True),
+        'priority': ('priority', False),
+        '-priority': ('priority', True)
+    }
+
+    @classmethod
+    def get_page(cls, user_id: int, limit: int, sort: str = 'created', cursor: dict = None,
+                 completed: bool = None, priorities: list = None, due_after: datetime = None,
+                 due_before: datetime = None):
+        """Get one filtered page of a user's tasks.
+
+        Keyset pagination on (sort column, id), so with the filters an index
+        covers - e.g. open tasks due in a date range, by due date - every
+        page is a bounded range scan of (user_id, completed, due_date).
+        Tasks without a due date sort after the rest either way. Returns the
+        tasks and the cursor values for the next page (None on the last
+        page). Raises KeyError/ValueError for a malformed cursor.
+        """
+        column_name, descending = cls.SORTS[sort]
+        query = cls.query.filter(cls.user_id == user_id)
+        if completed is not None:
+            query = query.filter(cls.completed == completed)
+        if priorities:
+            query = query.filter(cls.priority.in_(priorities))
+        if due_after:
+            query = query.filter(cls.due_date >= due_after)
+        if due_before:
+            query = query.filter(cls.due_date < due_before)
+
+        column = getattr(cls, column_name) if column_name else None
+        # Only due dates are left unset in practice; a range filter rules that out
+        nulls = column_name == 'due_date' and not (due_after or due_before)
+
+        if cursor:
+            if cursor.get('sort') != sort:
+                raise ValueError('Cursor is for another sort order')
+            last_id = cursor['id']
+            # Cursors come back from clients, so check every field's type
+            if not isinstance(last_id, int) or isinstance(last_id, bool):
+                raise ValueError('Cursor id must be an integer')
+            after_id = cls.id < last_id if descending else cls.id > last_id
+            if column is None:
+                query = query.filter(after_id)
+            elif nulls and cursor['value'] is None:
+                query = query.filter(column.is_(None), after_id)
+            else:
+                value = cursor['value']
+                if column_name == 'due_date':
+                    if not isinstance(value, str):
+                        raise ValueError('Cursor due date must be an ISO string')
+                    value = datetime.fromisoformat(value)
+                elif not isinstance(value, int) or isinstance(value, bool):
+                    raise ValueError('Cursor value must be an integer')
+                after_value = column < value if descending else column > value
+                keyset = or_(after_value, and_(column == value, after_id))
+                query = query.filter(or_(keyset, column.is_(None)) if nulls else keyset)
+
+        order = []
+        if nulls:
+            order.append(column.is_(None))
+        if column is not None:
+            order.append(column.desc() if descending else column)
+        order.append(cls.id.desc() if descending else cls.id)
+        tasks = query.order_by(*order).limit(limit + 1).all()
+
+        next_cursor = None
+        if len(tasks) > limit:
+            tasks = tasks[:limit]
+            last = tasks[-1]
+            next_cursor = {
+                'sort': sort,
+                'value': getattr(last, column_name) if column_name else None,
+                'id': last.id
+            }
+        return tasks, next_cursor
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -1,6 +1,5 @@
 from datetime import datetime
 from app.extensions import db
-import bcrypt
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -9,6 +8,7 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     study_time = db.Column(db.Integer, default=0)  # Total study time in minutes
     game_time = db.Column(db.Integer, default=0)   # Available game time in minutes
+    is_admin = db.Column(db.Boolean, nullable=False, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -18,15 +18,20 @@ class User(db.Model):
     
     @staticmethod
     def generate_password_hash(password):
+        """Hash on the password pool; raises HasherBusy when it is saturated"""
+        # Imported here since app.utils imports this module
+        from app.utils.password_hasher import password_hasher
         if isinstance(password, str):
             password = password.encode('utf-8')
-        return bcrypt.hashpw(password, bcrypt.gensalt())
+        return password_hasher.hash(password)
 
     @staticmethod
     def check_password_hash(password_hash, password):
+        """Verify on the password pool; raises HasherBusy when it is saturated"""
+        from app.utils.password_hasher import password_hasher
         if isinstance(password, str):
             password = password.encode('utf-8')
-        return bcrypt.checkpw(password, password_hash)
+        return password_hasher.verify(password, password_hash)
 
     @classmethod
     def create(cls, username, email, password):
@@ -57,6 +62,7 @@ class User(db.Model):
             'email': self.email,
             'study_time': self.study_time,
             'game_time': self.game_time,
+            'is_admin': bool(self.is_admin),
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
     
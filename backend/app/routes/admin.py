@@ -0,0 +1,36 @@
+import io
+import logging
+from flask import Blueprint, request, jsonify, current_app
+from app.utils import admin_required
+from app.utils.user_import import IMPORT_FORMATS, import_users, read_rows
+
+bp = Blueprint('admin', __name__, url_prefix='/api/admin')
+
+logger = logging.getLogger(__name__)
+
+@bp.route('/users/import', methods=['POST'])
+@admin_required()
+def import_users_route():
+    """Bulk-create users from a CSV (header: username,email,password) or JSONL request body.
+
+    The format is taken from ?format=, else from the Content-Type. Pass
+    ?dry_run=true to only validate. Responds with counts, per-row errors
+    and throughput once the whole body has been processed.
+    """
+    try:
+        fmt = request.args.get('format')
+        if not fmt:
+            fmt = 'csv' if request.mimetype in ('text/csv', 'application/csv') else 'jsonl'
+        if fmt not in IMPORT_FORMATS:
+            return jsonify({'error': f"format must be one of: {', '.join(IMPORT_FORMATS)}"}), 400
+        dry_run = request.args.get('dry_run', 'false').lower() == 'true'
+
+        # Read the body as a stream so large rosters aren't buffered whole
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+        stats = import_users(read_rows(stream, fmt), current_app.config, dry_run=dry_run, in_request=True)
+        return jsonify(stats), 200
+    except UnicodeDecodeError:
+        return jsonify({'error': 'Body must be UTF-8 text'}), 400
+    except Exception as e:
+        logger.error(f"Error importing users: {str(e)}")
+        return jsonify({'error': str(e)}), 500
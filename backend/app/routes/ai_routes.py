@@ -1,15 +1,29 @@
-from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity, current_user
 from flask_limiter.util import get_remote_address
 from app.extensions import limiter
-from app.utils.gemini import GeminiAPI
+from app.utils.gemini import get_gemini_api, gemini_api_initialized, ai_config
+from app.utils.ai_jobs import ai_jobs, AIJobQueueFull
+from app.utils.ai_context import build_history_context
+from app.utils.response_cache import response_cache
+from app.utils.resilience import CircuitOpenError
+from app.utils.search_index import search_index
+from app.utils.ai_usage import QuotaExceeded, check_quota, estimate_call_cost, get_usage, record_usage
+from app.utils.fair_scheduler import SchedulerBusy, get_scheduler
+from app.utils.transcript import EXPORT_FORMATS, export_transcript, iter_conversations
+from app.utils.auto_title import auto_titler
 from app.models.ai_conversation import AIConversation, AIMessage
 from app.utils.sanitize import sanitize_text, sanitize_html
+from app.utils.helpers import encode_cursor, decode_cursor, parse_limit
+from app.utils import admin_required
 from app import db
+from concurrent.futures import ThreadPoolExecutor
+import html
+import json
 import logging
+import time
 
 gemini_bp = Blueprint('gemini', __name__, url_prefix='/api/gemini')
-gemini_api = GeminiAPI()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -20,11 +34,284 @@ def get_user_identifier():
     except:
         return request.remote_addr
 
-@limiter.limit("10 per minute", key_func=get_user_identifier)
+def build_context(conversation, context, prompt):
+    """Build the prompt context for a conversation turn.
+
+    Uses the client-provided context if available, otherwise a token-budgeted
+    window of recent history plus the rolling summary, then appends the
+    current prompt. ``context`` and ``prompt`` are already sanitized.
+    """
+    if not context:
+        context = build_history_context(conversation, prompt)
+    
+    # Add current prompt to context
+    return f"{context}\nuser: {prompt}"
+
+def prepare_generation():
+    """Validate a generate request and load (or create) its conversation.
+
+    Returns ``((user_id, prompt, conversation, context), None)`` on success
+    or ``(None, error_response)`` if the request should be rejected.
+    """
+    data = request.get_json()
+    if not data:
+        return None, (jsonify({'error': 'No data provided'}), 400)
+        
+    prompt = data.get('prompt')
+    if not prompt or not isinstance(prompt, str):
+        return None, (jsonify({'error': 'Valid prompt is required'}), 400)
+        
+    # Sanitize the prompt
+    prompt = sanitize_text(prompt)[:2000]  # Limit prompt length
+    
+    conversation_id = data.get('conversation_id')
+    context = data.get('context', '')  # Optional context from previous messages
+    
+    if context and isinstance(context, str):
+        context = sanitize_text(context)[:4000]  # Limit context length
+        
+    user_id = current_user.id
+        
+    try:
+        check_quota(user_id)
+    except QuotaExceeded as e:
+        return None, quota_exceeded(e)
+        
+    # Get or create conversation
+    if conversation_id:
+        conversation = AIConversation.get_conversation(conversation_id, user_id)
+        if not conversation:
+            return None, (jsonify({'error': 'Conversation not found'}), 404)
+    else:
+        conversation = AIConversation.create_conversation(user_id)
+        
+    context = build_context(conversation, context, prompt)
+    return (user_id, prompt, conversation, context), None
+
+def store_exchange(conversation_id, prompt, response, sanitized=False):
+    """Add the user prompt and assistant reply to the session (caller commits).
+
+    The prompt was sanitized on the way in; the reply is sanitized here, once,
+    unless it is ``sanitized`` already (e.g. an answer reused from history).
+    """
+    user_message = AIMessage(
+        conversation_id=conversation_id,
+        role='user',
+        content=prompt
+    )
+    assistant_message = AIMessage(
+        conversation_id=conversation_id,
+        role='assistant',
+        content=response if sanitized else sanitize_text(response)
+    )
+    db.session.add(user_message)
+    db.session.add(assistant_message)
+    auto_titler.mark(conversation_id)
+    return user_message, assistant_message
+
+def cache_bypassed():
+    """A request opts out of cached responses with ``"cache": false`` or ``Cache-Control: no-cache``"""
+    data = request.get_json(silent=True) or {}
+    return data.get('cache') is False or 'no-cache' in request.headers.get('Cache-Control', '')
+
+def get_cache_key(context, prompt):
+    """Return the response cache key, or None if this prompt should not be cached"""
+    if not response_cache.is_cacheable(context, prompt):
+        return None
+    return response_cache.make_key(context, get_gemini_api().fingerprint)
+
+def generate_cached(user_id, context, prompt, bypass=False):
+    """Generate a response, serving and filling the response cache.
+
+    Bypassing skips the lookup but still refreshes the cached entry. Cache
+    misses queue for an upstream slot and are recorded against the user's
+    token usage; only the call that goes upstream holds the slot, not
+    requests coalesced onto it. Returns ``(response, cached)``.
+    """
+    cache_key = get_cache_key(context, prompt)
+    if cache_key and not bypass:
+        response = response_cache.get(cache_key)
+        if response is not None:
+            return response, True
+    elif cache_key:
+        response_cache.record_bypass()
+    
+    cost = estimate_call_cost(context)
+    response = get_gemini_api().generate_response(
+        context, slot=lambda: get_scheduler().slot(user_id, cost)
+    )
+    record_usage(user_id, context, response)
+    if cache_key:
+        response_cache.set(cache_key, response)
+    return response, False
+
+def load_search_results(user_id, hits):
+    """Load search hits as result dicts, dropping messages deleted or archived since indexing.
+
+    A hit on a question carries the assistant reply that followed it.
+    """
+    messages = {message.id: message for message in AIMessage.query.filter(
+        AIMessage.id.in_([message_id for message_id, _ in hits])
+    )}
+    titles = dict(db.session.query(AIConversation.id, AIConversation.title).filter(
+        AIConversation.id.in_({message.conversation_id for message in messages.values()}),
+        AIConversation.user_id == user_id
+    ))
+    
+    results = []
+    for message_id, score in hits:
+        message = messages.get(message_id)
+        if message is None or message.conversation_id not in titles:
+            continue
+        answer = None
+        if message.role == 'user':
+            answer = AIMessage.query.filter(
+                AIMessage.conversation_id == message.conversation_id,
+                AIMessage.id > message.id,
+                AIMessage.role == 'assistant'
+            ).order_by(AIMessage.id).first()
+        results.append({
+            'score': round(score, 4),
+            'conversation_title': titles[message.conversation_id],
+            'message': message.to_dict(),
+            'answer': answer.to_dict() if answer else None
+        })
+    return results
+
+def find_previous_answer(user_id, prompt):
+    """Return an earlier answer to a near-identical question, if reuse is enabled.
+
+    Only questions scoring at least AI_SEARCH_REUSE_THRESHOLD (cosine
+    similarity; 0 disables reuse) are considered.
+    """
+    threshold = current_app.config.get('AI_SEARCH_REUSE_THRESHOLD', 0)
+    if threshold <= 0:
+        return None
+    hits = [hit for hit in search_index.search(user_id, prompt, k=3, role='user') if hit[1] >= threshold]
+    for result in load_search_results(user_id, hits):
+        if result['answer']:
+            return result
+    return None
+
+def run_generation(context, config, user_id=None):
+    """Generate a response off the request thread (used by the AI job pool).
+
+    Takes the AI config explicitly since pool workers have no app context;
+    in process mode each worker process builds its own client and
+    scheduler from it.
+    """
+    cost = estimate_call_cost(context, config)
+    return get_gemini_api(config).generate_response(
+        context, slot=lambda: get_scheduler(config).slot(user_id, cost)
+    )
+
+def ai_disabled():
+    """503 response for generation endpoints when AI_ENABLED is off"""
+    return jsonify({'error': 'AI features are disabled on this server'}), 503
+
+def service_unavailable(retry_after):
+    """503 response telling the client when the AI service may be back"""
+    response = jsonify({'error': 'AI service is temporarily unavailable, please try again shortly'})
+    response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+    return response, 503
+
+def batch_size():
+    """Rate-limit cost of a batch request: one per prompt"""
+    data = request.get_json(silent=True) or {}
+    prompts = data.get('prompts')
+    return max(1, len(prompts)) if isinstance(prompts, list) else 1
+
+def prepare_batch_item(user_id, item):
+    """Validate one batch item and load its conversation, or start a new one.
+
+    A new conversation is not added to the session here, so an item that
+    fails leaves nothing behind; see store_batch_results. Returns
+    ``((prompt, conversation, context), None)`` or ``(None, error message)``.
+    """
+    if isinstance(item, str):
+        item = {'prompt': item}
+    if not isinstance(item, dict):
+        return None, 'Each item must be a prompt or an object with a prompt'
+    prompt = item.get('prompt')
+    if not prompt or not isinstance(prompt, str):
+        return None, 'Valid prompt is required'
+    prompt = sanitize_text(prompt)[:2000]  # Limit prompt length
+    
+    conversation_id = item.get('conversation_id')
+    if conversation_id:
+        conversation = AIConversation.get_conversation(conversation_id, user_id)
+        if not conversation:
+            return None, 'Conversation not found'
+    else:
+        conversation = AIConversation(user_id=user_id)
+        
+    return (prompt, conversation, build_context(conversation, '', prompt)), None
+
+def store_batch_results(items):
+    """Add the exchanges of batch items that got a response (caller commits).
+
+    New conversations are only created for those items.
+    """
+    answered = [item for item in items if item['response'] is not None]
+    new_conversations = [item['conversation'] for item in answered if item['conversation'].id is None]
+    if new_conversations:
+        db.session.add_all(new_conversations)
+        db.session.flush()  # Assign ids; committed with the messages
+    for item in answered:
+        store_exchange(item['conversation'].id, item['prompt'], item['response'])
+
+def quota_exceeded(e):
+    """429 response for a user over their token quota, retryable once it resets"""
+    response = jsonify({'error': str(e), 'period': e.period, 'quota': e.quota})
+    response.headers['Retry-After'] = str(max(1, int(e.retry_after + 0.999)))
+    return response, 429
+
+def get_conversations_page(user_id):
+    """Load the page of conversations selected by the ``limit`` and ``cursor`` query args.
+
+    Returns ``((conversations, next_cursor), None)`` or ``(None, error_response)``.
+    """
+    limit = parse_limit(
+        request.args.get('limit', type=int),
+        current_app.config['AI_CONVERSATION_PAGE_SIZE'],
+        current_app.config['AI_MAX_PAGE_SIZE']
+    )
+    cursor = request.args.get('cursor')
+    cursor_values = decode_cursor(cursor)
+    if cursor and cursor_values is None:
+        return None, (jsonify({'error': 'Invalid cursor'}), 400)
+    try:
+        conversations, next_values = AIConversation.get_conversations_page(user_id, limit, cursor_values)
+    except (KeyError, ValueError):
+        return None, (jsonify({'error': 'Invalid cursor'}), 400)
+    return (conversations, encode_cursor(next_values) if next_values else None), None
+
+def transcript_response(conversations, filename):
+    """Stream a transcript in the ``format`` query arg (ndjson, markdown or text)"""
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    
+    transcript = export_transcript(conversations, export_format, current_app.config['AI_EXPORT_CHUNK_SIZE'])
+    response = Response(stream_with_context(transcript), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}.{extension}"'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response, 200
+
+def format_sse(event, data):
+    """Format a Server-Sent Events message with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @gemini_bp.route('/generate', methods=['POST'])
 @jwt_required()
+@limiter.limit("10 per minute", key_func=get_user_identifier)
 def generate_response():
+    started = time.perf_counter()
     try:
+        if not current_app.config['AI_ENABLED']:
+            return ai_disabled()
+            
         data = request.get_json()
         if not data:
             return jsonify({'error': 'No data provided'}), 400
@@ -42,15 +329,12 @@ def generate_response():
         if context and isinstance(context, str):
             context = sanitize_text(context)[:4000]  # Limit context length
             
-        # Get user_id from JWT
-        user_id = get_jwt_identity()
-        if not user_id:
-            return jsonify({'error': 'Authentication required'}), 401
+        user_id = current_user.id
             
         try:
-            user_id = int(user_id)
-        except (ValueError, TypeError) as e:
-            return jsonify({'error': f'Invalid user ID: {str(e)}'}), 401
+            check_quota(user_id)
+        except QuotaExceeded as e:
+            return quota_exceeded(e)
             
         # Get or create conversation
         conversation = None
@@ -61,51 +345,53 @@ def generate_response():
         else:
             conversation = AIConversation.create_conversation(user_id)
             
-        # Build context from conversation history
-        # Use provided context if available, otherwise build from conversation history
-        if not context:
-            context_parts = []
-            for message in conversation.messages:
-                if message.role and message.content:
-                    # Sanitize existing messages when building context
-                    role = sanitize_text(message.role)
-                    content = sanitize_text(message.content)
-                    context_parts.append(f"{role}: {content}")
-            context = "\n".join(context_parts)
-        
-        # Add current prompt to context with sanitization
-        context = f"{context}\nuser: {sanitize_text(prompt)}"
+        context = build_context(conversation, context, prompt)
+        
+        # A standalone question asked before can be answered from history
+        reused = None
+        if not conversation_id and not data.get('context') and not cache_bypassed():
+            reused = find_previous_answer(user_id, prompt)
         
         # Generate response
-        response = gemini_api.generate_response(context)
+        model_started = time.perf_counter()
+        if reused:
+            # Stored content is already escaped: keep it as-is, and return it as the model wrote it
+            stored_response = reused['answer']['content']
+            response, cached = html.unescape(stored_response), True
+        else:
+            response, cached = generate_cached(user_id, context, prompt, bypass=cache_bypassed())
+            stored_response = response
+        model_ms = (time.perf_counter() - model_started) * 1000
         
         # Store messages
-        user_message = AIMessage(
-            conversation_id=conversation.id,
-            role='user',
-            content=sanitize_text(prompt)
-        )
-        db.session.add(user_message)
-        
-        assistant_message = AIMessage(
-            conversation_id=conversation.id,
-            role='assistant',
-            content=sanitize_text(response)
-        )
-        db.session.add(assistant_message)
-        
+        store_exchange(conversation.id, prompt, stored_response, sanitized=bool(reused))
         db.session.commit()
         
-        return jsonify({
+        result = jsonify({
             'response': response,
             'conversation_id': conversation.id,
             'history': [
                 {'role': 'user', 'content': prompt},
                 {'role': 'assistant', 'content': response}
             ],
-            'context': context  # Return the context for future messages
-        }), 200
+            'context': context,  # Return the context for future messages
+            'cached': cached,
+            # The earlier answer served instead of calling the model, if any
+            'reused_from': {
+                'conversation_id': reused['answer']['conversation_id'],
+                'message_id': reused['answer']['id'],
+                'score': reused['score']
+            } if reused else None
+        })
+        # Split model latency from our own overhead for load testing
+        app_ms = (time.perf_counter() - started) * 1000 - model_ms
+        result.headers['Server-Timing'] = f"model;dur={model_ms:.1f}, app;dur={app_ms:.1f}"
+        return result, 200
         
+    except (CircuitOpenError, SchedulerBusy) as e:
+        db.session.rollback()
+        logger.warning(f"Rejecting AI request: {str(e)}")
+        return service_unavailable(e.retry_after)
     except Exception as e:
         error_message = str(e)
         logger.error(f"Error generating response: {error_message}")
@@ -127,22 +413,375 @@ def generate_response():
             }
         }), 500
 
-@gemini_bp.route('/conversations', methods=['GET'])
+@gemini_bp.route('/generate/stream', methods=['POST'])
 @jwt_required()
-def get_conversations():
+@limiter.limit("10 per minute", key_func=get_user_identifier)
+def generate_response_stream():
+    """Stream a response as Server-Sent Events.
+
+    Emits a ``start`` event with the conversation id, one ``chunk`` event per
+    piece of model output, then ``done`` (or ``error``). The exchange is
+    stored once the stream closes, including a partial reply if the client
+    disconnects part way through.
+    """
+    try:
+        if not current_app.config['AI_ENABLED']:
+            return ai_disabled()
+        
+        # Fail fast before creating a conversation if the breaker is open
+        retry_after = get_gemini_api().breaker.retry_after()
+        if retry_after:
+            return service_unavailable(retry_after)
+        
+        prepared, error_response = prepare_generation()
+        if error_response:
+            return error_response
+        user_id, prompt, conversation, context = prepared
+        conversation_id = conversation.id
+        
+        cache_key = get_cache_key(context, prompt)
+        cached = None
+        if cache_key and cache_bypassed():
+            response_cache.record_bypass()
+        elif cache_key:
+            cached = response_cache.get(cache_key)
+    except Exception as e:
+        logger.error(f"Error starting response stream: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    
+    def generate():
+        chunks = []
+        error = None
+        completed = False
+        # Send the conversation id straight away so the client can render
+        # before the model produces its first token
+        yield format_sse('start', {'conversation_id': conversation_id, 'cached': cached is not None})
+        
+        upstream = iter([cached]) if cached is not None else None
+        slot_held = False
+        try:
+            if upstream is None:
+                get_scheduler().acquire(user_id, estimate_call_cost(context))
+                slot_held = True
+                upstream = get_gemini_api().generate_response_stream(context)
+            for text in upstream:
+                chunks.append(text)
+                yield format_sse('chunk', {'text': text})
+            completed = True
+        except (CircuitOpenError, SchedulerBusy) as e:
+            error = str(e)
+            logger.warning(f"Rejecting AI stream: {error}")
+        except Exception as e:
+            error = str(e)
+            logger.error(f"Error streaming response: {error}")
+        finally:
+            # Runs on completion, on upstream errors and when the client
+            # disconnects (GeneratorExit), so the exchange is always stored
+            if hasattr(upstream, 'close'):
+                upstream.close()
+            if slot_held:
+                get_scheduler().release()
+            reply = ''.join(chunks).strip()
+            if reply:
+                try:
+                    store_exchange(conversation_id, prompt, reply)
+                    if cached is None:
+                        record_usage(user_id, context, reply)
+                    # Partial replies from a dropped stream are never cached
+                    if completed and cache_key and cached is None:
+                        response_cache.set(cache_key, reply)
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Error storing streamed response: {str(e)}")
+        
+        if error:
+            yield format_sse('error', {'error': error})
+        else:
+            yield format_sse('done', {
+                'conversation_id': conversation_id,
+                'response': ''.join(chunks).strip()
+            })
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Stop proxies buffering the stream
+    return response
+
+@gemini_bp.route('/generate/batch', methods=['POST'])
+@jwt_required()
+@limiter.limit("10 per minute", key_func=get_user_identifier, cost=batch_size)
+def generate_batch():
+    """Generate replies to several prompts concurrently.
+
+    Takes ``{"prompts": [...]}`` with up to AI_BATCH_MAX_PROMPTS items, each
+    a prompt string or ``{"prompt", "conversation_id"}``. Cache misses run
+    on up to AI_BATCH_CONCURRENCY threads, so the batch takes about as long
+    as its slowest prompt. Items are independent - two prompts for the same
+    conversation don't see each other's replies. Every exchange is stored in
+    one transaction. The batch is refused with a 429 unless its estimated
+    total fits the user's token quota. Returns per-item results in request
+    order, each with either a ``response`` or an ``error``.
+    """
+    started = time.perf_counter()
     try:
-        user_id = get_jwt_identity()
-        if not user_id:
-            return jsonify({'error': 'Authentication required'}), 401
+        if not current_app.config['AI_ENABLED']:
+            return ai_disabled()
+            
+        data = request.get_json(silent=True)
+        if not data or not isinstance(data.get('prompts'), list) or not data['prompts']:
+            return jsonify({'error': 'A non-empty list of prompts is required'}), 400
+        max_prompts = current_app.config['AI_BATCH_MAX_PROMPTS']
+        if len(data['prompts']) > max_prompts:
+            return jsonify({'error': f'At most {max_prompts} prompts per batch'}), 400
+            
+        user_id = current_user.id
             
         try:
-            user_id = int(user_id)
-        except (ValueError, TypeError) as e:
-            return jsonify({'error': f'Invalid user ID: {str(e)}'}), 401
+            check_quota(user_id)
+        except QuotaExceeded as e:
+            return quota_exceeded(e)
+            
+        # Fail fast before creating conversations if the breaker is open
+        retry_after = get_gemini_api().breaker.retry_after()
+        if retry_after:
+            return service_unavailable(retry_after)
+            
+        bypass = cache_bypassed()
+        items = []
+        for raw_item in data['prompts']:
+            prepared, error = prepare_batch_item(user_id, raw_item)
+            item = {'error': error, 'response': None, 'cached': False}
+            if prepared:
+                item['prompt'], item['conversation'], item['context'] = prepared
+                item['cache_key'] = get_cache_key(item['context'], item['prompt'])
+                if item['cache_key'] and bypass:
+                    response_cache.record_bypass()
+                elif item['cache_key']:
+                    item['response'] = response_cache.get(item['cache_key'])
+                    item['cached'] = item['response'] is not None
+            items.append(item)
+            
+        # Only the upstream calls leave the request thread; the cache,
+        # usage and messages are all written here
+        misses = [item for item in items if not item['error'] and item['response'] is None]
+        try:
+            # The whole batch must fit, not just its first call
+            check_quota(user_id, sum(estimate_call_cost(item['context']) for item in misses))
+        except QuotaExceeded as e:
+            db.session.rollback()
+            return quota_exceeded(e)
+        model_started = time.perf_counter()
+        if misses:
+            config = ai_config(current_app.config)
+            workers = min(len(misses), current_app.config['AI_BATCH_CONCURRENCY'])
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ai-batch') as executor:
+                futures = [
+                    (item, executor.submit(run_generation, item['context'], config, user_id))
+                    for item in misses
+                ]
+                for item, future in futures:
+                    try:
+                        item['response'] = future.result()
+                    except (CircuitOpenError, SchedulerBusy) as e:
+                        logger.warning(f"Rejecting AI batch item: {str(e)}")
+                        item['error'] = 'AI service is temporarily unavailable, please try again shortly'
+                    except Exception as e:
+                        logger.error(f"Error generating batch item: {str(e)}")
+                        item['error'] = str(e)
+        model_ms = (time.perf_counter() - model_started) * 1000
+        
+        for item in misses:
+            if item['response'] is not None:
+                record_usage(user_id, item['context'], item['response'])
+                if item['cache_key']:
+                    response_cache.set(item['cache_key'], item['response'])
+        store_batch_results(items)
+        db.session.commit()
+        
+        result = jsonify({'results': [
+            {
+                'index': index,
+                # Failed items have no exchange, and a new conversation wasn't created
+                'conversation_id': item['conversation'].id if item['response'] is not None else None,
+                'response': item['response'],
+                'cached': item['cached'],
+                'error': item['error']
+            } for index, item in enumerate(items)
+        ]})
+        app_ms = (time.perf_counter() - started) * 1000 - model_ms
+        result.headers['Server-Timing'] = f"model;dur={model_ms:.1f}, app;dur={app_ms:.1f}"
+        return result, 200
+        
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error generating batch: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@gemini_bp.route('/jobs', methods=['POST'])
+@jwt_required()
+@limiter.limit("10 per minute", key_func=get_user_identifier)
+def create_generation_job():
+    """Queue a generation on the AI job pool and return its id straight away.
+
+    The exchange is stored when the job completes. Poll
+    ``GET /api/gemini/jobs/<job_id>`` (optionally with ``?wait=<seconds>``)
+    for the result.
+    """
+    try:
+        if not current_app.config['AI_ENABLED']:
+            return ai_disabled()
+        
+        # Fail fast before creating a conversation if the breaker is open
+        retry_after = get_gemini_api().breaker.retry_after()
+        if retry_after:
+            return service_unavailable(retry_after)
+        
+        prepared, error_response = prepare_generation()
+        if error_response:
+            return error_response
+        user_id, prompt, conversation, context = prepared
+        
+        def on_complete(job, response):
+            store_exchange(job.conversation_id, prompt, response)
+            record_usage(job.user_id, context, response)
+        
+        timeout = current_app.config['AI_JOB_TIMEOUT']
+        data = request.get_json()
+        if isinstance(data.get('timeout'), (int, float)) and data['timeout'] > 0:
+            # Clients may shorten the timeout but not extend it
+            timeout = min(data['timeout'], timeout)
+        
+        try:
+            job = ai_jobs.submit(
+                user_id,
+                prompt,
+                run_generation,
+                context,
+                ai_config(current_app.config),
+                user_id,
+                conversation_id=conversation.id,
+                timeout=timeout,
+                on_complete=on_complete
+            )
+        except AIJobQueueFull as e:
+            logger.warning(f"Rejecting AI job: {str(e)}")
+            response = jsonify({'error': 'AI service is busy, please try again shortly'})
+            response.headers['Retry-After'] = '5'
+            return response, 503
+        
+        response = jsonify({'job': job.to_dict()})
+        response.headers['Location'] = f"{gemini_bp.url_prefix}/jobs/{job.id}"
+        return response, 202
+        
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error creating AI job: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@gemini_bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_generation_job(job_id):
+    """Get an AI job; ``?wait=<seconds>`` long-polls until it finishes"""
+    try:
+        user_id = current_user.id
+            
+        wait = request.args.get('wait', 0, type=float)
+        job = ai_jobs.get(job_id, user_id, wait=wait)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+            
+        return jsonify({'job': job.to_dict()}), 200
+        
+    except Exception as e:
+        logger.error(f"Error fetching AI job: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@gemini_bp.route('/cache/stats', methods=['GET'])
+@admin_required()
+def get_cache_stats():
+    """Response cache hit, miss and eviction counters for this worker"""
+    try:
+        return jsonify({'cache': response_cache.stats()}), 200
+    except Exception as e:
+        logger.error(f"Error fetching cache stats: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@gemini_bp.route('/search', methods=['GET'])
+@jwt_required()
+def search_messages():
+    """Search the user's conversation history, best matches first.
+
+    Query parameters: q, limit and role ('user' or 'assistant').
+    """
+    try:
+        user_id = current_user.id
+            
+        query = (request.args.get('q') or '').strip()
+        if not query:
+            return jsonify({'error': 'Search query is required'}), 400
+        role = request.args.get('role')
+        if role not in (None, 'user', 'assistant'):
+            return jsonify({'error': "role must be 'user' or 'assistant'"}), 400
+        limit = parse_limit(
+            request.args.get('limit', type=int),
+            current_app.config['AI_SEARCH_RESULTS'],
+            current_app.config['AI_MAX_PAGE_SIZE']
+        )
+        
+        # Over-fetch a little, since some hits may have been deleted or archived
+        hits = search_index.search(user_id, query[:2000], k=limit * 2, role=role)
+        results = load_search_results(user_id, hits)[:limit]
+        return jsonify({'query': query, 'results': results}), 200
+        
+    except Exception as e:
+        logger.error(f"Error searching conversations: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@gemini_bp.route('/usage', methods=['GET'])
+@jwt_required()
+def get_ai_usage():
+    """The user's estimated token usage today and this month, with their quotas"""
+    try:
+        user_id = current_user.id
             
-        conversations = AIConversation.get_conversations(user_id)
+        return jsonify({'usage': get_usage(user_id)}), 200
+    except Exception as e:
+        logger.error(f"Error fetching AI usage: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@gemini_bp.route('/status', methods=['GET'])
+@admin_required()
+def get_ai_status():
+    """Circuit breaker state, recent transitions, request coalescing and scheduler counters"""
+    try:
+        if not gemini_api_initialized():
+            # Don't build the client just to report on it
+            return jsonify({'status': {'enabled': current_app.config['AI_ENABLED'], 'initialized': False}}), 200
+        status = get_gemini_api().status()
+        status.update({
+            'enabled': current_app.config['AI_ENABLED'],
+            'initialized': True,
+            'scheduler': get_scheduler().stats()
+        })
+        return jsonify({'status': status}), 200
+    except Exception as e:
+        logger.error(f"Error fetching AI status: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@gemini_bp.route('/conversations', methods=['GET'])
+@jwt_required()
+def get_conversations():
+    try:
+        user_id = current_user.id
+            
+        page, error_response = get_conversations_page(user_id)
+        if error_response:
+            return error_response
+        conversations, next_cursor = page
         return jsonify({
-            'conversations': [conv.to_dict() for conv in conversations]
+            'conversations': [conv.to_dict() for conv in conversations],
+            'next_cursor': next_cursor
         }), 200
         
     except Exception as e:
@@ -153,21 +792,32 @@ def get_conversations():
 @jwt_required()
 def get_conversation(conversation_id):
     try:
-        user_id = get_jwt_identity()
-        if not user_id:
-            return jsonify({'error': 'Authentication required'}), 401
-            
-        try:
-            user_id = int(user_id)
-        except (ValueError, TypeError) as e:
-            return jsonify({'error': f'Invalid user ID: {str(e)}'}), 401
+        user_id = current_user.id
             
         conversation = AIConversation.get_conversation(conversation_id, user_id)
         if not conversation:
             return jsonify({'error': 'Conversation not found'}), 404
             
+        limit = parse_limit(
+            request.args.get('limit', type=int),
+            current_app.config['AI_MESSAGE_PAGE_SIZE'],
+            current_app.config['AI_MAX_PAGE_SIZE']
+        )
+        before = request.args.get('before')
+        before_values = decode_cursor(before)
+        if before and before_values is None:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        try:
+            messages, before_cursor = AIMessage.get_page(conversation.id, limit, before_values)
+        except (KeyError, ValueError):
+            return jsonify({'error': 'Invalid cursor'}), 400
+            
+        result = conversation.to_dict_with_messages(messages)
+        # Pass as ?before= to load older messages; None once the start is reached
+        result['before_cursor'] = encode_cursor(before_cursor) if before_cursor else None
+        result['has_more'] = before_cursor is not None
         return jsonify({
-            'conversation': conversation.to_dict_with_messages()
+            'conversation': result
         }), 200
         
     except Exception as e:
@@ -178,14 +828,7 @@ def get_conversation(conversation_id):
 @jwt_required()
 def activate_conversation(conversation_id):
     try:
-        user_id = get_jwt_identity()
-        if not user_id:
-            return jsonify({'error': 'Authentication required'}), 401
-            
-        try:
-            user_id = int(user_id)
-        except (ValueError, TypeError) as e:
-            return jsonify({'error': f'Invalid user ID: {str(e)}'}), 401
+        user_id = current_user.id
             
         conversation = AIConversation.get_conversation(conversation_id, user_id)
         if not conversation:
@@ -202,14 +845,7 @@ def activate_conversation(conversation_id):
 @jwt_required()
 def deactivate_conversation(conversation_id):
     try:
-        user_id = get_jwt_identity()
-        if not user_id:
-            return jsonify({'error': 'Authentication required'}), 401
-            
-        try:
-            user_id = int(user_id)
-        except (ValueError, TypeError) as e:
-            return jsonify({'error': f'Invalid user ID: {str(e)}'}), 401
+        user_id = current_user.id
             
         conversation = AIConversation.get_conversation(conversation_id, user_id)
         if not conversation:
@@ -232,15 +868,7 @@ def update_conversation_title(conversation_id):
         if not new_title:
             return jsonify({'error': 'Title is required'}), 400
             
-        # Get user_id from JWT
-        user_id = get_jwt_identity()
-        if not user_id:
-            return jsonify({'error': 'Authentication required'}), 401
-            
-        try:
-            user_id = int(user_id)
-        except (ValueError, TypeError) as e:
-            return jsonify({'error': f'Invalid user ID: {str(e)}'}), 401
+        user_id = current_user.id
             
         # Get the conversation
         conversation = AIConversation.get_conversation(conversation_id, user_id)
@@ -261,7 +889,7 @@ def update_conversation_title(conversation_id):
                 'title': conversation.title,
                 'created_at': conversation.created_at.isoformat(),
                 'updated_at': conversation.updated_at.isoformat(),
-                'messages': len(conversation.messages)
+                'messages': conversation.message_count or 0
             }
         }), 200
         
@@ -274,23 +902,17 @@ def update_conversation_title(conversation_id):
 def get_conversation_context(conversation_id):
     """Get the context of a conversation"""
     try:
-        user_id = get_jwt_identity()
-        if not user_id:
-            return jsonify({'error': 'Authentication required'}), 401
-            
-        try:
-            user_id = int(user_id)
-        except (ValueError, TypeError) as e:
-            return jsonify({'error': f'Invalid user ID: {str(e)}'}), 401
+        user_id = current_user.id
             
         conversation = AIConversation.get_conversation(conversation_id, user_id)
         if not conversation:
             return jsonify({'error': 'Conversation not found'}), 404
             
-        # Build context from conversation messages
-        context = ""
-        for message in conversation.messages:
-            context += f"\n{message.role}: {message.content}"
+        # Build context from conversation messages in one pass
+        rows = db.session.query(AIMessage.role, AIMessage.content).filter(
+            AIMessage.conversation_id == conversation.id
+        ).order_by(AIMessage.id).yield_per(current_app.config['AI_EXPORT_CHUNK_SIZE'])
+        context = ''.join(f"\n{role}: {content}" for role, content in rows)
             
         return jsonify({
             'context': context
@@ -300,18 +922,44 @@ def get_conversation_context(conversation_id):
         logger.error(f"Error getting conversation context: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@gemini_bp.route('/conversation/<int:conversation_id>/export', methods=['GET'])
+@jwt_required()
+def export_conversation(conversation_id):
+    """Stream one conversation's transcript, including archived messages"""
+    try:
+        user_id = current_user.id
+            
+        conversation = AIConversation.get_conversation(conversation_id, user_id)
+        if not conversation:
+            return jsonify({'error': 'Conversation not found'}), 404
+            
+        return transcript_response(
+            [(conversation.id, conversation.title, conversation.created_at)],
+            f"conversation-{conversation.id}"
+        )
+        
+    except Exception as e:
+        logger.error(f"Error exporting conversation: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@gemini_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_conversations():
+    """Stream a transcript of all the user's conversations, oldest first"""
+    try:
+        user_id = current_user.id
+            
+        return transcript_response(iter_conversations(user_id), 'conversations')
+        
+    except Exception as e:
+        logger.error(f"Error exporting conversations: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @gemini_bp.route('/conversation/<int:conversation_id>', methods=['DELETE'])
 @jwt_required()
 def delete_conversation(conversation_id):
     try:
-        user_id = get_jwt_identity()
-        if not user_id:
-            return jsonify({'error': 'Authentication required'}), 401
-
-        try:
-            user_id = int(user_id)
-        except (ValueError, TypeError) as e:
-            return jsonify({'error': f'Invalid user ID: {str(e)}'}), 401
+        user_id = current_user.id
 
         conversation = AIConversation.get_conversation(conversation_id, user_id)
         if not conversation:
@@ -324,6 +972,7 @@ def delete_conversation(conversation_id):
             # Delete the conversation itself
             db.session.delete(conversation)
             db.session.commit()
+            search_index.forget(user_id)
             
             return jsonify({'message': 'Conversation deleted successfully'}), 200
             
@@ -340,20 +989,17 @@ def delete_conversation(conversation_id):
 @jwt_required()
 def get_chat_history():
     try:
-        user_id = get_jwt_identity()
-        if not user_id:
-            return jsonify({'error': 'Authentication required'}), 401
-            
-        try:
-            user_id = int(user_id)
-        except (ValueError, TypeError) as e:
-            return jsonify({'error': f'Invalid user ID: {str(e)}'}), 401
+        user_id = current_user.id
             
-        # Get all conversations for user, ordered by most recent
-        conversations = AIConversation.get_conversations(user_id)
+        # Get a page of conversations for user, ordered by most recent
+        page, error_response = get_conversations_page(user_id)
+        if error_response:
+            return error_response
+        conversations, next_cursor = page
         
         return jsonify({
-            'history': [conv.to_dict() for conv in conversations]
+            'history': [conv.to_dict() for conv in conversations],
+            'next_cursor': next_cursor
         }), 200
         
     except Exception as e:
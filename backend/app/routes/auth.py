@@ -1,14 +1,16 @@
 from flask import Blueprint, request, jsonify, abort, current_app
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt, get_jwt_identity, current_user
 from flask_limiter.util import get_remote_address
 from sqlalchemy.exc import IntegrityError
 from app import db
-from app.models import User
+from app.models import User, RevokedToken
 from app.extensions import limiter
-import re
-from app.utils import validate_request_data
-from datetime import timedelta
+from app.utils import admin_required, validate_request_data, password_errors
+from app.utils.password_hasher import HasherBusy, password_hasher
+from datetime import datetime, timedelta
+import logging
 import traceback
+import uuid
 
 # Rate limiting configuration
 def get_remote_identifier():
@@ -20,8 +22,27 @@ def get_remote_identifier():
 
 bp = Blueprint('auth', __name__, url_prefix='/api')
 
-@limiter.limit("5 per hour", key_func=get_remote_identifier)
+logger = logging.getLogger(__name__)
+
+def issue_refresh_token(user_id, username, family=None):
+    """Refresh token for a login; tokens rotated from it share its ``family``"""
+    return create_refresh_token(
+        identity=str(user_id),
+        additional_claims={
+            'username': username,
+            'family': family or uuid.uuid4().hex
+        }
+    )
+
+def hasher_busy(e):
+    """503 response while the password hashing pool is saturated"""
+    logger.warning(f"Rejecting sign-in: {str(e)}")
+    response = jsonify({'error': 'Too many sign-ins right now, please try again shortly'})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 503
+
 @bp.route('/register', methods=['POST', 'OPTIONS'])
+@limiter.limit("5 per hour", key_func=get_remote_identifier)
 def register():
     if request.method == 'OPTIONS':
         return '', 200
@@ -34,20 +55,8 @@ def register():
         if not valid:
             return jsonify({'error': error}), 400
         
-        password = data['password']
         # Validate password strength
-        errors = []
-        if len(password) < 8:
-            errors.append("be at least 8 characters long")
-        if not re.search(r'[A-Z]', password):
-            errors.append("include at least one uppercase letter (A-Z)")
-        if not re.search(r'[a-z]', password):
-            errors.append("include at least one lowercase letter (a-z)")
-        if not re.search(r'[0-9]', password):
-            errors.append("include at least one number (0-9)")
-        if not re.search(r'[@$!%*?&]', password):
-            errors.append("include at least one special character (@$!%*?&)")
-            
+        errors = password_errors(data['password'])
         if errors:
             description = "Password must: " + ", ".join(errors)
             return abort(400, description=description)
@@ -71,15 +80,19 @@ def register():
         return jsonify({
             'message': 'Registration successful',
             'access_token': access_token,
+            'refresh_token': issue_refresh_token(user.id, user.username),
             'user': user.to_dict()
         }), 201
         
+    except HasherBusy as e:
+        db.session.rollback()
+        return hasher_busy(e)
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
-@limiter.limit("10 per hour", key_func=get_remote_address)
 @bp.route('/login', methods=['POST', 'OPTIONS'])
+@limiter.limit("10 per hour", key_func=get_remote_address)
 def login():
     if request.method == 'OPTIONS':
         return '', 200
@@ -120,29 +133,98 @@ def login():
         
         response = jsonify({
             'access_token': access_token,
+            # Exchange at /api/token/refresh instead of logging in again
+            'refresh_token': issue_refresh_token(user.id, user.username),
             'user': user.to_dict()
         })
         response.headers['Authorization'] = f'Bearer {access_token}'
         return response, 200
         
+    except HasherBusy as e:
+        return hasher_busy(e)
     except Exception as e:
 
         return jsonify({"error": "An error occurred during login"}), 500
 
-@bp.route('/profile', methods=['GET', 'OPTIONS'])
-@jwt_required()
-def profile():
+@bp.route('/token/refresh', methods=['POST', 'OPTIONS'])
+@jwt_required(refresh=True)
+def refresh():
+    """Exchange a refresh token for a new access token and a new refresh token.
+
+    The presented refresh token is revoked (rotation), so each one can be
+    used once; replaying a used one revokes every token from that login.
+    """
     if request.method == 'OPTIONS':
         return '', 200
         
     try:
+        claims = get_jwt()
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
         
-        if not user:
-            return jsonify({"error": "User not found"}), 404
+        # The revocation insert is the single-use check, so two concurrent
+        # refreshes with the same token can't both succeed
+        if not RevokedToken.revoke(
+            claims['jti'],
+            datetime.utcfromtimestamp(claims['exp']),
+            user_id=int(user_id)
+        ):
+            return jsonify({'error': 'Token has been revoked'}), 401
             
-        return jsonify(user.to_dict()), 200
+        access_token = create_access_token(
+            identity=user_id,
+            additional_claims={
+                'username': claims.get('username'),
+                'type': 'access'
+            },
+            fresh=False
+        )
+        response = jsonify({
+            'access_token': access_token,
+            'refresh_token': issue_refresh_token(user_id, claims.get('username'), claims.get('family'))
+        })
+        response.headers['Authorization'] = f'Bearer {access_token}'
+        return response, 200
         
+    except Exception:
+        db.session.rollback()
+        return jsonify({"error": "An error occurred while refreshing the token"}), 500
+
+@bp.route('/token/revoke', methods=['POST', 'OPTIONS'])
+@jwt_required(refresh=True)
+def revoke():
+    """Log out: revoke the presented refresh token and every token rotated from its login"""
+    if request.method == 'OPTIONS':
+        return '', 200
+        
+    try:
+        claims = get_jwt()
+        user_id = int(get_jwt_identity())
+        RevokedToken.revoke(claims['jti'], datetime.utcfromtimestamp(claims['exp']), user_id=user_id)
+        if claims.get('family'):
+            RevokedToken.revoke_family(claims['family'], user_id=user_id)
+        return jsonify({'message': 'Token revoked'}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+@bp.route('/profile', methods=['GET', 'OPTIONS'])
+@jwt_required()
+def profile():
+    if request.method == 'OPTIONS':
+        return '', 200
+        
+    try:
+        return jsonify(current_user.to_dict()), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bp.route('/auth/hash-stats', methods=['GET'])
+@admin_required()
+def hash_stats():
+    """Password hashing pool depth, rejections and latency for this worker"""
+    try:
+        return jsonify({'password_hashing': password_hasher.stats()}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
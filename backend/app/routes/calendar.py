@@ -1,7 +1,7 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import timezone
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, current_user
 from app.models.calendar_event import CalendarEvent
-from app.models.user import User
 from app.utils import validate_request_data, parse_datetime
 from app import db
 
@@ -16,25 +16,30 @@ logger = logging.getLogger(__name__)
 @bp.route('/', methods=['GET', 'OPTIONS'])
 @jwt_required()
 def get_events():
+    """List the user's events, optionally only those overlapping ?start= to ?end= (ISO datetimes).
+
+    With CALENDAR_VIRTUAL_TODO_EVENTS on, the Todo events of tasks with a
+    due date are derived from the tasks in the same query; see
+    CalendarEvent.get_range.
+    """
     if request.method == 'OPTIONS':
         return '', 200
         
     try:
-        user_id = get_jwt_identity()
-        if not user_id:
-            return jsonify({'error': 'Authentication required'}), 401
-            
-        try:
-            user_id = int(user_id)
-        except (ValueError, TypeError):
-            return jsonify({'error': 'Invalid user ID'}), 401
-            
-        # Verify user exists
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({'error': 'User not found'}), 401
-        events = CalendarEvent.query.filter_by(user_id=user_id).all()
-        event_list = [event.to_dict() for event in events]
+        user_id = current_user.id
+        bounds = {}
+        for name in ('start', 'end'):
+            if request.args.get(name):
+                bounds[name] = parse_datetime(request.args[name])
+                if bounds[name] is None:
+                    return jsonify({'error': f"{name} must be an ISO datetime"}), 400
+                # Event times are stored naive, in UTC
+                if bounds[name].tzinfo:
+                    bounds[name] = bounds[name].astimezone(timezone.utc).replace(tzinfo=None)
+        
+        event_list = CalendarEvent.get_range(
+            user_id, virtual_todos=current_app.config['CALENDAR_VIRTUAL_TODO_EVENTS'], **bounds
+        )
         return jsonify(event_list), 200
     except Exception as e:
         return jsonify({'error': str(e), 'trace': traceback.format_exc()}), 500
@@ -46,19 +51,7 @@ def create_event():
         return '', 200
         
     try:
-        user_id = get_jwt_identity()
-        if not user_id:
-            return jsonify({'error': 'Authentication required'}), 401
-            
-        try:
-            user_id = int(user_id)
-        except (ValueError, TypeError):
-            return jsonify({'error': 'Invalid user ID'}), 401
-            
-        # Verify user exists
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({'error': 'User not found'}), 401
+        user_id = current_user.id
         data = request.get_json()
         
         # Validate required fields
@@ -101,19 +94,7 @@ def update_event(event_id):
         return '', 200
         
     try:
-        user_id = get_jwt_identity()
-        if not user_id:
-            return jsonify({'error': 'Authentication required'}), 401
-            
-        try:
-            user_id = int(user_id)
-        except (ValueError, TypeError):
-            return jsonify({'error': 'Invalid user ID'}), 401
-            
-        # Verify user exists
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({'error': 'User not found'}), 401
+        user_id = current_user.id
         event = CalendarEvent.query.filter_by(id=event_id, user_id=user_id).first()
         
         if not event:
@@ -157,19 +138,7 @@ def delete_event(event_id):
         return '', 200
         
     try:
-        user_id = get_jwt_identity()
-        if not user_id:
-            return jsonify({'error': 'Authentication required'}), 401
-            
-        try:
-            user_id = int(user_id)
-        except (ValueError, TypeError):
-            return jsonify({'error': 'Invalid user ID'}), 401
-            
-        # Verify user exists
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({'error': 'User not found'}), 401
+        user_id = current_user.id
         event = CalendarEvent.query.filter_by(id=event_id, user_id=user_id).first()
         
         if not event:
@@ -182,3 +151,15 @@ def delete_event(event_id):
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
+
+@bp.route('/task-<int:task_id>', methods=['PUT', 'PATCH', 'DELETE', 'OPTIONS'])
+@jwt_required()
+def virtual_todo_event(task_id):
+    """Virtual Todo events (CALENDAR_VIRTUAL_TODO_EVENTS) are views of a task and change with it"""
+    if request.method == 'OPTIONS':
+        return '', 200
+    
+    return jsonify({
+        'error': f"This Todo event comes from a task; edit or delete it through /api/tasks/{task_id}",
+        'task_id': task_id
+    }), 400
@@ -1,6 +1,6 @@
 from datetime import datetime, timezone, timedelta
 from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, current_user
 from sqlalchemy import or_
 from app.models.study_session import StudySession
 from app import db
@@ -8,15 +8,6 @@ import traceback
 
 bp = Blueprint('study', __name__, url_prefix='/api/study')
 
-def get_current_user():
-    """Helper function to get and validate current user"""
-    user_id = get_jwt_identity()
-    try:
-        user_id = int(user_id)
-    except (ValueError, TypeError):
-        return None
-    return user_id
-
 @bp.errorhandler(Exception)
 def handle_error(e):
     current_app.logger.error(f"Error in study routes: {str(e)}")
@@ -28,9 +19,7 @@ def handle_error(e):
 def get_study_sessions():
     """Get all study sessions for the current user with optional filtering."""
     try:
-        user_id = get_current_user()
-        if not user_id:
-            return jsonify({"error": "Invalid user"}), 401
+        user_id = current_user.id
 
         # Get query parameters
         limit = request.args.get('limit', type=int)
@@ -95,9 +84,7 @@ def get_study_sessions():
 def create_study_session():
     """Create a new study session."""
     try:
-        user_id = get_current_user()
-        if not user_id:
-            return jsonify({"error": "Invalid user"}), 401
+        user_id = current_user.id
 
         data = request.get_json() or {}
         
@@ -153,9 +140,7 @@ def create_study_session():
 def update_study_session(session_id):
     """Update an existing study session."""
     try:
-        user_id = get_current_user()
-        if not user_id:
-            return jsonify({"error": "Invalid user"}), 401
+        user_id = current_user.id
 
         session = StudySession.query.filter_by(id=session_id, user_id=user_id).first()
         if not session:
@@ -236,9 +221,7 @@ def update_study_session(session_id):
 def delete_study_session(session_id):
     """Delete a study session."""
     try:
-        user_id = get_current_user()
-        if not user_id:
-            return jsonify({"error": "Invalid user"}), 401
+        user_id = current_user.id
 
         session = StudySession.query.filter_by(id=session_id, user_id=user_id).first()
         if not session:
@@ -259,9 +242,7 @@ def delete_study_session(session_id):
 def get_study_stats():
     """Get study statistics for the current user."""
     try:
-        user_id = get_current_user()
-        if not user_id:
-            return jsonify({"error": "Invalid user"}), 401
+        user_id = current_user.id
 
         # Get query parameters
         start_date = request.args.get('start_date')
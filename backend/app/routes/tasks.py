@@ -1,29 +1,18 @@
 from flask import Blueprint, request, jsonify, make_response, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request, get_jwt
+from flask_jwt_extended import jwt_required, verify_jwt_in_request, get_jwt, get_current_user
 from flask_jwt_extended.exceptions import NoAuthorizationError, InvalidHeaderError, JWTExtendedException
-from datetime import datetime, timedelta
+from datetime import timezone
 from app.models.task import Task
-from app.models.user import User
-from app.models.calendar_event import CalendarEvent
+from app.utils import parse_datetime, encode_cursor, decode_cursor, parse_limit
+from app.utils import task_sync
 from app import db
 import traceback
 import json
 
 bp = Blueprint('tasks', __name__, url_prefix='/api/tasks')
 
-def get_current_user():
-    """Helper function to get and validate current user"""
-    user_id = get_jwt_identity()
-    try:
-        user_id = int(user_id)
-    except (ValueError, TypeError):
-        return None
-        
-    current_user = User.query.get(user_id)
-    if not current_user:
-        return None
-        
-    return current_user
+# Query args of GET /api/tasks that ask for a page rather than the full list
+PAGE_ARGS = ('completed', 'priority', 'due_after', 'due_before', 'sort', 'limit', 'cursor')
 
 @bp.errorhandler(NoAuthorizationError)
 @bp.errorhandler(InvalidHeaderError)
@@ -35,37 +24,73 @@ def handle_auth_error(e):
 @bp.route('/', methods=['GET', 'OPTIONS'])  
 @jwt_required()
 def get_tasks():
+    """The user's tasks, as a JSON array.
+
+    Query args: ``completed`` (true/false), ``priority`` (comma-separated
+    1-3), ``due_after``/``due_before`` (ISO datetimes, before exclusive),
+    ``sort`` (created, due_date or priority; prefix - for descending),
+    ``limit`` and ``cursor``. With any of them one page is returned, and
+    the cursor for the next page in the X-Next-Cursor header, which is
+    absent on the last page. Without any, every task is returned, oldest
+    first, as clients that predate paging expect.
+    """
     if request.method == 'OPTIONS':
         return '', 200
         
     try:
-        # Get user ID from JWT token
-        user_id = get_jwt_identity()
+        current_user = get_current_user()
         
-        if user_id is None:
-
-            return jsonify({"error": "Authentication required"}), 401
-            
-        try:
-            user_id = int(user_id)  # Convert string ID back to integer
-        except (ValueError, TypeError):
-
-            return jsonify({"error": "Invalid authentication token"}), 401
+        if not any(name in request.args for name in PAGE_ARGS):
+            tasks = Task.query.filter_by(user_id=current_user.id).order_by(Task.id).all()
+            return jsonify([task.to_dict() for task in tasks]), 200
         
-        # Verify user exists
-        current_user = User.query.get(user_id)
-        if current_user is None:
-
-            return jsonify({"error": "User not found"}), 401
+        sort = request.args.get('sort', 'created')
+        if sort not in Task.SORTS:
+            return jsonify({"error": f"sort must be one of: {', '.join(Task.SORTS)}"}), 400
         
-
+        completed = request.args.get('completed')
+        if completed is not None:
+            if completed.lower() not in ('true', 'false'):
+                return jsonify({"error": "completed must be true or false"}), 400
+            completed = completed.lower() == 'true'
         
-        # Get tasks for user
-        tasks = Task.query.filter_by(user_id=current_user.id).all()
+        priorities = None
+        if request.args.get('priority'):
+            try:
+                priorities = [int(value) for value in request.args['priority'].split(',')]
+            except ValueError:
+                return jsonify({"error": "priority must be a comma-separated list of 1, 2 or 3"}), 400
         
-
+        due_range = {}
+        for name in ('due_after', 'due_before'):
+            if request.args.get(name):
+                due_range[name] = parse_datetime(request.args[name])
+                if due_range[name] is None:
+                    return jsonify({"error": f"{name} must be an ISO datetime"}), 400
+                # Due dates are stored naive, in UTC
+                if due_range[name].tzinfo:
+                    due_range[name] = due_range[name].astimezone(timezone.utc).replace(tzinfo=None)
+        
+        limit = parse_limit(
+            request.args.get('limit', type=int),
+            current_app.config['TASK_PAGE_SIZE'],
+            current_app.config['TASK_MAX_PAGE_SIZE']
+        )
+        cursor = request.args.get('cursor')
+        cursor_values = decode_cursor(cursor)
+        if cursor and cursor_values is None:
+            return jsonify({"error": "Invalid cursor"}), 400
+        try:
+            tasks, next_values = Task.get_page(
+                current_user.id, limit, sort, cursor_values,
+                completed=completed, priorities=priorities, **due_range
+            )
+        except (KeyError, TypeError, ValueError):
+            return jsonify({"error": "Invalid cursor"}), 400
         
         response = jsonify([task.to_dict() for task in tasks])
+        if next_values:
+            response.headers['X-Next-Cursor'] = encode_cursor(next_values)
         return response, 200
     except JWTExtendedException as e:
         return jsonify({"error": "Authentication failed. Please log in again."}), 401
@@ -92,66 +117,25 @@ def create_task():
         except Exception as e:
             return jsonify({"error": "Invalid JSON data"}), 400
 
-        # Validate required fields
-        if 'title' not in data:
-            return jsonify({"error": "Title is required"}), 400
-
-        title = data['title'].strip()
-        if not title:
-            return jsonify({"error": "Title cannot be empty"}), 400
-
         try:
-            # Create task with validated data
-            task = Task(
-                title=title,
-                description=data.get('description', '').strip(),
-                user_id=current_user.id,
-                completed=bool(data.get('completed', False)),
-                priority=int(data.get('priority', 1))
-            )
-
-            if 'due_date' in data and data['due_date']:
-                try:
-                    task.due_date = datetime.fromisoformat(data['due_date'].replace('Z', '+00:00'))
-                    
-                    # Create a calendar event for this task
-                    calendar_event = CalendarEvent(
-                        title=task.title,
-                        description=task.description,
-                        start_time=task.due_date,
-                        end_time=task.due_date + timedelta(hours=1),  # Default 1 hour duration
-                        user_id=current_user.id,
-                        category="Todo",  # Special category for todo items
-                        location=""
-                    )
-                    db.session.add(calendar_event)
-                    db.session.flush()  # Get the calendar_event.id before commit
-                    task.calendar_event_id = calendar_event.id
-                    
-                except ValueError:
-                    return jsonify({"error": "Invalid due date format"}), 400
-            elif 'due_date' in data and not data['due_date']:
-                # If due_date is provided but empty, set it to None
-                task.due_date = None
-
-            db.session.add(task)
-            try:
-                db.session.commit()
-            except Exception as e:
-                db.session.rollback()
-                return jsonify({"error": f"Database error: {str(e)}"}), 500
-            
-
-            return jsonify(task.to_dict()), 201
-
+            # The task and its Todo calendar event are written by the one commit
+            task = task_sync.create_task(current_user.id, data)
         except ValueError as e:
-
-            return jsonify({"error": "Invalid value provided"}), 400
+            return jsonify({"error": str(e)}), 400
+        
+        try:
+            # Serialized before the commit expires it, so it isn't reloaded
+            db.session.flush()
+            body = task.to_dict()
+            db.session.commit()
         except Exception as e:
             db.session.rollback()
-            return jsonify({"error": "Failed to create task"}), 500
+            return jsonify({"error": f"Database error: {str(e)}"}), 500
+        
+        return jsonify(body), 201
             
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": "An unexpected error occurred"}), 500
 
 @bp.route('/<int:task_id>', methods=['PUT', 'PATCH', 'OPTIONS'])
@@ -163,15 +147,13 @@ def update_task(task_id):
         response.headers.add('Access-Control-Allow-Headers', 'Content-Type, Authorization')
         return response
         
-
-    
     try:
         current_user = get_current_user()
         if not current_user:
             return jsonify({"error": "Authentication failed"}), 401
 
-        # Find task
-        task = Task.query.filter_by(id=task_id, user_id=current_user.id).first()
+        # Find task, with its Todo event
+        task = task_sync.load_task(task_id, current_user.id)
         if not task:
             return jsonify({"error": "Task not found"}), 404
             
@@ -183,153 +165,28 @@ def update_task(task_id):
         except Exception as e:
             return jsonify({"error": "Invalid JSON data"}), 400
             
-        # Update task fields based on request method
+        # PATCH only updates the fields given; PUT replaces them all
         try:
-            if request.method == 'PATCH':
-
-                # For PATCH, only update specified fields
-                if 'completed' in data:
-                    task.completed = bool(data['completed'])
-    
-                if 'title' in data:
-                    task.title = data['title'].strip()
-                if 'description' in data:
-                    task.description = data.get('description', '').strip()
-                if 'priority' in data:
-                    task.priority = int(data['priority'])
-                if 'due_date' in data and data['due_date']:
-                    try:
-                        task.due_date = datetime.fromisoformat(data['due_date'].replace('Z', '+00:00'))
-                        
-                        # Update existing calendar event or create a new one
-                        if task.calendar_event_id:
-                            calendar_event = CalendarEvent.query.get(task.calendar_event_id)
-                            if calendar_event:
-                                calendar_event.title = task.title
-                                calendar_event.description = task.description
-                                calendar_event.start_time = task.due_date
-                                calendar_event.end_time = task.due_date + timedelta(hours=1)
-                            else:
-                                # Create new calendar event if the linked one doesn't exist
-                                calendar_event = CalendarEvent(
-                                    title=task.title,
-                                    description=task.description,
-                                    start_time=task.due_date,
-                                    end_time=task.due_date + timedelta(hours=1),
-                                    user_id=current_user.id,
-                                    category="Todo",
-                                    location=""
-                                )
-                                db.session.add(calendar_event)
-                                db.session.flush()
-                                task.calendar_event_id = calendar_event.id
-                        else:
-                            # Create new calendar event
-                            calendar_event = CalendarEvent(
-                                title=task.title,
-                                description=task.description,
-                                start_time=task.due_date,
-                                end_time=task.due_date + timedelta(hours=1),
-                                user_id=current_user.id,
-                                category="Todo",
-                                location=""
-                            )
-                            db.session.add(calendar_event)
-                            db.session.flush()
-                            task.calendar_event_id = calendar_event.id
-                    except ValueError:
-                        return jsonify({"error": "Invalid due date format"}), 400
-                elif 'due_date' in data and not data['due_date']:
-                    # If due_date is provided but empty, set it to None and remove calendar event
-                    task.due_date = None
-                    if task.calendar_event_id:
-                        calendar_event = CalendarEvent.query.get(task.calendar_event_id)
-                        if calendar_event:
-                            db.session.delete(calendar_event)
-                        task.calendar_event_id = None
-            else:  # PUT request
-                current_app.logger.debug(f'PUT request data: {data}')
-                # Validate required fields
-                if 'title' not in data:
-                    return jsonify({"error": "Title is required"}), 400
-                    
-                # Update all fields
-                task.title = data['title'].strip()
-                task.description = data.get('description', '').strip()
-                task.completed = bool(data.get('completed', False))
-                task.priority = int(data.get('priority', 1))
-                
-                # Task completion status is already set above
-                if 'due_date' in data and data['due_date']:
-                    try:
-                        task.due_date = datetime.fromisoformat(data['due_date'].replace('Z', '+00:00'))
-                        
-                        # Update existing calendar event or create a new one
-                        if task.calendar_event_id:
-                            calendar_event = CalendarEvent.query.get(task.calendar_event_id)
-                            if calendar_event:
-                                calendar_event.title = task.title
-                                calendar_event.description = task.description
-                                calendar_event.start_time = task.due_date
-                                calendar_event.end_time = task.due_date + timedelta(hours=1)
-                            else:
-                                # Create new calendar event if the linked one doesn't exist
-                                calendar_event = CalendarEvent(
-                                    title=task.title,
-                                    description=task.description,
-                                    start_time=task.due_date,
-                                    end_time=task.due_date + timedelta(hours=1),
-                                    user_id=current_user.id,
-                                    category="Todo",
-                                    location=""
-                                )
-                                db.session.add(calendar_event)
-                                db.session.flush()
-                                task.calendar_event_id = calendar_event.id
-                        else:
-                            # Create new calendar event
-                            calendar_event = CalendarEvent(
-                                title=task.title,
-                                description=task.description,
-                                start_time=task.due_date,
-                                end_time=task.due_date + timedelta(hours=1),
-                                user_id=current_user.id,
-                                category="Todo",
-                                location=""
-                            )
-                            db.session.add(calendar_event)
-                            db.session.flush()
-                            task.calendar_event_id = calendar_event.id
-                    except ValueError:
-                        return jsonify({"error": "Invalid due date format"}), 400
-                elif 'due_date' in data and not data['due_date']:
-                    # If due_date is provided but empty, set it to None and remove calendar event
-                    task.due_date = None
-                    if task.calendar_event_id:
-                        calendar_event = CalendarEvent.query.get(task.calendar_event_id)
-                        if calendar_event:
-                            db.session.delete(calendar_event)
-                        task.calendar_event_id = None
-            
-            # Save changes
-            try:
-                db.session.commit()
-                current_app.logger.info(f'Successfully updated task {task_id}')
-                return jsonify(task.to_dict()), 200
-            except Exception as e:
-                db.session.rollback()
-                current_app.logger.error(f'Database error while updating task: {str(e)}\nTraceback: {traceback.format_exc()}')
-                return jsonify({"error": "Failed to save task updates"}), 500
-            
+            task_sync.update_task(task, data, partial=request.method == 'PATCH')
         except ValueError as e:
-            return jsonify({"error": "Invalid value provided"}), 400
+            return jsonify({"error": str(e)}), 400
+            
+        # Save changes
+        try:
+            db.session.flush()
+            body = task.to_dict()
+            db.session.commit()
+            current_app.logger.info(f'Successfully updated task {task_id}')
+            return jsonify(body), 200
         except Exception as e:
             db.session.rollback()
-            return jsonify({"error": "Failed to update task"}), 500
+            current_app.logger.error(f'Database error while updating task: {str(e)}\nTraceback: {traceback.format_exc()}')
+            return jsonify({"error": "Failed to save task updates"}), 500
             
     except JWTExtendedException as e:
         return jsonify({"error": "Authentication failed. Please log in again."}), 401
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": "An error occurred while updating the task"}), 500
 
 @bp.route('/<int:task_id>', methods=['DELETE', 'OPTIONS'])  
@@ -343,19 +200,124 @@ def delete_task(task_id):
         if not current_user:
             return jsonify({"error": "Authentication failed"}), 401
 
-        task = Task.query.filter_by(id=task_id, user_id=current_user.id).first()
+        task = task_sync.load_task(task_id, current_user.id)
         if not task:
             return jsonify({"error": "Task not found"}), 404
             
-        # Delete associated calendar event if it exists
-        if task.calendar_event_id:
-            calendar_event = CalendarEvent.query.get(task.calendar_event_id)
-            if calendar_event:
-                db.session.delete(calendar_event)
-        
-        db.session.delete(task)
+        # Deletes its Todo calendar event too
+        task_sync.delete_task(task)
         db.session.commit()
         
         return jsonify({"message": "Task deleted successfully"}), 200
     except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": "An error occurred while processing your request"}), 500
+
+BULK_OPERATIONS = ('create', 'update', 'complete', 'delete')
+
+def apply_bulk_operations(operations, tasks, user_id, results, changed):
+    """Apply bulk operations to the session, appending one result per operation.
+
+    ``tasks`` maps id to the user's preloaded tasks. Successful creates and
+    updates are appended to ``changed`` as (result, task) to serialize
+    after the flush.
+    """
+    for index, operation in enumerate(operations):
+        result = {'index': index, 'op': None, 'id': None, 'status': 200, 'task': None, 'error': None}
+        results.append(result)
+        if not isinstance(operation, dict) or operation.get('op') not in BULK_OPERATIONS:
+            result.update(status=400, error=f"op must be one of: {', '.join(BULK_OPERATIONS)}")
+            continue
+        op = result['op'] = operation['op']
+
+        try:
+            if op == 'create':
+                task = task_sync.create_task(user_id, operation)
+                result['status'] = 201
+                changed.append((result, task))
+                continue
+
+            try:
+                task = tasks.get(int(operation.get('id')))
+            except (ValueError, TypeError):
+                task = None
+            result['id'] = operation.get('id')
+            if task is None:
+                result.update(status=404, error="Task not found")
+                continue
+
+            if op == 'delete':
+                task_sync.delete_task(task)
+                # Later operations on the same id see it as gone
+                del tasks[task.id]
+                continue
+
+            fields = {'completed': operation.get('completed', True)} if op == 'complete' else operation
+            task_sync.update_task(task, fields)
+            changed.append((result, task))
+        except ValueError as e:
+            result.update(status=400, error=str(e))
+
+@bp.route('/bulk', methods=['POST', 'OPTIONS'])
+@jwt_required()
+def bulk_tasks():
+    """Apply a list of task operations in one transaction.
+
+    Body: ``{"operations": [...]}`` where each operation has an ``op`` of
+    create, update (PATCH semantics), complete (``completed`` defaults to
+    true) or delete, the task ``id`` for all but create, and the task
+    fields. Every task and its Todo calendar event are loaded up front
+    with one query, and all changes are written with a single flush.
+    Invalid operations are skipped and reported in ``results``, one per
+    operation in order; the rest are committed together.
+    """
+    if request.method == 'OPTIONS':
+        return '', 200
+        
+    try:
+        current_user = get_current_user()
+        
+        data = request.get_json(silent=True) or {}
+        operations = data.get('operations')
+        if not isinstance(operations, list) or not operations:
+            return jsonify({"error": "operations must be a non-empty list"}), 400
+        max_operations = current_app.config['TASK_BULK_MAX_OPERATIONS']
+        if len(operations) > max_operations:
+            return jsonify({"error": f"At most {max_operations} operations per request"}), 400
+        
+        task_ids = set()
+        for operation in operations:
+            if isinstance(operation, dict) and operation.get('op') != 'create':
+                try:
+                    task_ids.add(int(operation.get('id')))
+                except (ValueError, TypeError):
+                    pass
+        # One query for the tasks and their Todo events
+        tasks = task_sync.load_tasks(task_ids, current_user.id)
+        
+        results = []
+        changed = []  # (result, task) pairs serialized once ids are assigned
+        with db.session.no_autoflush:
+            apply_bulk_operations(operations, tasks, current_user.id, results, changed)
+        
+        try:
+            db.session.flush()
+            for result, task in changed:
+                result['id'] = task.id
+                result['task'] = task.to_dict()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f'Database error in bulk task update: {str(e)}\nTraceback: {traceback.format_exc()}')
+            return jsonify({"error": "Failed to save task changes"}), 500
+        
+        return jsonify({
+            'results': results,
+            'applied': sum(1 for result in results if not result['error']),
+            'failed': sum(1 for result in results if result['error'])
+        }), 200
+    except JWTExtendedException as e:
+        return jsonify({"error": "Authentication failed. Please log in again."}), 401
+    except Exception as e:
+        db.session.rollback()
         return jsonify({"error": "An error occurred while processing your request"}), 500
@@ -0,0 +1,108 @@
+import importlib.abc
+import os
+import sys
+import time
+
+class _TimedLoader(importlib.abc.Loader):
+    """Wraps a module's real loader to time how long it takes to execute"""
+
+    def __init__(self, timer, loader):
+        self._timer = timer
+        self._loader = loader
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._timer._enter(module.__name__)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._timer._exit(module.__name__)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    """Records per-module import times while the app starts up.
+
+    Installed at the front of ``sys.meta_path`` when STARTUP_REPORT is set,
+    it records cumulative time (including nested imports) and self time
+    (excluding them) for every module imported afterwards, much like
+    ``python -X importtime``.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.started_at = None
+        self.timings = {}  # module name -> [cumulative seconds, self seconds]
+        self._stack = []  # [module name, started, seconds spent in nested imports]
+
+    def start(self):
+        if not self.enabled:
+            self.enabled = True
+            self.started_at = time.perf_counter()
+            sys.meta_path.insert(0, self)
+
+    def stop(self):
+        if self.enabled:
+            self.enabled = False
+            if self in sys.meta_path:
+                sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        # Ask the remaining finders, then wrap whichever loader they return
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimedLoader(self, spec.loader)
+                return spec
+        return None
+
+    def _enter(self, name):
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def _exit(self, name):
+        _, started, nested = self._stack.pop()
+        elapsed = time.perf_counter() - started
+        self.timings[name] = [elapsed, elapsed - nested]
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    def report(self, limit=25):
+        """Format the slowest imports, grouped by top-level package"""
+        lines = []
+        if self.started_at is not None:
+            lines.append(f"Startup took {(time.perf_counter() - self.started_at) * 1000:.0f}ms "
+                         f"({len(self.timings)} modules imported)")
+
+        packages = {}
+        for name, (_, self_time) in self.timings.items():
+            top = name.split('.', 1)[0]
+            packages[top] = packages.get(top, 0.0) + self_time
+        lines.append('Import time by package (self):')
+        for top, seconds in sorted(packages.items(), key=lambda item: -item[1])[:limit]:
+            lines.append(f"  {seconds * 1000:8.1f}ms  {top}")
+
+        lines.append('Slowest modules (cumulative / self):')
+        slowest = sorted(self.timings.items(), key=lambda item: -item[1][0])[:limit]
+        for name, (cumulative, self_time) in slowest:
+            lines.append(f"  {cumulative * 1000:8.1f}ms {self_time * 1000:8.1f}ms  {name}")
+
+        try:
+            import resource
+            # ru_maxrss is kilobytes on Linux, bytes on macOS
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            rss_mb = rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+            lines.append(f"Peak RSS: {rss_mb:.1f}MB")
+        except ImportError:
+            pass
+        return '\n'.join(lines)
+
+import_timer = ImportTimer()
+
+if os.getenv('STARTUP_REPORT', 'false').lower() == 'true':
+    import_timer.start()
@@ -1,9 +1,16 @@
 from .auth import admin_required
-from .helpers import parse_datetime, validate_request_data, calculate_game_time
+from .helpers import (
+    parse_datetime, validate_request_data, password_errors, calculate_game_time,
+    encode_cursor, decode_cursor, parse_limit
+)
 
 __all__ = [
     'admin_required',
     'parse_datetime',
     'validate_request_data',
-    'calculate_game_time'
+    'password_errors',
+    'calculate_game_time',
+    'encode_cursor',
+    'decode_cursor',
+    'parse_limit'
 ]
@@ -0,0 +1,87 @@
+import re
+from flask import current_app
+from app.models.ai_conversation import AIMessage
+
+# Longest snippet kept per message when it is folded into the summary
+SUMMARY_SNIPPET_CHARS = 160
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s')
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token) - good enough for budgeting"""
+    return (len(text) + 3) // 4 if text else 0
+
+def summarize_message(message):
+    """Reduce a message to a one-line snippet for the rolling summary"""
+    content = ' '.join((message.content or '').split())
+    first_sentence = _SENTENCE_END.split(content, 1)[0]
+    if len(first_sentence) > SUMMARY_SNIPPET_CHARS:
+        first_sentence = first_sentence[:SUMMARY_SNIPPET_CHARS - 3].rstrip() + '...'
+    return f"{message.role}: {first_sentence}"
+
+def fold_into_summary(summary, messages, max_chars):
+    """Append messages to a rolling summary, dropping the oldest lines past max_chars"""
+    lines = summary.split('\n') if summary else []
+    lines.extend(summarize_message(message) for message in messages)
+
+    total = 0
+    kept = []
+    for line in reversed(lines):
+        total += len(line) + 1
+        if total > max_chars:
+            break
+        kept.append(line)
+    return '\n'.join(reversed(kept))
+
+def build_history_context(conversation, prompt):
+    """Build prompt context from a conversation's stored history.
+
+    Keeps at most AI_CONTEXT_MAX_TURNS recent turns that fit, together with
+    the prompt and summary, inside AI_CONTEXT_TOKEN_BUDGET. Anything older is
+    folded into ``conversation.rolling_summary`` exactly once and never
+    re-read, so each turn costs the same however long the conversation is.
+    The caller commits the updated summary along with the new messages.
+    """
+    max_messages = current_app.config.get('AI_CONTEXT_MAX_TURNS', 6) * 2
+    token_budget = current_app.config.get('AI_CONTEXT_TOKEN_BUDGET', 1500)
+    summary_max_chars = current_app.config.get('AI_SUMMARY_MAX_CHARS', 1200)
+    summarized_through = conversation.summarized_through_id or 0
+
+    # Only the newest unsummarized messages are loaded
+    recent = AIMessage.query.filter(
+        AIMessage.conversation_id == conversation.id,
+        AIMessage.id > summarized_through
+    ).order_by(AIMessage.id.desc()).limit(max_messages).all()
+
+    budget = token_budget - estimate_tokens(prompt) - estimate_tokens(conversation.rolling_summary)
+    window = []
+    for message in recent:
+        if not message.role or not message.content:
+            continue
+        # Stored content is already sanitized (see app.utils.sanitize)
+        line = f"{message.role}: {message.content}"
+        cost = estimate_tokens(line)
+        if cost > budget:
+            break
+        budget -= cost
+        window.append((message.id, line))
+    window.reverse()
+
+    # Everything older than the window is folded into the summary, oldest first
+    cutoff = window[0][0] - 1 if window else (recent[0].id if recent else summarized_through)
+    if cutoff > summarized_through:
+        to_fold = AIMessage.query.filter(
+            AIMessage.conversation_id == conversation.id,
+            AIMessage.id > summarized_through,
+            AIMessage.id <= cutoff
+        ).order_by(AIMessage.id).yield_per(200)
+        conversation.rolling_summary = fold_into_summary(
+            conversation.rolling_summary, to_fold, summary_max_chars
+        )
+        conversation.summarized_through_id = cutoff
+
+    parts = []
+    if conversation.rolling_summary:
+        parts.append(f"Summary of earlier conversation:\n{conversation.rolling_summary}")
+    parts.extend(line for _, line in window)
+    return '\n'.join(parts)
@@ -0,0 +1,179 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from app import db
+from app.models.ai_job import AIJob
+
+logger = logging.getLogger(__name__)
+
+class AIJobQueueFull(Exception):
+    """Raised when the job pool already has AI_JOB_MAX_PENDING jobs in flight"""
+
+class AIJobManager:
+    """Runs slow AI calls on a bounded pool instead of the request thread.
+
+    Job state lives in the ``ai_job`` table so any worker process can answer
+    a poll, while the executor and the wake-up events for long-polling are
+    local to the process that accepted the job.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._executor = None
+        self._lock = threading.Lock()
+        self._events = {}  # job id -> threading.Event for jobs running in this process
+        self._futures = {}  # job id -> Future for jobs running in this process
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.executor_type = app.config.get('AI_JOB_EXECUTOR', 'thread')
+        self.max_workers = app.config.get('AI_JOB_WORKERS', 4)
+        self.max_pending = app.config.get('AI_JOB_MAX_PENDING', 32)
+        self.timeout = app.config.get('AI_JOB_TIMEOUT', 60)
+        self.max_wait = app.config.get('AI_JOB_MAX_WAIT', 30)
+        app.extensions['ai_jobs'] = self
+
+    def _get_executor(self):
+        # Created on first use so workers that never serve AI jobs don't
+        # start (or fork) a pool
+        with self._lock:
+            if self._executor is None:
+                if self.executor_type == 'process':
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix='ai-job'
+                    )
+            return self._executor
+
+    @property
+    def pending(self):
+        """Number of jobs queued or running in this process"""
+        return len(self._events)
+
+    def submit(self, user_id, prompt, func, *args, conversation_id=None, timeout=None, on_complete=None):
+        """Queue ``func(*args)`` and return the new AIJob row.
+
+        ``func`` must be picklable (a module-level function) when the process
+        executor is configured. ``on_complete(job, result)`` runs inside an
+        app context in this process and may add rows to the session; it is
+        committed together with the job's final state.
+        """
+        with self._lock:
+            if len(self._events) >= self.max_pending:
+                raise AIJobQueueFull(f'{len(self._events)} AI jobs already pending')
+            job_id = uuid.uuid4().hex
+            self._events[job_id] = threading.Event()
+
+        try:
+            job = AIJob(
+                id=job_id,
+                user_id=user_id,
+                conversation_id=conversation_id,
+                prompt=prompt,
+                status='pending',
+                deadline=datetime.utcnow() + timedelta(seconds=timeout or self.timeout)
+            )
+            db.session.add(job)
+            db.session.commit()
+
+            future = self._get_executor().submit(func, *args)
+            self._futures[job_id] = future
+        except Exception:
+            db.session.rollback()
+            self._events.pop(job_id, None)
+            raise
+
+        future.add_done_callback(lambda f: self._on_done(job_id, f, on_complete))
+        return job
+
+    def _on_done(self, job_id, future, on_complete):
+        with self.app.app_context():
+            try:
+                job = db.session.get(AIJob, job_id)
+                if job is None or job.is_finished:
+                    # Already timed out by a poller; drop the late result
+                    return
+
+                if datetime.utcnow() > job.deadline:
+                    job.status = 'timed_out'
+                    job.error = 'AI job timed out'
+                elif future.cancelled():
+                    job.status = 'failed'
+                    job.error = 'AI job was cancelled'
+                elif future.exception() is not None:
+                    job.status = 'failed'
+                    job.error = str(future.exception())
+                else:
+                    result = future.result()
+                    if on_complete is not None:
+                        on_complete(job, result)
+                    job.response = result
+                    job.status = 'completed'
+                job.finished_at = datetime.utcnow()
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Error finishing AI job {job_id}: {str(e)}")
+                try:
+                    job = db.session.get(AIJob, job_id)
+                    if job is not None and not job.is_finished:
+                        job.status = 'failed'
+                        job.error = 'Failed to store AI job result'
+                        job.finished_at = datetime.utcnow()
+                        db.session.commit()
+                except Exception:
+                    db.session.rollback()
+            finally:
+                self._futures.pop(job_id, None)
+                event = self._events.pop(job_id, None)
+                if event is not None:
+                    event.set()
+
+    def _expire(self, job):
+        """Mark an unfinished job as timed out once its deadline has passed"""
+        if not job.is_finished and datetime.utcnow() > job.deadline:
+            job.status = 'timed_out'
+            job.error = 'AI job timed out'
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            # Skip the upstream call entirely if the job never got a worker
+            future = self._futures.get(job.id)
+            if future is not None:
+                future.cancel()
+        return job
+
+    def get(self, job_id, user_id, wait=0):
+        """Return a job owned by ``user_id``, waiting up to ``wait`` seconds for it to finish"""
+        job = AIJob.query.filter_by(id=job_id, user_id=user_id).first()
+        if job is None:
+            return None
+
+        wait = max(0, min(float(wait or 0), self.max_wait))
+        if wait and not job.is_finished:
+            # Never wait past the job deadline
+            remaining = (job.deadline - datetime.utcnow()).total_seconds()
+            wait = max(0, min(wait, remaining))
+            event = self._events.get(job_id)
+            if event is not None:
+                event.wait(wait)
+            else:
+                # Job belongs to another worker process - fall back to polling the table
+                end = time.monotonic() + wait
+                while time.monotonic() < end:
+                    time.sleep(min(0.5, max(0, end - time.monotonic())))
+                    db.session.expire(job)
+                    if job.is_finished:
+                        break
+            db.session.expire(job)
+
+        return self._expire(job)
+
+ai_jobs = AIJobManager()
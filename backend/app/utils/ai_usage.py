@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from app.models.ai_usage import AIUsage
+from app.utils.ai_context import estimate_tokens
+from app.utils.gemini import SYSTEM_PROMPT
+
+class QuotaExceeded(Exception):
+    """Raised when a user has used up their daily or monthly token quota"""
+
+    def __init__(self, period, quota, retry_after):
+        super().__init__(f"{period.capitalize()} AI token quota of {quota} reached")
+        self.period = period
+        self.quota = quota
+        self.retry_after = retry_after
+
+def estimate_input_tokens(context):
+    """Estimated tokens sent upstream for a context, system prompt included"""
+    return estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(context)
+
+def estimate_call_cost(context, config=None):
+    """Estimated tokens for a whole call, used to schedule it before the reply is known"""
+    config = config if config is not None else current_app.config
+    return estimate_input_tokens(context) + config.get('AI_OUTPUT_TOKEN_ESTIMATE', 400)
+
+def record_usage(user_id, context, response):
+    """Record one upstream call's estimated tokens (caller commits)"""
+    AIUsage.record(user_id, estimate_input_tokens(context), estimate_tokens(response))
+
+def _periods(now):
+    today = now.date()
+    month_start = today.replace(day=1)
+    next_month = (month_start + timedelta(days=32)).replace(day=1)
+    return (
+        ('daily', today, datetime.combine(today + timedelta(days=1), datetime.min.time())),
+        ('monthly', month_start, datetime.combine(next_month, datetime.min.time()))
+    )
+
+def get_usage(user_id):
+    """Today's and this month's usage alongside the configured quotas"""
+    config = current_app.config
+    quotas = {'daily': config.get('AI_DAILY_TOKEN_QUOTA', 0), 'monthly': config.get('AI_MONTHLY_TOKEN_QUOTA', 0)}
+    usage = {}
+    for period, since, resets_at in _periods(datetime.utcnow()):
+        requests, input_tokens, output_tokens = AIUsage.totals(user_id, since)
+        usage[period] = {
+            'requests': requests,
+            'input_tokens': input_tokens,
+            'output_tokens': output_tokens,
+            'total_tokens': input_tokens + output_tokens,
+            'quota': quotas[period] or None,  # None when unlimited
+            'resets_at': resets_at.isoformat()
+        }
+    return usage
+
+def check_quota(user_id, cost=0):
+    """Raise QuotaExceeded once the user's daily or monthly quota is used up.
+
+    A request that starts under quota is allowed to finish, so usage can
+    overshoot by up to one response. Requests that make several calls pass
+    their estimated total ``cost``, and are refused unless it all fits.
+    """
+    config = current_app.config
+    if not config.get('AI_DAILY_TOKEN_QUOTA') and not config.get('AI_MONTHLY_TOKEN_QUOTA'):
+        return
+    now = datetime.utcnow()
+    for period, since, resets_at in _periods(now):
+        quota = config.get('AI_DAILY_TOKEN_QUOTA' if period == 'daily' else 'AI_MONTHLY_TOKEN_QUOTA')
+        if not quota:
+            continue
+        _, input_tokens, output_tokens = AIUsage.totals(user_id, since)
+        used = input_tokens + output_tokens
+        if used >= quota or used + cost > quota:
+            raise QuotaExceeded(period, quota, (resets_at - now).total_seconds())
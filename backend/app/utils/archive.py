@@ -0,0 +1,80 @@
+import logging
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete
+from app.extensions import db
+from app.models.ai_conversation import AIConversation, AIMessage
+from app.models.ai_message_archive import AIMessageArchive
+from app.utils.ai_context import fold_into_summary
+from app.utils.compression import resolve_codec
+
+logger = logging.getLogger(__name__)
+
+def archive_messages(older_than_days=None, batch_size=None, codec=None):
+    """Move old messages of inactive conversations into ai_message_archive.
+
+    Each conversation's messages older than the cutoff become one
+    compressed AIMessageArchive row and are deleted from ai_message in the
+    same transaction, one batch of conversations at a time. Messages not
+    yet in the rolling summary are folded into it first, so reactivated
+    conversations keep their context. message_count and the preview are
+    left alone - the messages still exist, just not in the hot table.
+    Returns counts of what was archived.
+    """
+    config = current_app.config
+    if older_than_days is None:
+        older_than_days = config.get('AI_ARCHIVE_AFTER_DAYS', 90)
+    if batch_size is None:
+        batch_size = config.get('AI_ARCHIVE_BATCH_SIZE', 100)
+    codec = resolve_codec(codec or config.get('AI_ARCHIVE_CODEC', 'zlib'))
+    summary_max_chars = config.get('AI_SUMMARY_MAX_CHARS', 1200)
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+
+    stats = {'conversations': 0, 'messages': 0, 'raw_bytes': 0, 'compressed_bytes': 0}
+    last_id = 0
+    while True:
+        conversation_ids = [row[0] for row in db.session.query(AIMessage.conversation_id).join(
+            AIConversation, AIConversation.id == AIMessage.conversation_id
+        ).filter(
+            AIConversation.is_active.is_(False),
+            AIMessage.created_at < cutoff,
+            AIMessage.conversation_id > last_id
+        ).distinct().order_by(AIMessage.conversation_id).limit(batch_size)]
+        if not conversation_ids:
+            break
+
+        for conversation_id in conversation_ids:
+            conversation = db.session.get(AIConversation, conversation_id)
+            messages = AIMessage.query.filter(
+                AIMessage.conversation_id == conversation_id,
+                AIMessage.created_at < cutoff
+            ).order_by(AIMessage.created_at, AIMessage.id).all()
+
+            summarized_through = conversation.summarized_through_id or 0
+            unsummarized = [message for message in messages if message.id > summarized_through]
+            if unsummarized:
+                conversation.rolling_summary = fold_into_summary(
+                    conversation.rolling_summary, unsummarized, summary_max_chars
+                )
+                conversation.summarized_through_id = max(message.id for message in unsummarized)
+
+            archive = AIMessageArchive.pack(conversation_id, messages, codec)
+            db.session.add(archive)
+            # A bulk delete, so the message_count listeners don't fire
+            db.session.execute(
+                delete(AIMessage.__table__).where(AIMessage.__table__.c.id.in_([m.id for m in messages]))
+            )
+            for message in messages:
+                db.session.expunge(message)
+
+            stats['conversations'] += 1
+            stats['messages'] += len(messages)
+            stats['raw_bytes'] += archive.raw_size
+            stats['compressed_bytes'] += len(archive.data)
+
+        db.session.commit()
+        last_id = conversation_ids[-1]
+
+    logger.info(f"Archived {stats['messages']} messages from {stats['conversations']} conversations "
+                f"({stats['raw_bytes']} -> {stats['compressed_bytes']} bytes, {codec})")
+    return stats
@@ -0,0 +1,188 @@
+import html
+import logging
+import re
+import threading
+import time
+from sqlalchemy import event
+from app.extensions import db
+from app.models.ai_conversation import AIConversation, AIMessage
+from app.models.ai_usage import AIUsage
+from app.utils.ai_context import estimate_tokens
+from app.utils.ai_usage import estimate_input_tokens
+from app.utils.fair_scheduler import get_scheduler
+from app.utils.gemini import get_gemini_api
+from app.utils.sanitize import sanitize_text
+from app.utils.search_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TITLE = 'New Conversation'
+
+# Characters of each exchange shown to the model when asking for titles
+TITLE_EXCERPT_CHARS = 300
+
+_NUMBERED_LINE = re.compile(r'^\s*(\d+)[.):]\s*(.+?)\s*$')
+
+def keyword_title(text, max_words=4, max_length=60):
+    """Title from the most frequent keywords of a prompt, in order of first use"""
+    tokens = tokenize(html.unescape(text or ''))
+    counts = {}
+    for token in tokens:
+        counts[token] = counts.get(token, 0) + 1
+    keywords = sorted(counts, key=lambda token: (-counts[token], tokens.index(token)))[:max_words]
+    keywords.sort(key=tokens.index)
+    title = ' '.join(keyword.capitalize() for keyword in keywords)
+    return title[:max_length].rstrip() or None
+
+def parse_titles(reply, count, max_length=60):
+    """Read '<n>. <title>' lines from the model's reply into a {n: title} dict"""
+    titles = {}
+    for line in (reply or '').splitlines():
+        match = _NUMBERED_LINE.match(line)
+        if not match:
+            continue
+        number = int(match.group(1))
+        title = match.group(2).strip().strip('"\'*').strip()
+        if 1 <= number <= count and title:
+            titles[number] = title[:max_length].rstrip()
+    return titles
+
+class AutoTitler:
+    """Names new conversations in the background after their first exchange.
+
+    Exchanges mark their conversation in the session; once the transaction
+    commits, the ids are queued for a background thread that waits
+    AI_TITLE_BATCH_DELAY seconds to gather a batch, then titles every
+    conversation still called "New Conversation" - with one model call for
+    the whole batch when AI is enabled, or from keywords of the first
+    prompt otherwise. A title the user set in the meantime is never
+    overwritten. The thread is per process and started on first use.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self._pending = set()
+        self._cond = threading.Condition()
+        self._thread = None
+        self.titled = 0
+        self.failed_batches = 0
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('AI_AUTO_TITLE', True)
+        self.batch_size = app.config.get('AI_TITLE_BATCH_SIZE', 8)
+        self.batch_delay = app.config.get('AI_TITLE_BATCH_DELAY', 2.0)
+        self.max_length = app.config.get('AI_TITLE_MAX_LENGTH', 60)
+        app.extensions['auto_title'] = self
+
+    def mark(self, conversation_id):
+        """Queue a conversation for titling once the current transaction commits"""
+        if self.enabled:
+            db.session.info.setdefault('auto_title', set()).add(conversation_id)
+
+    def enqueue(self, conversation_ids):
+        with self._cond:
+            self._pending.update(conversation_ids)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='ai-auto-title', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            # Let more conversations arrive so they share one model call
+            time.sleep(self.batch_delay)
+            with self._cond:
+                batch = sorted(self._pending)[:self.batch_size]
+                self._pending.difference_update(batch)
+            try:
+                with self.app.app_context():
+                    self.title_conversations(batch)
+            except Exception as e:
+                self.failed_batches += 1
+                logger.error(f"Error titling conversations {batch}: {str(e)}")
+
+    def title_conversations(self, conversation_ids):
+        """Title those of ``conversation_ids`` that still have the default title"""
+        conversations = AIConversation.query.filter(
+            AIConversation.id.in_(conversation_ids),
+            AIConversation.title == DEFAULT_TITLE
+        ).order_by(AIConversation.id).all()
+        exchanges = []
+        for conversation in conversations:
+            first = AIMessage.query.filter_by(conversation_id=conversation.id).order_by(
+                AIMessage.created_at, AIMessage.id
+            ).limit(2).all()
+            prompt = next((message.content for message in first if message.role == 'user'), None)
+            if prompt:
+                reply = next((message.content for message in first if message.role == 'assistant'), '')
+                exchanges.append((conversation.id, conversation.user_id, prompt, reply))
+        if not exchanges:
+            return
+
+        titles = {}
+        if self.app.config.get('AI_ENABLED'):
+            try:
+                titles = self._model_titles(exchanges)
+            except Exception as e:
+                logger.warning(f"Falling back to keyword titles: {str(e)}")
+        for conversation_id, _, prompt, _ in exchanges:
+            title = titles.get(conversation_id) or keyword_title(prompt, max_length=self.max_length)
+            if not title:
+                continue
+            # Only while still untitled, and without reordering the sidebar
+            updated = AIConversation.query.filter_by(id=conversation_id, title=DEFAULT_TITLE).update({
+                AIConversation.title: sanitize_text(title)[:100],
+                AIConversation.updated_at: AIConversation.updated_at
+            }, synchronize_session=False)
+            self.titled += updated
+        db.session.commit()
+
+    def _model_titles(self, exchanges):
+        """Ask the model for every title at once, charging each user their share of the call"""
+        sections = []
+        for number, (_, _, prompt, reply) in enumerate(exchanges, 1):
+            excerpt = html.unescape(f"user: {prompt}\nassistant: {reply}")[:TITLE_EXCERPT_CHARS]
+            sections.append(f"{number}.\n{excerpt}")
+        request = (
+            f"Write a short title of at most six words for each of these {len(exchanges)} conversations. "
+            "Reply with exactly one line per conversation in the form '<number>. <title>' and nothing else.\n\n"
+            + '\n\n'.join(sections)
+        )
+        cost = estimate_tokens(request)
+        reply = get_gemini_api().generate_response(request, slot=lambda: get_scheduler().slot('auto-title', cost))
+        self._record_usage(exchanges, sections, request, reply)
+        parsed = parse_titles(reply, len(exchanges), self.max_length)
+        return {exchanges[number - 1][0]: title for number, title in parsed.items()}
+
+    def _record_usage(self, exchanges, sections, request, reply):
+        """Record the call against the conversations' owners (committed with the titles).
+
+        Each user is charged for their own excerpts plus an even share of the
+        instructions and the reply, so titling counts towards AI quotas.
+        """
+        excerpt_tokens = [estimate_tokens(section) for section in sections]
+        shared_input = max(estimate_input_tokens(request) - sum(excerpt_tokens), 0) / len(exchanges)
+        shared_output = estimate_tokens(reply) / len(exchanges)
+        usage = {}
+        for (_, user_id, _, _), tokens in zip(exchanges, excerpt_tokens):
+            input_tokens, output_tokens = usage.get(user_id, (0, 0))
+            usage[user_id] = (input_tokens + tokens + shared_input, output_tokens + shared_output)
+        for user_id, (input_tokens, output_tokens) in usage.items():
+            AIUsage.record(user_id, round(input_tokens), round(output_tokens))
+
+auto_titler = AutoTitler()
+
+@event.listens_for(db.session, 'after_commit')
+def queue_marked_conversations(session):
+    conversation_ids = session.info.pop('auto_title', None)
+    if conversation_ids:
+        auto_titler.enqueue(conversation_ids)
+
+@event.listens_for(db.session, 'after_rollback')
+def drop_marked_conversations(session):
+    session.info.pop('auto_title', None)
@@ -0,0 +1,62 @@
+import base64
+import logging
+import zlib
+from flask import current_app, has_app_context
+from sqlalchemy.types import Text, TypeDecorator
+
+try:
+    import zstandard
+except ImportError:  # Optional - zlib is always available
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Marks a CompressedText value as zlib + base64 rather than plain text
+COMPRESSED_PREFIX = '\x01z:'
+
+def resolve_codec(name):
+    """Return the codec to write with, falling back to zlib when zstd isn't installed"""
+    if name == 'zstd' and zstandard is None:
+        logger.warning('zstandard is not installed; archiving with zlib instead')
+        return 'zlib'
+    if name not in ('zlib', 'zstd'):
+        raise ValueError(f"Unknown compression codec: {name}")
+    return name
+
+def compress(data: bytes, codec: str = 'zlib') -> bytes:
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return zlib.compress(data, 9)
+
+def decompress(data: bytes, codec: str = 'zlib') -> bytes:
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('zstandard is required to read zstd-compressed archives')
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+class CompressedText(TypeDecorator):
+    """Text column that transparently compresses long values.
+
+    With AI_COMPRESS_MESSAGES on, values of at least AI_COMPRESS_MIN_CHARS
+    are written as a marker plus base64 zlib data when that is smaller, so
+    the column stays TEXT and existing rows read back unchanged. Compressed
+    values can't be searched with SQL LIKE.
+    """
+
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or not has_app_context():
+            return value
+        config = current_app.config
+        if not config.get('AI_COMPRESS_MESSAGES') or len(value) < config.get('AI_COMPRESS_MIN_CHARS', 1024):
+            return value
+        packed = COMPRESSED_PREFIX + base64.b64encode(compress(value.encode('utf-8'))).decode('ascii')
+        return packed if len(packed) < len(value) else value
+
+    def process_result_value(self, value, dialect):
+        if value is not None and value.startswith(COMPRESSED_PREFIX):
+            return decompress(base64.b64decode(value[len(COMPRESSED_PREFIX):])).decode('utf-8')
+        return value
@@ -0,0 +1,128 @@
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from flask import current_app
+
+class SchedulerBusy(Exception):
+    """Raised when a request waited AI_SCHEDULER_MAX_WAIT seconds without getting a slot"""
+
+    def __init__(self, retry_after):
+        super().__init__('Timed out waiting for an AI slot')
+        self.retry_after = retry_after
+
+class FairScheduler:
+    """Caps concurrent upstream calls and queues the rest in weighted-fair order.
+
+    Start-time fair queuing: each request gets a virtual finish tag of
+    ``max(virtual time, user's previous finish tag) + cost / weight``, and
+    freed slots go to the smallest tag. A user sending many or large
+    requests pushes their own tags out, so a light user's next request
+    jumps ahead of a heavy user's backlog while the cap is saturated.
+    Costs are estimated tokens. The cap is per process.
+    """
+
+    def __init__(self, max_concurrent=8, max_wait=30):
+        self.max_concurrent = max_concurrent
+        self.max_wait = max_wait
+        self.virtual_time = 0.0
+        self.active = 0
+        self.queued_total = 0
+        self.rejected = 0
+        self._finish_tags = {}  # user -> finish tag of their latest request
+        self._queue = []  # heap of [finish tag, seq, start tag, state]
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            max_concurrent=config.get('AI_MAX_CONCURRENT_CALLS', 8),
+            max_wait=config.get('AI_SCHEDULER_MAX_WAIT', 30)
+        )
+
+    @contextmanager
+    def slot(self, user_id, cost, weight=1.0):
+        """Hold one upstream slot for the duration of the block"""
+        self.acquire(user_id, cost, weight)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def acquire(self, user_id, cost, weight=1.0):
+        if self.max_concurrent <= 0:
+            return
+        with self._cond:
+            start = max(self.virtual_time, self._finish_tags.get(user_id, 0.0))
+            finish = start + max(cost, 1) / weight
+            self._finish_tags[user_id] = finish
+            if self.active < self.max_concurrent and not self._queue:
+                self.active += 1
+                self.virtual_time = start
+                return
+
+            entry = [finish, next(self._seq), start, 'waiting']
+            heapq.heappush(self._queue, entry)
+            self.queued_total += 1
+            # Slots may be free with only abandoned entries ahead
+            self._dispatch()
+            deadline = time.monotonic() + self.max_wait
+            while entry[3] == 'waiting':
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    # Left in the heap and skipped when it reaches the top
+                    entry[3] = 'abandoned'
+                    self.rejected += 1
+                    raise SchedulerBusy(retry_after=max(1, self.max_wait / 2))
+                self._cond.wait(remaining)
+
+    def release(self):
+        if self.max_concurrent <= 0:
+            return
+        with self._cond:
+            self.active -= 1
+            self._dispatch()
+
+    def _dispatch(self):
+        granted = False
+        while self.active < self.max_concurrent and self._queue:
+            entry = heapq.heappop(self._queue)
+            if entry[3] != 'waiting':
+                continue
+            entry[3] = 'granted'
+            self.active += 1
+            self.virtual_time = max(self.virtual_time, entry[2])
+            granted = True
+        if granted:
+            self._cond.notify_all()
+        if len(self._finish_tags) > 1024:
+            # Tags at or behind virtual time no longer affect scheduling
+            self._finish_tags = {
+                user: tag for user, tag in self._finish_tags.items() if tag > self.virtual_time
+            }
+
+    def stats(self):
+        with self._cond:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'active': self.active,
+                'waiting': sum(1 for entry in self._queue if entry[3] == 'waiting'),
+                'queued_total': self.queued_total,
+                'rejected': self.rejected
+            }
+
+# One scheduler per process, like the AI client, so every route and job
+# thread shares the same cap
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler(config=None):
+    """Return this process's FairScheduler, building it from config (default: current_app.config)"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = FairScheduler.from_config(config if config is not None else current_app.config)
+    return _scheduler
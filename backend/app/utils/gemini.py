@@ -1,27 +1,16 @@
-import os
-from google.generativeai import configure, GenerativeModel
-from google.generativeai.types import GenerationConfig
+from contextlib import nullcontext
+from typing import Iterator
+from flask import current_app
 import logging
+import threading
+import time
+from app.utils.llm_backends import GeminiBackend, create_backend
+from app.utils.resilience import CircuitBreaker, SingleFlight, call_with_retry, is_client_error
 
 logger = logging.getLogger(__name__)
 
-class GeminiAPI:
-    def __init__(self):
-        # Configure Gemini with API key
-        configure(api_key=os.getenv('GEMINI_API_KEY'))
-        self.client = GenerativeModel()
-        self.model_name = "gemini-pro"
-        self.generation_config = GenerationConfig(
-            temperature=0.7,
-            top_p=0.8,
-            top_k=40,
-            max_output_tokens=2048
-        )
-
-    def generate_response(self, prompt: str) -> str:
-        try:
-            # Create a system prompt with formatting instructions
-            system_prompt = """
+# System prompt with formatting instructions sent ahead of every user prompt
+SYSTEM_PROMPT = """
             You are a helpful AI assistant. Follow these instructions:
             1. Display responses in readable text with no markdown formatting or special characters
             2. Do not include any additional formatting or special characters
@@ -30,33 +19,176 @@ class GeminiAPI:
             
             User's prompt follows:
             """
-            
-            # Generate response
-            response = self.client.generate_content(
-                contents=[system_prompt, prompt],
-                generation_config=self.generation_config
+
+class GeminiAPI:
+    """Client for the configured LLM backend.
+
+    Adds the system prompt, response clean-up, request coalescing, retries
+    and the circuit breaker on top of whichever LLMBackend it wraps
+    (Gemini by default).
+    """
+
+    def __init__(self, backend=None, max_retries=3, backoff_base=0.5, backoff_max=8.0,
+                 breaker_threshold=0.5, breaker_min_calls=10, breaker_window=60, breaker_cooldown=30):
+        self.backend = backend if backend is not None else GeminiBackend()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.sleep = time.sleep
+        self.breaker = CircuitBreaker(
+            threshold=breaker_threshold,
+            min_calls=breaker_min_calls,
+            window=breaker_window,
+            cooldown=breaker_cooldown
+        )
+        self.single_flight = SingleFlight()
+
+    @classmethod
+    def from_config(cls, config, backend=None):
+        """Build a client for AI_BACKEND using the AI_RETRY_* and AI_BREAKER_* settings"""
+        return cls(
+            backend=backend if backend is not None else create_backend(config),
+            max_retries=config.get('AI_RETRY_MAX', 3),
+            backoff_base=config.get('AI_RETRY_BACKOFF_BASE', 0.5),
+            backoff_max=config.get('AI_RETRY_BACKOFF_MAX', 8.0),
+            breaker_threshold=config.get('AI_BREAKER_ERROR_RATE', 0.5),
+            breaker_min_calls=config.get('AI_BREAKER_MIN_CALLS', 10),
+            breaker_window=config.get('AI_BREAKER_WINDOW', 60),
+            breaker_cooldown=config.get('AI_BREAKER_COOLDOWN', 30)
+        )
+
+    @property
+    def fingerprint(self) -> str:
+        """Identify the backend, model and generation settings, for response cache keys"""
+        return f"{self.backend.name}:{self.backend.fingerprint}"
+
+    def generate_response(self, prompt: str, slot=None) -> str:
+        """Generate a response, coalescing identical prompts already in flight.
+
+        ``slot`` is a context manager factory (e.g. a fair-scheduler slot)
+        entered only by the caller that makes the upstream call; callers
+        waiting on its result hold no slot.
+        """
+        return self.single_flight.do(prompt, lambda: self._generate_in_slot(prompt, slot))
+
+    def _generate_in_slot(self, prompt, slot):
+        with slot() if slot else nullcontext():
+            return self._generate_guarded(prompt)
+
+    def _generate_guarded(self, prompt: str) -> str:
+        # Fails fast with CircuitOpenError while upstream is unhealthy
+        self.breaker.before_call()
+        try:
+            text = call_with_retry(
+                lambda: self._generate_once(prompt),
+                max_retries=self.max_retries,
+                base_delay=self.backoff_base,
+                max_delay=self.backoff_max,
+                sleep=self.sleep
             )
-            
-            if not response:
-                raise Exception("No response received from Gemini API")
-                
-            # Extract text from response
-            if hasattr(response, 'text'):
-                text = str(response.text)
-            elif hasattr(response, 'candidates') and response.candidates:
-                text = str(response.candidates[0].text)
+        except Exception as e:
+            if is_client_error(e):
+                # Upstream answered; the request itself was bad
+                self.breaker.record_success()
             else:
-                raise Exception("Invalid response format from Gemini API")
-                
-            # Clean up the response by removing any debug logs or unwanted text
-            text = text.strip()
-            
-            # Remove any unwanted prefix if present
-            if text.startswith("Response:") or text.startswith("Answer:"):
-                text = text.split("\n", 1)[1].strip() if "\n" in text else text
+                self.breaker.record_failure()
+            logger.error(f"Error generating response: {str(e)}")
+            raise Exception(f"Failed to generate response: {str(e)}") from e
+        self.breaker.record_success()
+        return text
+
+    def _generate_once(self, prompt: str) -> str:
+        text = self.backend.generate(SYSTEM_PROMPT, prompt)
             
-            return text
-                
+        # Clean up the response by removing any debug logs or unwanted text
+        text = text.strip()
+        
+        # Remove any unwanted prefix if present
+        if text.startswith("Response:") or text.startswith("Answer:"):
+            text = text.split("\n", 1)[1].strip() if "\n" in text else text
+        
+        return text
+
+    def status(self) -> dict:
+        """Backend, circuit breaker state and single-flight counters"""
+        return {
+            'backend': self.backend.name,
+            'breaker': self.breaker.snapshot(),
+            'coalesced_requests': self.single_flight.coalesced
+        }
+
+    def generate_response_stream(self, prompt: str) -> Iterator[str]:
+        """Yield response text chunks as the model produces them.
+
+        Closing the returned generator stops reading from the upstream
+        stream, so callers can abandon a response when the client goes away.
+        """
+        self.breaker.before_call()
+        try:
+            # Only opening the stream is retried; a stream that fails part
+            # way through can't be replayed without duplicating output
+            response = call_with_retry(
+                lambda: self.backend.stream(SYSTEM_PROMPT, prompt),
+                max_retries=self.max_retries,
+                base_delay=self.backoff_base,
+                max_delay=self.backoff_max,
+                sleep=self.sleep
+            )
         except Exception as e:
-            logger.error(f"Error generating response: {str(e)}")
-            raise Exception(f"Failed to generate response: {str(e)}")
\ No newline at end of file
+            if is_client_error(e):
+                # Upstream answered; the request itself was bad
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+            logger.error(f"Error starting response stream: {str(e)}")
+            raise Exception(f"Failed to generate response: {str(e)}") from e
+
+        first = True
+        failed = False
+        try:
+            for text in response:
+                if not text:
+                    continue
+                if first:
+                    # Same prefix clean-up as the non-streaming path
+                    text = text.lstrip()
+                    for prefix in ("Response:", "Answer:"):
+                        if text.startswith(prefix):
+                            text = text[len(prefix):].lstrip()
+                    if not text:
+                        continue
+                    first = False
+                yield text
+        except Exception as e:
+            failed = True
+            self.breaker.record_failure()
+            logger.error(f"Error streaming response: {str(e)}")
+            raise Exception(f"Failed to generate response: {str(e)}") from e
+        finally:
+            # A stream the client abandoned still counts as a healthy upstream
+            if not failed:
+                self.breaker.record_success()
+
+# One client per process, built on first use so workers that never serve AI
+# traffic don't pay for the backend's imports or set-up
+_api = None
+_api_lock = threading.Lock()
+
+def ai_config(config):
+    """The picklable subset of app config the AI client is built from"""
+    return {key: value for key, value in config.items() if key.startswith(('AI_', 'GEMINI_'))}
+
+def get_gemini_api(config=None):
+    """Return this process's GeminiAPI, building it from config (default: current_app.config)"""
+    global _api
+    if _api is None:
+        with _api_lock:
+            if _api is None:
+                started = time.perf_counter()
+                _api = GeminiAPI.from_config(config if config is not None else current_app.config)
+                logger.info(f"Initialized {_api.backend.name} AI backend in "
+                            f"{(time.perf_counter() - started) * 1000:.0f}ms")
+    return _api
+
+def gemini_api_initialized():
+    return _api is not None
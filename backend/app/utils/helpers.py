@@ -1,3 +1,6 @@
+import base64
+import json
+import re
 from datetime import datetime
 from typing import Dict, Any, Optional
 
@@ -17,7 +20,45 @@ def validate_request_data(data: Dict[str, Any], required_fields: list) -> tuple[
         return False, f"Missing required fields: {', '.join(missing_fields)}"
     return True, None
 
+def password_errors(password: str) -> list:
+    """Password strength rules the password fails, phrased to follow 'Password must: '"""
+    errors = []
+    if len(password) < 8:
+        errors.append("be at least 8 characters long")
+    if not re.search(r'[A-Z]', password):
+        errors.append("include at least one uppercase letter (A-Z)")
+    if not re.search(r'[a-z]', password):
+        errors.append("include at least one lowercase letter (a-z)")
+    if not re.search(r'[0-9]', password):
+        errors.append("include at least one number (0-9)")
+    if not re.search(r'[@$!%*?&]', password):
+        errors.append("include at least one special character (@$!%*?&)")
+    return errors
+
 def calculate_game_time(study_duration: int) -> int:
     """Calculate game time earned based on study duration"""
     # For every hour studied, earn 15 minutes of game time
     return (study_duration // 60) * 15
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """Encode keyset pagination values as an opaque URL-safe cursor"""
+    payload = {key: value.isoformat() if isinstance(value, datetime) else value
+               for key, value in values.items()}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Decode a cursor from encode_cursor; returns None if it is missing or malformed"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return values if isinstance(values, dict) else None
+    except (ValueError, TypeError):
+        return None
+
+def parse_limit(value: Optional[int], default: int, maximum: int) -> int:
+    """Clamp a requested page size to 1..maximum"""
+    if value is None:
+        return default
+    return max(1, min(value, maximum))
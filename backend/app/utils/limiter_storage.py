@@ -0,0 +1,156 @@
+import os
+import sqlite3
+import threading
+import time
+from limits.storage import MovingWindowSupport, Storage
+
+class SQLiteStorage(Storage, MovingWindowSupport):
+    """Rate limit counters in a WAL-mode SQLite file shared by every worker on a node.
+
+    ``memory://`` keeps counters per process, so with N gunicorn workers
+    each limit is effectively N times larger. Pointing every worker at the
+    same file makes them share one set of counters without running a
+    separate service. A fixed-window hit is a single UPSERT ... RETURNING
+    statement, so it is atomic across processes without an explicit
+    transaction; moving windows take a short write lock.
+
+    Registered with the ``limits`` package as ``sqlite:///relative/path.db``
+    or ``sqlite:////absolute/path.db``, like SQLAlchemy URIs.
+    """
+
+    STORAGE_SCHEME = ['sqlite']
+
+    # Expired counters and window entries are purged every this many hits
+    PURGE_EVERY = 1000
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        path = uri.split('://', 1)[1]
+        path = path[1:] if path.startswith('/') else path
+        if not path or path == ':memory:':
+            raise ValueError('SQLite rate limit storage needs a file path shared by the workers')
+        self.path = os.path.abspath(path)
+        self.timeout = float(options.get('timeout', 5))
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._hits = 0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self._create_schema()
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    @property
+    def _connection(self):
+        # One connection per thread, reopened after a fork
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')  # Safe with WAL, and no fsync per hit
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _create_schema(self):
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS rate_limit_counter (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS rate_limit_entry (
+                key TEXT NOT NULL,
+                at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_rate_limit_entry_key_at ON rate_limit_entry (key, at);
+        """)
+
+    def _maybe_purge(self, now):
+        self._hits += 1
+        if self._hits % self.PURGE_EVERY == 0:
+            connection = self._connection
+            connection.execute('DELETE FROM rate_limit_counter WHERE expires_at <= ?', (now,))
+            # Entries are only ever checked against windows of at most a day
+            connection.execute('DELETE FROM rate_limit_entry WHERE at <= ?', (now - 86400,))
+
+    def incr(self, key: str, expiry: float, amount: int = 1, elastic_expiry: bool = False) -> int:
+        """Add ``amount`` to the counter, starting a new window of ``expiry`` seconds if it expired"""
+        now = time.time()
+        # elastic_expiry is only passed by older versions of limits
+        row = self._connection.execute("""
+            INSERT INTO rate_limit_counter (key, value, expires_at) VALUES (:key, :amount, :expires_at)
+            ON CONFLICT (key) DO UPDATE SET
+                value = CASE WHEN expires_at <= :now THEN excluded.value ELSE value + excluded.value END,
+                expires_at = CASE WHEN expires_at <= :now OR :elastic THEN excluded.expires_at ELSE expires_at END
+            RETURNING value
+        """, {'key': key, 'amount': amount, 'expires_at': now + expiry, 'now': now,
+              'elastic': bool(elastic_expiry)}).fetchone()
+        self._maybe_purge(now)
+        return row[0]
+
+    def get(self, key: str) -> int:
+        row = self._connection.execute(
+            'SELECT value FROM rate_limit_counter WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        now = time.time()
+        row = self._connection.execute(
+            'SELECT expires_at FROM rate_limit_counter WHERE key = ? AND expires_at > ?', (key, now)
+        ).fetchone()
+        return row[0] if row else now
+
+    def check(self) -> bool:
+        try:
+            self._connection.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> int:
+        connection = self._connection
+        cleared = connection.execute('DELETE FROM rate_limit_counter').rowcount
+        cleared += connection.execute('DELETE FROM rate_limit_entry').rowcount
+        return cleared
+
+    def clear(self, key: str) -> None:
+        connection = self._connection
+        connection.execute('DELETE FROM rate_limit_counter WHERE key = ?', (key,))
+        connection.execute('DELETE FROM rate_limit_entry WHERE key = ?', (key,))
+
+    def acquire_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        """Record ``amount`` hits in the moving window if that keeps it within ``limit``"""
+        if amount > limit:
+            return False
+        now = time.time()
+        connection = self._connection
+        # IMMEDIATE takes the write lock up front, so the count can't change under us
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute('DELETE FROM rate_limit_entry WHERE key = ? AND at <= ?', (key, now - expiry))
+            count = connection.execute(
+                'SELECT COUNT(*) FROM rate_limit_entry WHERE key = ?', (key,)
+            ).fetchone()[0]
+            acquired = count + amount <= limit
+            if acquired:
+                connection.executemany('INSERT INTO rate_limit_entry (key, at) VALUES (?, ?)',
+                                       [(key, now)] * amount)
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        self._maybe_purge(now)
+        return acquired
+
+    def get_moving_window(self, key: str, limit: int, expiry: int) -> tuple:
+        """(start of the window, hits in it) for the last ``expiry`` seconds"""
+        now = time.time()
+        oldest, count = self._connection.execute(
+            'SELECT MIN(at), COUNT(*) FROM rate_limit_entry WHERE key = ? AND at > ?', (key, now - expiry)
+        ).fetchone()
+        return (oldest if oldest is not None else now, count)
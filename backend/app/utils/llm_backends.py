@@ -0,0 +1,183 @@
+import hashlib
+import os
+import random
+import threading
+import time
+from typing import Iterator
+
+# google.generativeai's own default, which GenerativeModel() has always used here
+DEFAULT_GEMINI_MODEL = 'gemini-1.5-flash-002'
+
+class LLMBackendError(Exception):
+    """Upstream failure raised by a backend; ``code`` is the HTTP-style status"""
+
+    def __init__(self, message, code=503):
+        super().__init__(message)
+        self.code = code
+
+class LLMBackend:
+    """Interface every model backend implements.
+
+    ``generate`` returns the full reply; ``stream`` yields it in chunks.
+    ``fingerprint`` identifies the model and generation settings so cached
+    responses from one backend are never served for another.
+    """
+
+    name = 'base'
+
+    @property
+    def fingerprint(self) -> str:
+        return self.name
+
+    def generate(self, system_prompt: str, prompt: str) -> str:
+        raise NotImplementedError
+
+    def stream(self, system_prompt: str, prompt: str) -> Iterator[str]:
+        raise NotImplementedError
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini via google.generativeai"""
+
+    name = 'gemini'
+
+    def __init__(self, api_key=None, model_name=DEFAULT_GEMINI_MODEL):
+        # Imported here so the other backends don't need the Google client libraries
+        from google.generativeai import configure, GenerativeModel
+        from google.generativeai.types import GenerationConfig
+
+        # Configure Gemini with API key
+        configure(api_key=api_key or os.getenv('GEMINI_API_KEY'))
+        self.client = GenerativeModel(model_name)
+        self.model_name = model_name
+        self.generation_config = GenerationConfig(
+            temperature=0.7,
+            top_p=0.8,
+            top_k=40,
+            max_output_tokens=2048
+        )
+
+    @property
+    def fingerprint(self) -> str:
+        config = self.generation_config
+        return (f"{self.model_name}|{config.temperature}|{config.top_p}|"
+                f"{config.top_k}|{config.max_output_tokens}")
+
+    def generate(self, system_prompt: str, prompt: str) -> str:
+        response = self.client.generate_content(
+            contents=[system_prompt, prompt],
+            generation_config=self.generation_config
+        )
+
+        if not response:
+            raise Exception("No response received from Gemini API")
+
+        # Extract text from response
+        if hasattr(response, 'text'):
+            return str(response.text)
+        elif hasattr(response, 'candidates') and response.candidates:
+            return str(response.candidates[0].text)
+        raise Exception("Invalid response format from Gemini API")
+
+    def stream(self, system_prompt: str, prompt: str) -> Iterator[str]:
+        response = self.client.generate_content(
+            contents=[system_prompt, prompt],
+            generation_config=self.generation_config,
+            stream=True
+        )
+        return (getattr(chunk, 'text', None) or '' for chunk in response)
+
+# Vocabulary the fake backend builds replies from
+FAKE_WORDS = (
+    'study', 'focus', 'review', 'notes', 'practice', 'concept', 'example', 'answer',
+    'question', 'break', 'summary', 'topic', 'exam', 'schedule', 'memory', 'learn',
+    'the', 'a', 'and', 'to', 'of', 'is', 'for', 'with', 'this', 'your', 'each', 'then'
+)
+
+class FakeBackend(LLMBackend):
+    """Deterministic offline model for load testing.
+
+    The reply is a pure function of the prompt, so identical prompts always
+    produce identical output. ``latency`` is the time to the first token,
+    ``tokens_per_second`` paces the rest (0 for no delay) and
+    ``failure_rate`` injects LLMBackendError(503) on a seeded schedule.
+    """
+
+    name = 'fake'
+
+    def __init__(self, latency=0.2, tokens_per_second=50, response_tokens=80, failure_rate=0.0, seed=0):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.failure_rate = failure_rate
+        self._failures = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def fingerprint(self) -> str:
+        return f"fake|{self.response_tokens}"
+
+    def _maybe_fail(self):
+        with self._lock:
+            roll = self._failures.random()
+        if roll < self.failure_rate:
+            raise LLMBackendError('Injected fake backend failure', code=503)
+
+    def _tokens(self, prompt):
+        seed = int.from_bytes(hashlib.sha256(prompt.encode('utf-8')).digest()[:8], 'big')
+        rng = random.Random(seed)
+        return [rng.choice(FAKE_WORDS) for _ in range(self.response_tokens)]
+
+    def generate(self, system_prompt: str, prompt: str) -> str:
+        self._maybe_fail()
+        tokens = self._tokens(prompt)
+        delay = self.latency
+        if self.tokens_per_second:
+            delay += len(tokens) / self.tokens_per_second
+        time.sleep(delay)
+        return ' '.join(tokens)
+
+    def stream(self, system_prompt: str, prompt: str) -> Iterator[str]:
+        # Fail and wait for the first token up front, like opening a real stream
+        self._maybe_fail()
+        time.sleep(self.latency)
+        return self._paced(self._tokens(prompt))
+
+    def _paced(self, tokens):
+        for token in tokens:
+            if self.tokens_per_second:
+                time.sleep(1 / self.tokens_per_second)
+            yield token + ' '
+
+class EchoBackend(LLMBackend):
+    """Replies with the latest user line, instantly - for wiring checks"""
+
+    name = 'echo'
+
+    @staticmethod
+    def _reply(prompt):
+        last_line = prompt.rstrip().rsplit('\n', 1)[-1]
+        return last_line[len('user: '):] if last_line.startswith('user: ') else last_line
+
+    def generate(self, system_prompt: str, prompt: str) -> str:
+        return self._reply(prompt)
+
+    def stream(self, system_prompt: str, prompt: str) -> Iterator[str]:
+        for word in self._reply(prompt).split(' '):
+            yield word + ' '
+
+def create_backend(config):
+    """Build the backend named by AI_BACKEND ('gemini', 'fake' or 'echo')"""
+    name = config.get('AI_BACKEND', 'gemini')
+    if name == 'gemini':
+        return GeminiBackend(model_name=config.get('GEMINI_MODEL') or DEFAULT_GEMINI_MODEL)
+    if name == 'fake':
+        return FakeBackend(
+            latency=config.get('AI_FAKE_LATENCY', 0.2),
+            tokens_per_second=config.get('AI_FAKE_TOKENS_PER_SECOND', 50),
+            response_tokens=config.get('AI_FAKE_RESPONSE_TOKENS', 80),
+            failure_rate=config.get('AI_FAKE_FAILURE_RATE', 0.0),
+            seed=config.get('AI_FAKE_SEED', 0)
+        )
+    if name == 'echo':
+        return EchoBackend()
+    raise ValueError(f"Unknown AI_BACKEND: {name}")
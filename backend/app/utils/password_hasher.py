@@ -0,0 +1,159 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError
+import bcrypt
+
+logger = logging.getLogger(__name__)
+
+# Module-level so the process pool can pickle them
+def hash_password(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+def check_password(password: bytes, password_hash: bytes) -> bool:
+    return bcrypt.checkpw(password, password_hash)
+
+def _timed(func, *args):
+    """Run func in the pool, returning its result and how long it ran (without queueing)"""
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+class HasherBusy(Exception):
+    """Raised when PASSWORD_HASH_MAX_PENDING operations are already queued or running"""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class PasswordHasher:
+    """Runs bcrypt on a small bounded pool instead of the request thread.
+
+    A login storm then queues for PASSWORD_HASH_WORKERS processes rather
+    than pinning every request thread's CPU, and once
+    PASSWORD_HASH_MAX_PENDING operations are waiting - or the queue is
+    already longer than PASSWORD_HASH_TIMEOUT would allow - new ones fail
+    fast with HasherBusy. An operation counts as pending until the pool is
+    done with it, even if its request timed out. The 'inline' executor
+    hashes on the calling thread.
+    """
+
+    def __init__(self):
+        self.executor_type = 'inline'
+        self.rounds = 12
+        self.max_workers = 2
+        self.max_pending = 16
+        self.timeout = 10
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._latencies = deque(maxlen=512)  # Seconds, queueing included
+        self._service_times = deque(maxlen=512)  # Seconds of bcrypt work alone
+        self.completed = 0
+        self.rejected = 0
+
+    def init_app(self, app):
+        self.executor_type = app.config.get('PASSWORD_HASH_EXECUTOR', 'process')
+        self.rounds = app.config.get('BCRYPT_ROUNDS', 12)
+        self.max_workers = app.config.get('PASSWORD_HASH_WORKERS', 2)
+        self.max_pending = app.config.get('PASSWORD_HASH_MAX_PENDING', 16)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', 10)
+        app.extensions['password_hasher'] = self
+
+    def _get_executor(self):
+        # Created on first use so workers that never see a login don't fork a pool
+        with self._lock:
+            if self._executor is None:
+                if self.executor_type == 'process':
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix='password-hash'
+                    )
+            return self._executor
+
+    def _run(self, func, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise HasherBusy(f'{self._pending} password hashes already pending', self.retry_after())
+            if self.executor_type != 'inline' and self._expected_wait() > self.timeout:
+                # Would only time out in the queue; fail now rather than after PASSWORD_HASH_TIMEOUT
+                self.rejected += 1
+                raise HasherBusy('Password hash queue is too long', self.retry_after())
+            self._pending += 1
+
+        started = time.perf_counter()
+        if self.executor_type == 'inline':
+            try:
+                result, seconds = _timed(func, *args)
+            finally:
+                self._release()
+        else:
+            try:
+                future = self._get_executor().submit(_timed, func, *args)
+            except BaseException:
+                self._release()
+                raise
+            # The slot is held until the pool is really done with the work, not
+            # just until this request stops waiting for it
+            future.add_done_callback(lambda _: self._release())
+            try:
+                result, seconds = future.result(timeout=self.timeout)
+            except TimeoutError:
+                # Drops it from the queue if it hasn't started; a running hash releases on completion
+                future.cancel()
+                with self._lock:
+                    self.rejected += 1
+                raise HasherBusy('Timed out waiting for a password hash', self.retry_after())
+        with self._lock:
+            self._latencies.append(time.perf_counter() - started)
+            self._service_times.append(seconds)
+            self.completed += 1
+        return result
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    def hash(self, password: bytes) -> bytes:
+        return self._run(hash_password, password, self.rounds)
+
+    def verify(self, password: bytes, password_hash: bytes) -> bool:
+        return self._run(check_password, password, password_hash)
+
+    def _expected_wait(self):
+        """Seconds a new operation should take to finish behind those pending"""
+        service_times = list(self._service_times)
+        mean = sum(service_times) / len(service_times) if service_times else 0.25
+        return (self._pending + 1) * mean / max(1, self.max_workers)
+
+    def retry_after(self):
+        """Seconds until the current queue should have drained"""
+        return max(1, int(self._expected_wait() + 0.999))
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            pending = self._pending
+        def percentile(pct):
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * pct / 100))] * 1000, 1)
+        return {
+            'executor': self.executor_type,
+            'rounds': self.rounds,
+            'workers': self.max_workers,
+            'pending': pending,
+            'max_pending': self.max_pending,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'latency_ms': {
+                'mean': round(sum(latencies) / len(latencies) * 1000, 1),
+                'p50': percentile(50),
+                'p95': percentile(95),
+                'max': round(latencies[-1] * 1000, 1)
+            } if latencies else None
+        }
+
+password_hasher = PasswordHasher()
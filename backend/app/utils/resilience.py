@@ -0,0 +1,203 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# HTTP status codes worth retrying (rate limited or upstream trouble)
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# google.api_core exception names, matched by name so this module doesn't
+# have to import the Google client libraries
+RETRYABLE_ERROR_NAMES = {
+    'ServiceUnavailable', 'TooManyRequests', 'ResourceExhausted',
+    'DeadlineExceeded', 'InternalServerError', 'GatewayTimeout', 'BadGateway'
+}
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the circuit breaker is open"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def error_status(exc):
+    """Best-effort HTTP status code for an upstream error"""
+    code = getattr(exc, 'code', None)
+    if isinstance(code, int):
+        return code
+    response = getattr(exc, 'response', None)
+    status = getattr(response, 'status_code', None)
+    return status if isinstance(status, int) else None
+
+def is_retryable(exc):
+    """True for transient upstream errors (timeouts, 429s and 5xx)"""
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    if type(exc).__name__ in RETRYABLE_ERROR_NAMES:
+        return True
+    return error_status(exc) in RETRYABLE_STATUS_CODES
+
+def is_client_error(exc):
+    """4xx errors other than rate limiting are the caller's fault, not upstream's"""
+    status = error_status(exc)
+    return status is not None and 400 <= status < 500 and status not in RETRYABLE_STATUS_CODES
+
+def call_with_retry(func, max_retries=3, base_delay=0.5, max_delay=8.0, sleep=time.sleep):
+    """Call func, retrying retryable errors with full-jitter exponential backoff"""
+    attempt = 0
+    while True:
+        try:
+            return func()
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+            attempt += 1
+            logger.warning(f"Retrying upstream call in {delay:.2f}s (attempt {attempt} of {max_retries}): {str(e)}")
+            sleep(delay)
+
+class CircuitBreaker:
+    """Fails fast once the upstream error rate crosses a threshold.
+
+    Outcomes are tracked over a sliding time window. When at least
+    ``min_calls`` calls in the window have an error rate of ``threshold`` or
+    more, the breaker opens and rejects calls for ``cooldown`` seconds. It
+    then goes half-open and lets a single probe through: success closes the
+    breaker, failure opens it again. Transitions are logged and kept in
+    ``transitions`` so they can be inspected.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, threshold=0.5, min_calls=10, window=60, cooldown=30, clock=time.monotonic):
+        self.threshold = threshold
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._outcomes = deque()  # (timestamp, succeeded)
+        self._opened_at = None
+        self._probe_in_flight = False
+        self.state = self.CLOSED
+        self.transitions = deque(maxlen=50)
+
+    def _transition(self, new_state):
+        if new_state == self.state:
+            return
+        logger.warning(f"Circuit breaker {self.state} -> {new_state}")
+        self.transitions.append({'at': time.time(), 'from': self.state, 'to': new_state})
+        self.state = new_state
+
+    def _trim(self, now):
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            self._outcomes.popleft()
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call should not go upstream"""
+        with self._lock:
+            now = self._clock()
+            if self.state == self.OPEN:
+                remaining = self.cooldown - (now - self._opened_at)
+                if remaining > 0:
+                    raise CircuitOpenError('AI service is temporarily unavailable', retry_after=remaining)
+                self._transition(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    raise CircuitOpenError('AI service is temporarily unavailable', retry_after=1)
+                self._probe_in_flight = True
+
+    def retry_after(self):
+        """Seconds until an open breaker will let a probe through (0 if not open)"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0
+            return max(0, self.cooldown - (self._clock() - self._opened_at))
+
+    def record_success(self):
+        with self._lock:
+            now = self._clock()
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+                self._outcomes.clear()
+                self._transition(self.CLOSED)
+            self._outcomes.append((now, True))
+            self._trim(now)
+
+    def record_failure(self):
+        with self._lock:
+            now = self._clock()
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+                self._opened_at = now
+                self._transition(self.OPEN)
+                return
+            self._outcomes.append((now, False))
+            self._trim(now)
+            failures = sum(1 for _, succeeded in self._outcomes if not succeeded)
+            if (self.state == self.CLOSED and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.threshold):
+                self._opened_at = now
+                self._transition(self.OPEN)
+
+    def snapshot(self):
+        with self._lock:
+            self._trim(self._clock())
+            calls = len(self._outcomes)
+            failures = sum(1 for _, succeeded in self._outcomes if not succeeded)
+            return {
+                'state': self.state,
+                'calls': calls,
+                'failures': failures,
+                'error_rate': round(failures / calls, 4) if calls else 0.0,
+                'transitions': list(self.transitions)
+            }
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one upstream call.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait and receive the same result (or exception).
+    """
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
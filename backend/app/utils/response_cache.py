@@ -0,0 +1,153 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, select
+
+from app import db
+from app.models.ai_response_cache import AIResponseCache
+
+logger = logging.getLogger(__name__)
+
+# The persistent tier is trimmed once every this many writes
+PURGE_EVERY = 100
+
+class ResponseCache:
+    """Two-tier cache for AI responses.
+
+    An in-process LRU sits in front of the ``ai_response_cache`` table. Both
+    tiers expire entries after AI_CACHE_TTL seconds and are bounded in size
+    (AI_CACHE_MEMORY_ENTRIES and AI_CACHE_DB_MAX_ENTRIES). Counters are kept
+    per process.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> (response, expires_at)
+        self._writes = 0
+        self.counters = {
+            'memory_hits': 0,
+            'db_hits': 0,
+            'misses': 0,
+            'bypassed': 0,
+            'stores': 0,
+            'memory_evictions': 0,
+            'db_evictions': 0,
+        }
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('AI_CACHE_ENABLED', True)
+        self.ttl = app.config.get('AI_CACHE_TTL', 7 * 24 * 3600)
+        self.memory_entries = app.config.get('AI_CACHE_MEMORY_ENTRIES', 512)
+        self.db_max_entries = app.config.get('AI_CACHE_DB_MAX_ENTRIES', 10000)
+        self.max_context_chars = app.config.get('AI_CACHE_MAX_CONTEXT_CHARS', 300)
+        app.extensions['ai_response_cache'] = self
+
+    @staticmethod
+    def make_key(context, fingerprint):
+        """Hash the case- and whitespace-normalized context with the model config"""
+        normalized = ' '.join(context.split()).casefold()
+        return hashlib.sha256(f"{fingerprint}\x00{normalized}".encode('utf-8')).hexdigest()
+
+    def is_cacheable(self, context, prompt):
+        """Only context-free or short-context prompts are cached"""
+        return self.enabled and len(context) - len(prompt) <= self.max_context_chars
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            self.counters[counter] += amount
+
+    def record_bypass(self):
+        self._count('bypassed')
+
+    def get(self, key):
+        """Return the cached response for key, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.counters['memory_hits'] += 1
+                    return response
+                del self._memory[key]
+
+        row = db.session.get(AIResponseCache, key)
+        if row is not None and row.expires_at > datetime.utcnow():
+            # Committed with the caller's transaction
+            row.last_hit_at = datetime.utcnow()
+            row.hit_count = (row.hit_count or 0) + 1
+            self._remember(key, row.response, now + (row.expires_at - datetime.utcnow()).total_seconds())
+            self._count('db_hits')
+            return row.response
+
+        self._count('misses')
+        return None
+
+    def set(self, key, response):
+        """Store a response in both tiers (the caller commits the session)"""
+        if not response:
+            return
+        expires_at = datetime.utcnow() + timedelta(seconds=self.ttl)
+        self._remember(key, response, time.time() + self.ttl)
+
+        row = db.session.get(AIResponseCache, key)
+        if row is None:
+            db.session.add(AIResponseCache(key=key, response=response, expires_at=expires_at))
+        else:
+            row.response = response
+            row.expires_at = expires_at
+        self._count('stores')
+
+        with self._lock:
+            self._writes += 1
+            purge = self._writes % PURGE_EVERY == 0
+        if purge:
+            self.purge()
+
+    def _remember(self, key, response, expires_at):
+        with self._lock:
+            self._memory[key] = (response, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+                self.counters['memory_evictions'] += 1
+
+    def purge(self):
+        """Drop expired rows, then the least recently hit rows past the size bound"""
+        try:
+            evicted = db.session.execute(
+                delete(AIResponseCache).where(AIResponseCache.expires_at <= datetime.utcnow())
+            ).rowcount or 0
+
+            count = db.session.execute(select(func.count()).select_from(AIResponseCache)).scalar()
+            if count > self.db_max_entries:
+                cutoff = db.session.execute(
+                    select(AIResponseCache.last_hit_at)
+                    .order_by(AIResponseCache.last_hit_at.desc())
+                    .offset(self.db_max_entries)
+                    .limit(1)
+                ).scalar()
+                if cutoff is not None:
+                    evicted += db.session.execute(
+                        delete(AIResponseCache).where(AIResponseCache.last_hit_at <= cutoff)
+                    ).rowcount or 0
+            self._count('db_evictions', evicted)
+        except Exception as e:
+            logger.error(f"Error purging response cache: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['memory_entries'] = len(self._memory)
+        lookups = stats['memory_hits'] + stats['db_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['db_hits']) / lookups, 4) if lookups else 0.0
+        return stats
+
+response_cache = ResponseCache()
@@ -1,43 +1,56 @@
+import threading
 import bleach
+from bleach.linkifier import Linker
+from bleach.sanitizer import Cleaner
 from html import escape
 from markdown import markdown
 
+# Sanitized at write: user input is escaped once at the request boundary and
+# model output once when it is stored, so AIMessage.content is always safe
+# text. Stored content must never be passed through sanitize_text again -
+# escaping is not idempotent and would double-escape it.
+
+# Allowed HTML tags and attributes
+ALLOWED_TAGS = frozenset([
+    'p', 'br', 'b', 'i', 'u', 'em', 'strong', 'a', 'ul', 'ol', 'li',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'code', 'pre',
+    'hr', 'sub', 'sup', 'span', 'div', 'table', 'thead', 'tbody',
+    'tr', 'th', 'td', 'img'
+])
+
+ALLOWED_ATTRIBUTES = {
+    'a': ['href', 'title', 'target', 'rel'],
+    'img': ['src', 'alt', 'title', 'width', 'height'],
+    'p': ['class'],
+    'span': ['class', 'style'],
+    'div': ['class', 'style']
+}
+
+# bleach's Cleaner and Linker hold parser state and aren't thread-safe, so
+# each thread builds its pair once and reuses it for every call
+_local = threading.local()
+
+def _get_cleaners():
+    if not hasattr(_local, 'cleaner'):
+        _local.cleaner = Cleaner(tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, strip=True)
+        # Add rel="noopener noreferrer" to external links
+        _local.linker = Linker(callbacks=[
+            bleach.callbacks.nofollow,
+            bleach.callbacks.target_blank
+        ])
+    return _local.cleaner, _local.linker
+
 def sanitize_html(html_content):
     """Sanitize HTML content to prevent XSS attacks."""
     if not html_content:
         return ""
-        
-    # Allowed HTML tags and attributes
-    allowed_tags = [
-        'p', 'br', 'b', 'i', 'u', 'em', 'strong', 'a', 'ul', 'ol', 'li',
-        'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'code', 'pre',
-        'hr', 'sub', 'sup', 'span', 'div', 'table', 'thead', 'tbody',
-        'tr', 'th', 'td', 'img'
-    ]
-    
-    allowed_attributes = {
-        'a': ['href', 'title', 'target', 'rel'],
-        'img': ['src', 'alt', 'title', 'width', 'height'],
-        'p': ['class'],
-        'span': ['class', 'style'],
-        'div': ['class', 'style']
-    }
-    
-    # Clean the HTML content
-    cleaned = bleach.clean(
-        html_content,
-        tags=allowed_tags,
-        attributes=allowed_attributes,
-        strip=True
-    )
-    
-    # Add rel="noopener noreferrer" to external links
-    cleaned = bleach.linkify(cleaned, callbacks=[
-        bleach.callbacks.nofollow,
-        bleach.callbacks.target_blank
-    ])
-    
-    return cleaned
+    cleaner, linker = _get_cleaners()
+    return linker.linkify(cleaner.clean(html_content))
+
+def sanitize_html_batch(html_contents):
+    """Sanitize several HTML fragments, returning a list in the same order."""
+    cleaner, linker = _get_cleaners()
+    return [linker.linkify(cleaner.clean(content)) if content else "" for content in html_contents]
 
 def sanitize_text(text_content):
     """Sanitize plain text content by escaping HTML special characters."""
@@ -45,13 +58,17 @@ def sanitize_text(text_content):
         return ""
     return escape(str(text_content))
 
+def sanitize_texts(text_contents):
+    """Escape several plain text values, returning a list in the same order."""
+    return [escape(str(content)) if content else "" for content in text_contents]
+
 def markdown_to_safe_html(markdown_content):
     """Convert markdown to HTML and sanitize it."""
     if not markdown_content:
         return ""
-        
+
     # Convert markdown to HTML
     html = markdown(markdown_content)
-    
+
     # Sanitize the HTML
     return sanitize_html(html)
@@ -0,0 +1,188 @@
+import re
+import threading
+import zlib
+from collections import OrderedDict
+import numpy as np
+from app.extensions import db
+from app.models.ai_conversation import AIConversation, AIMessage
+
+# Size of the hashed term space; collisions are rare well below this many distinct terms
+HASH_DIMENSIONS = 1 << 20
+
+ROLES = {'user': 0, 'assistant': 1}
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+STOP_WORDS = frozenset("""
+    a an and are as at be but by can do does for from how i if in into is it its me my of on or
+    so than that the their then there these this to was we what when which who why will with you your
+""".split())
+
+def tokenize(text):
+    """Lower-cased word tokens with stop words removed"""
+    return [token for token in _TOKEN.findall((text or '').lower()) if token not in STOP_WORDS]
+
+def hash_features(text):
+    """Hash a text's unigrams and bigrams into (term ids, weights).
+
+    Weights are sublinear term frequencies (1 + log tf), L2-normalized.
+    crc32 rather than hash() so term ids are stable across processes.
+    """
+    tokens = tokenize(text)
+    features = tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+    counts = {}
+    for feature in features:
+        term = zlib.crc32(feature.encode('utf-8')) % HASH_DIMENSIONS
+        counts[term] = counts.get(term, 0) + 1
+    if not counts:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+    terms = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+    weights = 1 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+    return terms, (weights / np.linalg.norm(weights)).astype(np.float32)
+
+class UserSearchIndex:
+    """Hashed TF-IDF index over one user's messages.
+
+    Postings are kept as flat NumPy arrays (term, document, weight), so a
+    query is a vectorized filter plus a bincount rather than a loop over
+    messages. Documents are weighted without IDF (lnc) and queries with it
+    (ltc), so adding a message never requires re-weighting the others.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.max_id = 0  # Highest AIMessage.id indexed
+        self.message_ids = np.empty(0, dtype=np.int64)
+        self.roles = np.empty(0, dtype=np.int8)
+        self.terms = np.empty(0, dtype=np.int32)
+        self.docs = np.empty(0, dtype=np.int32)
+        self.weights = np.empty(0, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.message_ids)
+
+    def add(self, rows):
+        """Index (id, role, content) rows with ids above max_id"""
+        message_ids, roles, terms, docs, weights = [], [], [], [], []
+        n = len(self.message_ids)
+        for message_id, role, content in rows:
+            doc_terms, doc_weights = hash_features(content)
+            message_ids.append(message_id)
+            roles.append(ROLES.get(role, -1))
+            terms.append(doc_terms)
+            weights.append(doc_weights)
+            docs.append(np.full(len(doc_terms), n, dtype=np.int32))
+            n += 1
+        if message_ids:
+            # Build every array before replacing any, so a failure leaves the index as it was
+            arrays = (
+                np.concatenate([self.message_ids, np.array(message_ids, dtype=np.int64)]),
+                np.concatenate([self.roles, np.array(roles, dtype=np.int8)]),
+                np.concatenate([self.terms, *terms]),
+                np.concatenate([self.docs, *docs]),
+                np.concatenate([self.weights, *weights])
+            )
+            self.message_ids, self.roles, self.terms, self.docs, self.weights = arrays
+            # Only now are these rows searchable, so only now skip them on the next refresh
+            self.max_id = max(self.max_id, max(message_ids))
+        return len(message_ids)
+
+    def search(self, query, k=10, role=None):
+        """Return up to k (message id, score) pairs, best first, with cosine scores in [0, 1]"""
+        query_terms, query_weights = hash_features(query)
+        n = len(self.message_ids)
+        if not n or not len(query_terms):
+            return []
+
+        mask = np.isin(self.terms, query_terms)
+        if not mask.any():
+            return []
+        terms = self.terms[mask]
+
+        # Document frequency of each query term, then IDF-weighted, normalized query
+        order = np.argsort(query_terms)
+        query_terms, query_weights = query_terms[order], query_weights[order]
+        df = np.bincount(np.searchsorted(query_terms, terms), minlength=len(query_terms))
+        query_vector = query_weights * (np.log((n + 1) / (df + 1)) + 1)
+        query_vector /= np.linalg.norm(query_vector)
+
+        scores = np.bincount(
+            self.docs[mask],
+            weights=self.weights[mask] * query_vector[np.searchsorted(query_terms, terms)],
+            minlength=n
+        )
+        if role is not None:
+            scores[self.roles != ROLES[role]] = 0
+
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(int(self.message_ids[i]), float(scores[i])) for i in top if scores[i] > 0]
+
+class SearchIndex:
+    """Per-user search indexes, kept in process memory.
+
+    A user's index is built on their first search and afterwards only
+    tokenizes messages stored since the last one (from any process), so
+    keeping it current costs nothing on the write path. The least recently
+    searched users are evicted past AI_SEARCH_MAX_USERS. Archived messages
+    are not searchable.
+    """
+
+    def __init__(self, max_users=256):
+        self.max_users = max_users
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_users = app.config.get('AI_SEARCH_MAX_USERS', 256)
+
+    def _get_index(self, user_id):
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is None:
+                index = self._indexes[user_id] = UserSearchIndex()
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+            return index
+
+    def _catch_up(self, user_id, index):
+        rows = db.session.query(AIMessage.id, AIMessage.role, AIMessage.content).join(
+            AIConversation, AIConversation.id == AIMessage.conversation_id
+        ).filter(
+            AIConversation.user_id == user_id,
+            AIMessage.id > index.max_id
+        ).order_by(AIMessage.id).yield_per(500)
+        return index.add(rows)
+
+    def search(self, user_id, query, k=10, role=None):
+        """Top-k (message id, score) matches among a user's messages.
+
+        Hits may include messages deleted or archived since they were
+        indexed; callers load the rows and drop the missing ones.
+        """
+        index = self._get_index(user_id)
+        with index.lock:
+            self._catch_up(user_id, index)
+            return index.search(query, k, role)
+
+    def forget(self, user_id):
+        """Drop a user's index, e.g. after their conversations are deleted"""
+        with self._lock:
+            self._indexes.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            indexes = list(self._indexes.values())
+        return {
+            'users': len(indexes),
+            'messages': sum(len(index) for index in indexes),
+            'postings': sum(len(index.terms) for index in indexes),
+            'bytes': sum(
+                index.terms.nbytes + index.docs.nbytes + index.weights.nbytes +
+                index.message_ids.nbytes + index.roles.nbytes for index in indexes
+            )
+        }
+
+search_index = SearchIndex()
@@ -0,0 +1,148 @@
+from datetime import datetime, timezone
+from flask import current_app
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import joinedload
+from app.extensions import db
+from app.models.calendar_event import CalendarEvent
+from app.models.task import Task
+
+# Keeps each Task in step with its "Todo" CalendarEvent through the
+# Task.calendar_event relationship. Nothing here flushes: new events are
+# linked to their task by the unit of work, so a request's changes are
+# written by the one flush its commit does.
+#
+# With CALENDAR_VIRTUAL_TODO_EVENTS on no Todo events are stored at all:
+# GET /api/calendar derives them from the tasks' due dates
+# (CalendarEvent.get_range), and a task write is a single-row update.
+
+# Rows per DELETE / UPDATE ... IN when migrating between the two modes
+MIGRATION_CHUNK_SIZE = 500
+
+def virtual_todo_events():
+    """Whether Todo events are derived from tasks at read time instead of stored"""
+    return current_app.config.get('CALENDAR_VIRTUAL_TODO_EVENTS', False)
+
+def load_task(task_id, user_id):
+    """A user's task with its Todo event, in one query; None if not found"""
+    return Task.query.options(joinedload(Task.calendar_event)).filter_by(
+        id=task_id, user_id=user_id
+    ).first()
+
+def load_tasks(task_ids, user_id):
+    """A user's tasks by id, with their Todo events, in one query"""
+    if not task_ids:
+        return {}
+    return {task.id: task for task in Task.query.options(joinedload(Task.calendar_event)).filter(
+        Task.user_id == user_id, Task.id.in_(task_ids)
+    )}
+
+def apply_task_fields(task, data, partial=True):
+    """Copy the task fields present in ``data`` onto ``task``.
+
+    With ``partial`` False (a create or PUT) the title is required and
+    missing fields are reset to their defaults. Every value is parsed
+    before any is set, so on ValueError (with a message for the client)
+    the task is left unchanged.
+    """
+    values = {}
+    if 'title' in data or not partial:
+        values['title'] = str(data.get('title') or '').strip()
+        if not values['title']:
+            raise ValueError("Title is required")
+    if 'description' in data or not partial:
+        values['description'] = str(data.get('description') or '').strip()
+    if 'completed' in data or not partial:
+        values['completed'] = bool(data.get('completed', False))
+    if 'priority' in data or not partial:
+        try:
+            values['priority'] = int(data.get('priority', 1))
+        except (ValueError, TypeError):
+            raise ValueError("Invalid value provided")
+    if 'due_date' in data:
+        values['due_date'] = None
+        if data['due_date']:
+            try:
+                due_date = datetime.fromisoformat(str(data['due_date']).replace('Z', '+00:00'))
+            except ValueError:
+                raise ValueError("Invalid due date format")
+            # Stored naive, in UTC, so write responses match what GET returns
+            if due_date.tzinfo:
+                due_date = due_date.astimezone(timezone.utc).replace(tzinfo=None)
+            values['due_date'] = due_date
+    for name, value in values.items():
+        setattr(task, name, value)
+
+def sync_todo_event(task):
+    """Create, update or remove the task's Todo calendar event to match its due date"""
+    event = task.calendar_event
+    if task.due_date is None or virtual_todo_events():
+        if event is not None:
+            db.session.delete(event)
+            task.calendar_event = None
+        return
+    if event is None:
+        event = CalendarEvent(user_id=task.user_id, category="Todo", location="")
+        task.calendar_event = event
+    event.title = task.title
+    event.description = task.description
+    event.start_time = task.due_date
+    event.end_time = task.due_date + CalendarEvent.TODO_DURATION
+
+def create_task(user_id, data):
+    """Add a new task, and its Todo event if it has a due date, to the session"""
+    task = Task(user_id=user_id)
+    apply_task_fields(task, data, partial=False)
+    db.session.add(task)
+    sync_todo_event(task)
+    return task
+
+def update_task(task, data, partial=True):
+    """Apply a PATCH (``partial``) or PUT body to the task and its Todo event"""
+    apply_task_fields(task, data, partial)
+    sync_todo_event(task)
+
+def delete_task(task):
+    """Delete the task and its Todo event"""
+    if task.calendar_event is not None:
+        db.session.delete(task.calendar_event)
+    db.session.delete(task)
+
+def remove_stored_todo_events():
+    """Unlink and delete every stored Todo event, for virtual mode; returns how many.
+
+    Commits per chunk, so a large table is migrated without one long write lock.
+    """
+    removed = 0
+    while True:
+        rows = db.session.execute(
+            select(Task.id, Task.calendar_event_id).where(Task.calendar_event_id.isnot(None))
+            .limit(MIGRATION_CHUNK_SIZE)
+        ).all()
+        if not rows:
+            return removed
+        db.session.execute(update(Task).where(Task.id.in_([task_id for task_id, _ in rows]))
+                           .values(calendar_event_id=None))
+        db.session.execute(delete(CalendarEvent).where(CalendarEvent.id.in_([event_id for _, event_id in rows])))
+        db.session.commit()
+        removed += len(rows)
+
+def store_todo_events():
+    """Create the stored Todo event of every task with a due date that lacks one; returns how many.
+
+    The way back from virtual mode: run it before turning the setting off.
+    """
+    created = 0
+    while True:
+        tasks = Task.query.filter(Task.due_date.isnot(None), Task.calendar_event_id.is_(None)).order_by(
+            Task.id
+        ).limit(MIGRATION_CHUNK_SIZE).all()
+        if not tasks:
+            return created
+        for task in tasks:
+            task.calendar_event = CalendarEvent(
+                user_id=task.user_id, category="Todo", location="", title=task.title,
+                description=task.description, start_time=task.due_date,
+                end_time=task.due_date + CalendarEvent.TODO_DURATION
+            )
+        db.session.commit()
+        created += len(tasks)
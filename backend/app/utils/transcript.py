@@ -0,0 +1,76 @@
+import json
+from app.extensions import db
+from app.models.ai_conversation import AIConversation, AIMessage
+from app.models.ai_message_archive import AIMessageArchive
+
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'markdown': ('text/markdown; charset=utf-8', 'md'),
+    'text': ('text/plain; charset=utf-8', 'txt')
+}
+
+ROLE_LABELS = {'user': 'You', 'assistant': 'Assistant'}
+
+def iter_messages(conversation_id, chunk_size=500):
+    """Yield a conversation's messages oldest first as (id, role, content, created_at ISO string).
+
+    Archived messages come first, one archive row at a time; the hot table
+    is read in server-side chunks of ``chunk_size`` rows without building
+    ORM objects, so memory stays flat however long the conversation is.
+    """
+    archive_ids = db.session.query(AIMessageArchive.id).filter_by(
+        conversation_id=conversation_id
+    ).order_by(AIMessageArchive.first_message_at, AIMessageArchive.id).all()
+    for (archive_id,) in archive_ids:
+        archive = db.session.get(AIMessageArchive, archive_id)
+        entries = archive.unpack()
+        db.session.expunge(archive)  # Let the compressed blob go before loading the next
+        for entry in entries:
+            yield entry['id'], entry['role'], entry['content'], entry['created_at']
+
+    rows = db.session.query(
+        AIMessage.id, AIMessage.role, AIMessage.content, AIMessage.created_at
+    ).filter(
+        AIMessage.conversation_id == conversation_id
+    ).order_by(AIMessage.created_at, AIMessage.id).yield_per(chunk_size)
+    for message_id, role, content, created_at in rows:
+        yield message_id, role, content, created_at.isoformat() if created_at else None
+
+def iter_conversations(user_id, chunk_size=100):
+    """Yield (id, title, created_at) for all of a user's conversations, oldest first"""
+    return db.session.query(
+        AIConversation.id, AIConversation.title, AIConversation.created_at
+    ).filter(
+        AIConversation.user_id == user_id
+    ).order_by(AIConversation.created_at, AIConversation.id).yield_per(chunk_size)
+
+def export_transcript(conversations, export_format, chunk_size=500):
+    """Generate a transcript of (id, title, created_at) conversations in one of EXPORT_FORMATS.
+
+    Yields one piece of output per conversation header and per message.
+    """
+    for index, (conversation_id, title, created_at) in enumerate(conversations):
+        created = created_at.isoformat() if created_at else None
+        separator = '\n' if index else ''
+        if export_format == 'ndjson':
+            yield json.dumps({'type': 'conversation', 'id': conversation_id, 'title': title, 'created_at': created}) + '\n'
+        elif export_format == 'markdown':
+            yield f"{separator}# {title}\n\n_Started {created}_\n"
+        else:
+            yield f"{separator}=== {title} ({created}) ===\n"
+
+        for message_id, role, content, message_created in iter_messages(conversation_id, chunk_size):
+            if export_format == 'ndjson':
+                yield json.dumps({
+                    'type': 'message',
+                    'conversation_id': conversation_id,
+                    'id': message_id,
+                    'role': role,
+                    'content': content,
+                    'created_at': message_created
+                }) + '\n'
+            elif export_format == 'markdown':
+                yield f"\n**{ROLE_LABELS.get(role, role)}** ({message_created}):\n\n{content}\n"
+            else:
+                yield f"[{message_created}] {role}: {content}\n"
@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
+from app.extensions import db
+from app.models.user import User
+
+# Never cached, so the hash is only loaded by the routes that verify passwords
+_UNCACHED_COLUMNS = frozenset(['password_hash'])
+
+class UserCache:
+    """Small TTL + LRU cache of users, keyed by id, for resolving JWT identities.
+
+    Entries are plain column snapshots rather than ORM instances, so nothing
+    is shared between sessions; a hit is merged into the request's session
+    without a SELECT. Entries are dropped when a user is updated or deleted
+    through the ORM in this process; other workers see the change within
+    JWT_USER_CACHE_TTL seconds.
+    """
+
+    def __init__(self, ttl=60, max_size=1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.ttl = app.config.get('JWT_USER_CACHE_TTL', 60)
+        self.max_size = app.config.get('JWT_USER_CACHE_SIZE', 1024)
+
+    def _get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires, snapshot = entry
+            if expires < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return snapshot
+
+    def _put(self, user):
+        snapshot = {
+            column.key: getattr(user, column.key)
+            for column in User.__table__.columns if column.key not in _UNCACHED_COLUMNS
+        }
+        with self._lock:
+            self._entries[user.id] = (time.monotonic() + self.ttl, snapshot)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def load(self, user_id):
+        """The User for a JWT identity, attached to the current session, or None"""
+        try:
+            user_id = int(user_id)
+        except (ValueError, TypeError):
+            return None
+
+        snapshot = self._get(user_id) if self.ttl > 0 else None
+        if snapshot is None:
+            self.misses += 1
+            user = db.session.get(User, user_id)
+            if user is not None and self.ttl > 0:
+                self._put(user)
+            return user
+
+        self.hits += 1
+        user = User(**snapshot)
+        # Mark it as loaded from the database so merging it issues no SELECT;
+        # uncached columns are left expired and load on first access
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        return {'size': size, 'hits': self.hits, 'misses': self.misses}
+
+user_cache = UserCache()
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def invalidate_cached_user(mapper, connection, target):
+    user_cache.invalidate(target.id)
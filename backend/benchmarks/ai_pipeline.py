@@ -0,0 +1,104 @@
+"""Benchmark the AI conversation pipeline against an offline backend.
+
+Drives POST /api/gemini/generate through the Flask test client using the
+fake (or echo) backend and reports end-to-end latency alongside our own
+overhead, taken from the Server-Timing header, so it can be measured apart
+from model latency.
+
+Usage (from the backend directory):
+    AI_BACKEND=fake AI_FAKE_LATENCY=0.05 python benchmarks/ai_pipeline.py --requests 200 --threads 8
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('AI_BACKEND', 'fake')
+os.environ.setdefault('AI_CACHE_ENABLED', 'false')
+# A file database, since the in-memory one shares a single connection across threads
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+
+from app import create_app  # noqa: E402
+from app.extensions import limiter  # noqa: E402
+from app.models import User  # noqa: E402
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+def parse_server_timing(header):
+    timings = {}
+    for part in (header or '').split(','):
+        name, _, duration = part.strip().partition(';dur=')
+        if duration:
+            timings[name] = float(duration)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--turns', type=int, default=5, help='Turns per conversation before starting a new one')
+    args = parser.parse_args()
+
+    app = create_app('production')
+    limiter.enabled = False
+    with app.app_context():
+        User.create('bench', 'bench@example.com', 'Bench-pass1!')
+    login = app.test_client().post('/api/login', json={'username': 'bench', 'password': 'Bench-pass1!'})
+    headers = {'Authorization': f"Bearer {login.get_json()['access_token']}"}
+
+    lock = threading.Lock()
+    totals, app_times, model_times, errors = [], [], [], []
+    remaining = [args.requests]
+
+    def worker(worker_id):
+        client = app.test_client()
+        conversation_id = None
+        turn = 0
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+                n = remaining[0]
+            if turn % args.turns == 0:
+                conversation_id = None
+            turn += 1
+            started = time.perf_counter()
+            response = client.post('/api/gemini/generate', headers=headers, json={
+                'prompt': f'Worker {worker_id} question {n}: explain spaced repetition',
+                'conversation_id': conversation_id
+            })
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+                    continue
+                conversation_id = response.get_json()['conversation_id']
+                timings = parse_server_timing(response.headers.get('Server-Timing'))
+                totals.append(elapsed)
+                app_times.append(timings.get('app', 0.0))
+                model_times.append(timings.get('model', 0.0))
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    print(f"backend={app.config['AI_BACKEND']} requests={len(totals)} errors={len(errors)} "
+          f"threads={args.threads} wall={wall:.2f}s throughput={len(totals) / wall:.1f} req/s")
+    for label, values in (('total', totals), ('model', model_times), ('app overhead', app_times)):
+        if values:
+            print(f"{label:>13}: mean={statistics.mean(values):7.2f}ms p50={percentile(values, 50):7.2f}ms "
+                  f"p95={percentile(values, 95):7.2f}ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Benchmark rate limiter storage: memory:// against the shared SQLite store.
+
+Times a limiter check (hit) in one process for each storage and strategy,
+then has several processes hit the same limit at once to show how many
+requests each storage lets through in total - memory:// allows the limit
+once per process, the SQLite store allows it once.
+
+Usage (from the backend directory):
+    python benchmarks/rate_limiter.py --hits 20000 --workers 8
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from limits import parse, strategies  # noqa: E402
+from limits.storage import storage_from_string  # noqa: E402
+from app.utils.limiter_storage import SQLiteStorage  # noqa: E402,F401 - registers sqlite://
+
+STRATEGIES = {
+    'fixed-window': strategies.FixedWindowRateLimiter,
+    'moving-window': strategies.MovingWindowRateLimiter
+}
+
+def time_hits(uri, strategy, hits, keys):
+    limiter = STRATEGIES[strategy](storage_from_string(uri))
+    # High enough that every hit is recorded, as for most real requests
+    limit = parse(f"{hits * 2} per hour")
+    started = time.perf_counter()
+    for i in range(hits):
+        limiter.hit(limit, 'bench', str(i % keys))
+    return time.perf_counter() - started
+
+def hit_until_limited(uri, limit, attempts, results):
+    limiter = strategies.FixedWindowRateLimiter(storage_from_string(uri))
+    results.put(sum(limiter.hit(parse(limit), 'login', '10.0.0.1') for _ in range(attempts)))
+
+def allowed_across_workers(uri, limit, workers, attempts):
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=hit_until_limited, args=(uri, limit, attempts, results))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    allowed = sum(results.get() for _ in processes)
+    for process in processes:
+        process.join()
+    return allowed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--hits', type=int, default=20000, help='Checks to time per storage and strategy')
+    parser.add_argument('--keys', type=int, default=100, help='Distinct clients the hits are spread over')
+    parser.add_argument('--workers', type=int, default=8, help='Processes sharing one limit')
+    parser.add_argument('--limit', default='10 per hour')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        uris = {'memory://': 'memory://', 'sqlite://': f"sqlite:///{os.path.join(directory, 'ratelimits.db')}"}
+
+        print(f"Single process, {args.hits} hits over {args.keys} keys:")
+        for strategy in STRATEGIES:
+            for label, uri in uris.items():
+                storage_from_string(uri).reset()
+                seconds = time_hits(uri, strategy, args.hits, args.keys)
+                print(f"  {strategy:>13} {label:>10}: {seconds / args.hits * 1e6:8.1f}us per check")
+
+        print(f"\n{args.workers} processes, limit {args.limit!r}, each trying {args.workers * 5} times:")
+        for label, uri in uris.items():
+            storage_from_string(uri).reset()
+            allowed = allowed_across_workers(uri, args.limit, args.workers, args.workers * 5)
+            print(f"  {label:>10}: {allowed} requests allowed")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Micro-benchmark the sanitization done per AI conversation turn.
+
+Compares the old pipeline, which re-escaped every history message on every
+turn and the prompt three times, with sanitize-at-write, which escapes the
+prompt and the reply once each. Also compares sanitize_html against building
+a new bleach cleaner and linker per call.
+
+Usage (from the backend directory):
+    python benchmarks/sanitize.py --history 12 --turns 2000
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bleach  # noqa: E402
+from app.utils.sanitize import (  # noqa: E402
+    ALLOWED_ATTRIBUTES, ALLOWED_TAGS, sanitize_html, sanitize_html_batch, sanitize_text
+)
+
+PROMPT = 'How do I balance <studying> & revision before "finals"? ' * 4
+REPLY = ('Break your revision into focused sessions & review the hardest topics first. '
+         'Use <spaced repetition> and practice questions to check what sticks. ') * 12
+HTML = ('<p>Read <a href="https://example.com/notes">the notes</a> and '
+        '<script>alert(1)</script><b>practice</b> daily.</p>')
+
+def legacy_sanitize_html(html_content):
+    cleaned = bleach.clean(html_content, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, strip=True)
+    return bleach.linkify(cleaned, callbacks=[bleach.callbacks.nofollow, bleach.callbacks.target_blank])
+
+def legacy_turn(history):
+    prompt = sanitize_text(PROMPT)  # On the way in
+    lines = [f"{sanitize_text(role)}: {sanitize_text(content)}" for role, content in history]
+    context = '\n'.join(lines) + f"\nuser: {sanitize_text(prompt)}"  # Again in build_context
+    stored = (sanitize_text(prompt), sanitize_text(REPLY))  # Again when stored
+    return context, stored
+
+def turn(history):
+    prompt = sanitize_text(PROMPT)
+    lines = [f"{role}: {content}" for role, content in history]
+    context = '\n'.join(lines) + f"\nuser: {prompt}"
+    stored = (prompt, sanitize_text(REPLY))
+    return context, stored
+
+def report(label, seconds, number):
+    print(f"{label:>28}: {seconds / number * 1e6:9.1f}us per call")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--history', type=int, default=12, help='Messages in the context window')
+    parser.add_argument('--turns', type=int, default=2000)
+    parser.add_argument('--html', type=int, default=500, help='sanitize_html calls to time')
+    args = parser.parse_args()
+
+    history = [('user' if i % 2 == 0 else 'assistant', sanitize_text(PROMPT if i % 2 == 0 else REPLY))
+               for i in range(args.history)]
+
+    legacy = timeit.timeit(lambda: legacy_turn(history), number=args.turns)
+    current = timeit.timeit(lambda: turn(history), number=args.turns)
+    print(f"Per turn, {args.history} history messages:")
+    report('re-sanitize on read', legacy, args.turns)
+    report('sanitize at write', current, args.turns)
+    print(f"{'speed-up':>28}: {legacy / current:9.1f}x")
+
+    legacy_html = timeit.timeit(lambda: legacy_sanitize_html(HTML), number=args.html)
+    reused_html = timeit.timeit(lambda: sanitize_html(HTML), number=args.html)
+    batch_html = timeit.timeit(lambda: sanitize_html_batch([HTML] * 10), number=args.html // 10 or 1)
+    print("sanitize_html:")
+    report('new cleaner per call', legacy_html, args.html)
+    report('reused cleaner', reused_html, args.html)
+    report('batch of 10 (per item)', batch_html, (args.html // 10 or 1) * 10)
+
+if __name__ == '__main__':
+    main()
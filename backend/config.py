@@ -26,6 +26,18 @@ class Config:
     JWT_ACCESS_CSRF_HEADER_NAME = 'X-CSRFToken'
     JWT_REFRESH_CSRF_HEADER_NAME = 'X-CSRFToken'
     JWT_IDENTITY_CLAIM = 'sub'
+    JWT_USER_CACHE_TTL = int(os.getenv('JWT_USER_CACHE_TTL', '60'))  # Seconds; 0 disables the cache
+    JWT_USER_CACHE_SIZE = int(os.getenv('JWT_USER_CACHE_SIZE', '1024'))  # Users kept per process
+    
+    # Password hashing - bcrypt runs on a bounded pool off the request thread
+    BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+    PASSWORD_HASH_EXECUTOR = os.getenv('PASSWORD_HASH_EXECUTOR', 'process')  # 'process', 'thread' or 'inline'
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', '16'))  # Queued + running before a 503
+    PASSWORD_HASH_TIMEOUT = 10  # Seconds
+    USER_IMPORT_BATCH_SIZE = int(os.getenv('USER_IMPORT_BATCH_SIZE', '500'))  # Rows validated and inserted per transaction
+    USER_IMPORT_WORKERS = int(os.getenv('USER_IMPORT_WORKERS', '0'))  # Hashing processes for bulk imports; 0 uses every core
+    USER_IMPORT_REQUEST_WORKERS = int(os.getenv('USER_IMPORT_REQUEST_WORKERS', '2'))  # Hashing threads per import over HTTP
     
     # CORS Configuration
     CORS_ORIGINS = ['http://localhost:3000']
@@ -39,6 +51,98 @@ class Config:
     WTF_CSRF_TIME_LIMIT = 3600  # 1 hour
     WTF_CSRF_HEADERS = ['X-CSRFToken']
     WTF_CSRF_SSL_STRICT = False  # Set to True in production with HTTPS
+    
+    # Rate limiting - the SQLite file is shared by every worker on the node;
+    # memory:// counts per process, multiplying each limit by the worker count
+    RATELIMIT_STORAGE_URI = os.getenv(
+        'RATELIMIT_STORAGE_URI',
+        'sqlite:///' + os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'ratelimits.db')
+    )
+    
+    # Tasks
+    TASK_PAGE_SIZE = int(os.getenv('TASK_PAGE_SIZE', '200'))
+    TASK_MAX_PAGE_SIZE = int(os.getenv('TASK_MAX_PAGE_SIZE', '500'))
+    TASK_BULK_MAX_OPERATIONS = int(os.getenv('TASK_BULK_MAX_OPERATIONS', '200'))
+    # Derive tasks' Todo calendar events at read time instead of storing them.
+    # Turning it on deletes the stored ones at startup; run
+    # `flask todo-events materialize` before turning it off again
+    CALENDAR_VIRTUAL_TODO_EVENTS = os.getenv('CALENDAR_VIRTUAL_TODO_EVENTS', 'false').lower() == 'true'
+    
+    # AI backend - 'gemini', or 'fake'/'echo' to run the AI routes offline. The
+    # client is built on the first AI request; AI_ENABLED=false skips it entirely
+    AI_ENABLED = os.getenv('AI_ENABLED', 'true').lower() == 'true'
+    AI_BACKEND = os.getenv('AI_BACKEND', 'gemini')
+    GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-1.5-flash-002')  # Also part of response cache keys
+    # Fake backend: deterministic replies with configurable latency and failure injection
+    AI_FAKE_LATENCY = float(os.getenv('AI_FAKE_LATENCY', '0.2'))  # Seconds to first token
+    AI_FAKE_TOKENS_PER_SECOND = float(os.getenv('AI_FAKE_TOKENS_PER_SECOND', '50'))
+    AI_FAKE_RESPONSE_TOKENS = int(os.getenv('AI_FAKE_RESPONSE_TOKENS', '80'))
+    AI_FAKE_FAILURE_RATE = float(os.getenv('AI_FAKE_FAILURE_RATE', '0'))
+    AI_FAKE_SEED = int(os.getenv('AI_FAKE_SEED', '0'))
+    
+    # AI upstream resilience - retries with jittered backoff, then a circuit breaker
+    AI_RETRY_MAX = int(os.getenv('AI_RETRY_MAX', '3'))
+    AI_RETRY_BACKOFF_BASE = float(os.getenv('AI_RETRY_BACKOFF_BASE', '0.5'))  # Seconds
+    AI_RETRY_BACKOFF_MAX = float(os.getenv('AI_RETRY_BACKOFF_MAX', '8'))  # Seconds
+    AI_BREAKER_ERROR_RATE = float(os.getenv('AI_BREAKER_ERROR_RATE', '0.5'))  # Opens at this error rate...
+    AI_BREAKER_MIN_CALLS = int(os.getenv('AI_BREAKER_MIN_CALLS', '10'))  # ...over at least this many calls
+    AI_BREAKER_WINDOW = int(os.getenv('AI_BREAKER_WINDOW', '60'))  # Seconds of history considered
+    AI_BREAKER_COOLDOWN = int(os.getenv('AI_BREAKER_COOLDOWN', '30'))  # Seconds before a probe is allowed
+    
+    # AI usage - estimated tokens per user against quotas (0 = unlimited), and the
+    # upstream concurrency cap that requests queue for in weighted-fair order
+    AI_DAILY_TOKEN_QUOTA = int(os.getenv('AI_DAILY_TOKEN_QUOTA', '100000'))
+    AI_MONTHLY_TOKEN_QUOTA = int(os.getenv('AI_MONTHLY_TOKEN_QUOTA', '1000000'))
+    AI_MAX_CONCURRENT_CALLS = int(os.getenv('AI_MAX_CONCURRENT_CALLS', '8'))  # Per worker process; 0 for no cap
+    AI_SCHEDULER_MAX_WAIT = int(os.getenv('AI_SCHEDULER_MAX_WAIT', '30'))  # Seconds queued before a 503
+    AI_OUTPUT_TOKEN_ESTIMATE = 400  # Reply length assumed when scheduling a call
+    
+    # AI batch generation - prompts per POST /api/gemini/generate/batch and threads per batch
+    AI_BATCH_MAX_PROMPTS = int(os.getenv('AI_BATCH_MAX_PROMPTS', '8'))
+    AI_BATCH_CONCURRENCY = int(os.getenv('AI_BATCH_CONCURRENCY', '4'))
+    
+    # AI job pool - Gemini calls submitted via /api/gemini/jobs run here
+    AI_JOB_EXECUTOR = os.getenv('AI_JOB_EXECUTOR', 'thread')  # 'thread' or 'process'
+    AI_JOB_WORKERS = int(os.getenv('AI_JOB_WORKERS', '4'))
+    AI_JOB_MAX_PENDING = int(os.getenv('AI_JOB_MAX_PENDING', '32'))  # Queued + running jobs per worker
+    AI_JOB_TIMEOUT = int(os.getenv('AI_JOB_TIMEOUT', '60'))  # Seconds
+    AI_JOB_MAX_WAIT = 30  # Longest long-poll a client may request, in seconds
+    
+    # AI conversation context - recent turns are sent verbatim, older ones as a rolling summary
+    AI_CONTEXT_MAX_TURNS = int(os.getenv('AI_CONTEXT_MAX_TURNS', '6'))
+    AI_CONTEXT_TOKEN_BUDGET = int(os.getenv('AI_CONTEXT_TOKEN_BUDGET', '1500'))
+    AI_SUMMARY_MAX_CHARS = int(os.getenv('AI_SUMMARY_MAX_CHARS', '1200'))
+    
+    # AI conversation listing - keyset-paginated page sizes and export chunking
+    AI_CONVERSATION_PAGE_SIZE = 50
+    AI_MESSAGE_PAGE_SIZE = 50
+    AI_MAX_PAGE_SIZE = 200
+    AI_EXPORT_CHUNK_SIZE = 500  # Rows fetched per round trip when streaming transcripts
+    
+    # AI conversation titles - generated in the background after the first exchange
+    AI_AUTO_TITLE = os.getenv('AI_AUTO_TITLE', 'true').lower() == 'true'
+    AI_TITLE_BATCH_SIZE = int(os.getenv('AI_TITLE_BATCH_SIZE', '8'))  # Conversations titled per model call
+    AI_TITLE_BATCH_DELAY = float(os.getenv('AI_TITLE_BATCH_DELAY', '2'))  # Seconds spent gathering a batch
+    AI_TITLE_MAX_LENGTH = 60
+    
+    # AI conversation search - in-process hashed TF-IDF indexes, built per user on first search
+    AI_SEARCH_RESULTS = 10
+    AI_SEARCH_MAX_USERS = int(os.getenv('AI_SEARCH_MAX_USERS', '256'))  # Indexes kept in memory per worker
+    AI_SEARCH_REUSE_THRESHOLD = float(os.getenv('AI_SEARCH_REUSE_THRESHOLD', '0'))  # Answer repeats from history; 0 disables
+    
+    # AI message retention - old messages of inactive conversations move to ai_message_archive
+    AI_ARCHIVE_AFTER_DAYS = int(os.getenv('AI_ARCHIVE_AFTER_DAYS', '90'))
+    AI_ARCHIVE_BATCH_SIZE = int(os.getenv('AI_ARCHIVE_BATCH_SIZE', '100'))  # Conversations per transaction
+    AI_ARCHIVE_CODEC = os.getenv('AI_ARCHIVE_CODEC', 'zlib')  # 'zlib' or 'zstd' (needs the zstandard package)
+    AI_COMPRESS_MESSAGES = os.getenv('AI_COMPRESS_MESSAGES', 'false').lower() == 'true'  # Compress long new messages
+    AI_COMPRESS_MIN_CHARS = int(os.getenv('AI_COMPRESS_MIN_CHARS', '1024'))
+    
+    # AI response cache - in-process LRU in front of the ai_response_cache table
+    AI_CACHE_ENABLED = os.getenv('AI_CACHE_ENABLED', 'true').lower() == 'true'
+    AI_CACHE_TTL = int(os.getenv('AI_CACHE_TTL', str(7 * 24 * 3600)))  # Seconds
+    AI_CACHE_MEMORY_ENTRIES = int(os.getenv('AI_CACHE_MEMORY_ENTRIES', '512'))
+    AI_CACHE_DB_MAX_ENTRIES = int(os.getenv('AI_CACHE_DB_MAX_ENTRIES', '10000'))
+    AI_CACHE_MAX_CONTEXT_CHARS = int(os.getenv('AI_CACHE_MAX_CONTEXT_CHARS', '300'))  # Longer histories are never cached
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -49,6 +153,9 @@ class ProductionConfig(Config):
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    BCRYPT_ROUNDS = 4  # Cheapest cost bcrypt allows
+    PASSWORD_HASH_EXECUTOR = 'inline'
+    RATELIMIT_STORAGE_URI = 'memory://'
 
 config = {
     'development': DevelopmentConfig,
@@ -0,0 +1,53 @@
+from contextlib import contextmanager
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from app import create_app, db
+from app.models import User
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def auth_headers(app, client):
+    """Headers for a fresh user, whose JWT lookup is already cached"""
+    user = User.create('alice', 'alice@example.com', 'Passw0rd!')
+    headers = {'Authorization': f"Bearer {create_access_token(identity=str(user.id))}"}
+    client.get('/api/tasks', headers=headers)
+    return headers
+
+def describe(statement):
+    """('SELECT', 'task') for 'SELECT ... FROM task ...', ('UPDATE', 'task') for 'UPDATE task SET ...'"""
+    words = statement.split()
+    verb = words[0]
+    if verb == 'SELECT':
+        table = words[words.index('FROM') + 1]
+    elif verb == 'UPDATE':
+        table = words[1]
+    else:  # INSERT INTO / DELETE FROM
+        table = words[2]
+    return verb, table.strip('"')
+
+@pytest.fixture
+def count_statements(app):
+    """Context manager collecting the verb and table of each SQL statement run inside it"""
+    @contextmanager
+    def counter():
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(describe(statement))
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+    return counter
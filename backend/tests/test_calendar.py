@@ -0,0 +1,43 @@
+"""GET /api/calendar with Todo events stored or derived from tasks"""
+import pytest
+from app.models import CalendarEvent
+
+@pytest.fixture
+def virtual(app):
+    app.config['CALENDAR_VIRTUAL_TODO_EVENTS'] = True
+
+def add_task(client, headers, due_date):
+    response = client.post('/api/tasks', json={'title': 'Essay', 'due_date': due_date}, headers=headers)
+    assert response.status_code == 201
+    return response.get_json()
+
+def test_virtual_todo_events_are_derived_not_stored(virtual, client, auth_headers, count_statements):
+    task = add_task(client, auth_headers, '2026-10-20T10:00:00Z')
+    assert CalendarEvent.query.count() == 0
+
+    with count_statements() as statements:
+        events = client.get('/api/calendar/', headers=auth_headers).get_json()
+    assert len(statements) == 1
+    assert [(event['id'], event['category'], event['start'], event['end']) for event in events] == [
+        (f"task-{task['id']}", 'Todo', '2026-10-20T10:00:00', '2026-10-20T11:00:00')
+    ]
+
+def test_range_includes_todo_events_overlapping_its_start(virtual, client, auth_headers):
+    add_task(client, auth_headers, '2026-10-20T10:00:00Z')
+    def titles(query):
+        return [event['title'] for event in client.get(f"/api/calendar/?{query}", headers=auth_headers).get_json()]
+    assert titles('start=2026-10-20T10:30:00Z&end=2026-10-21T00:00:00Z') == ['Essay']
+    assert titles('start=2026-10-20T11:00:00Z') == []
+
+def test_task_update_is_a_single_row_update(virtual, client, auth_headers, count_statements):
+    task = add_task(client, auth_headers, '2026-10-20T10:00:00Z')
+    with count_statements() as statements:
+        client.patch(f"/api/tasks/{task['id']}", json={'title': 'Essay draft'}, headers=auth_headers)
+    assert statements == [('SELECT', 'task'), ('UPDATE', 'task')]
+
+@pytest.mark.parametrize('method', ['put', 'delete'])
+def test_virtual_todo_events_point_edits_to_the_task(virtual, client, auth_headers, method):
+    task = add_task(client, auth_headers, '2026-10-20T10:00:00Z')
+    response = getattr(client, method)(f"/api/calendar/task-{task['id']}", json={}, headers=auth_headers)
+    assert response.status_code == 400
+    assert f"/api/tasks/{task['id']}" in response.get_json()['error']
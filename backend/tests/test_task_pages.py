@@ -0,0 +1,45 @@
+"""GET /api/tasks: full list without args, keyset pages with them, 400 for bad cursors"""
+import pytest
+from app.utils import encode_cursor
+
+@pytest.fixture
+def tasks(client, auth_headers):
+    for number, due_date in enumerate(['2026-10-22T09:00:00', None, '2026-10-20T09:00:00']):
+        response = client.post('/api/tasks', json={
+            'title': f"Task {number}", 'due_date': due_date, 'priority': number + 1
+        }, headers=auth_headers)
+        assert response.status_code == 201
+
+def titles(response):
+    return [task['title'] for task in response.get_json()]
+
+def test_plain_get_returns_every_task(app, client, auth_headers, tasks):
+    app.config['TASK_PAGE_SIZE'] = 1
+    response = client.get('/api/tasks', headers=auth_headers)
+    assert titles(response) == ['Task 0', 'Task 1', 'Task 2']
+    assert 'X-Next-Cursor' not in response.headers
+
+def test_pages_follow_the_cursor(client, auth_headers, tasks):
+    seen, cursor = [], ''
+    while cursor is not None:
+        response = client.get(f"/api/tasks?sort=due_date&limit=2&cursor={cursor}", headers=auth_headers)
+        seen += titles(response)
+        cursor = response.headers.get('X-Next-Cursor')
+    assert seen == ['Task 2', 'Task 0', 'Task 1']
+
+@pytest.mark.parametrize('sort, cursor', [
+    ('due_date', 'not-base64!'),
+    ('due_date', {'sort': 'priority', 'value': 1, 'id': 1}),
+    ('due_date', {'sort': 'due_date', 'value': 20261020, 'id': 1}),
+    ('due_date', {'sort': 'due_date', 'value': 'tomorrow', 'id': 1}),
+    ('due_date', {'sort': 'due_date', 'value': '2026-10-20T09:00:00', 'id': [1]}),
+    ('priority', {'sort': 'priority', 'value': '2', 'id': 1}),
+    ('created', {'sort': 'created', 'value': None, 'id': 1.5}),
+    ('created', {'sort': 'created'}),
+])
+def test_malformed_cursor_is_a_400(client, auth_headers, tasks, sort, cursor):
+    if isinstance(cursor, dict):
+        cursor = encode_cursor(cursor)
+    response = client.get(f"/api/tasks?sort={sort}&cursor={cursor}", headers=auth_headers)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid cursor'}
@@ -0,0 +1,49 @@
+"""SQL statements per task write: the task and its Todo event go out in one flush"""
+import pytest
+
+DUE = '2026-10-20T10:00:00Z'
+
+def create(client, headers, **fields):
+    response = client.post('/api/tasks', json={'title': 'Essay', **fields}, headers=headers)
+    assert response.status_code == 201
+    return response.get_json()
+
+def test_create_with_due_date_inserts_event_and_task(client, auth_headers, count_statements):
+    with count_statements() as statements:
+        create(client, auth_headers, due_date=DUE)
+    assert statements == [('INSERT', 'calendar_event'), ('INSERT', 'task')]
+
+def test_create_without_due_date_inserts_task_only(client, auth_headers, count_statements):
+    with count_statements() as statements:
+        create(client, auth_headers)
+    assert statements == [('INSERT', 'task')]
+
+@pytest.mark.parametrize('method, body', [
+    ('patch', {'title': 'Essay draft'}),
+    ('put', {'title': 'Essay draft', 'due_date': '2026-10-21T09:00:00Z'}),
+])
+def test_update_is_one_select_and_two_updates(client, auth_headers, count_statements, method, body):
+    task = create(client, auth_headers, due_date=DUE)
+    with count_statements() as statements:
+        response = getattr(client, method)(f"/api/tasks/{task['id']}", json=body, headers=auth_headers)
+    assert response.status_code == 200
+    assert sorted(statements) == [('SELECT', 'task'), ('UPDATE', 'calendar_event'), ('UPDATE', 'task')]
+
+def test_delete_removes_task_and_event(client, auth_headers, count_statements):
+    task = create(client, auth_headers, due_date=DUE)
+    with count_statements() as statements:
+        response = client.delete(f"/api/tasks/{task['id']}", headers=auth_headers)
+    assert response.status_code == 200
+    assert statements == [('SELECT', 'task'), ('DELETE', 'task'), ('DELETE', 'calendar_event')]
+
+def test_delete_without_event(client, auth_headers, count_statements):
+    task = create(client, auth_headers)
+    with count_statements() as statements:
+        client.delete(f"/api/tasks/{task['id']}", headers=auth_headers)
+    assert statements == [('SELECT', 'task'), ('DELETE', 'task')]
+
+def test_write_and_read_return_the_same_due_date(client, auth_headers):
+    created = create(client, auth_headers, due_date='2026-10-20T12:00:00+02:00')
+    patched = client.patch(f"/api/tasks/{created['id']}", json={'priority': 2}, headers=auth_headers).get_json()
+    listed = client.get('/api/tasks', headers=auth_headers).get_json()
+    assert created['due_date'] == patched['due_date'] == listed[0]['due_date'] == '2026-10-20T10:00:00'